@@ -0,0 +1,177 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from DatabaseManager import DatabaseManager
+
+
+class AsyncDatabaseManager:
+    """
+        asyncio front end for DatabaseManager, for services that must not block their event loop.
+
+        Every call runs on one dedicated executor thread, which owns the wrapped DatabaseManager's
+        connection for that thread. Inserts that arrive while the executor is busy are written
+        together in a single transaction, and identical searches running at the same time share
+        one query. Use it as 'async with AsyncDatabaseManager(...) as db_manager:' or call close().
+        """
+
+    def __init__(self, db_name='contacts_database.db', db_manager=None):
+        self._db_name = db_name
+        self._db_manager = db_manager
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="phonebook-async-db")
+        self._pending_inserts = []
+        self._flushing = False
+        self._searches = {}
+
+    async def __aenter__(self):
+        await self._run(self._manager)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _manager(self):
+        # created on the executor thread, so the schema migrations do not block the event loop
+        if self._db_manager is None:
+            self._db_manager = DatabaseManager(self._db_name)
+        return self._db_manager
+
+    async def _run(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(function, *args, **kwargs))
+
+    async def _call(self, method, *args, **kwargs):
+        """
+            Runs the named DatabaseManager method on the executor thread.
+            """
+        return await self._run(lambda: getattr(self._manager(), method)(*args, **kwargs))
+
+    async def insert_contact(self, name, surname, number, email):
+        """
+           Inserts a new contact, like DatabaseManager.insert_contact.
+           Raises a ValueError if a contact with the same email or number already exists.
+           Returns the ID of the newly inserted contact.
+           """
+        future = asyncio.get_running_loop().create_future()
+        self._pending_inserts.append(((name, surname, number, email), future))
+        if not self._flushing:
+            self._flushing = True
+            asyncio.ensure_future(self._flush_inserts())
+        return await future
+
+    async def _flush_inserts(self):
+        """
+            Writes the queued inserts, one transaction per batch, until no more are queued.
+            """
+        try:
+            while self._pending_inserts:
+                batch, self._pending_inserts = self._pending_inserts, []
+                try:
+                    results = await self._call('insert_contacts', [row for row, _ in batch])
+                except Exception as e:
+                    results = [e] * len(batch)
+                for (_, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+        finally:
+            self._flushing = False
+
+    async def search_contacts(self, keyword, limit=None, offset=0):
+        """
+            Searches for contacts like DatabaseManager.search_contacts.
+            Returns a list of Contact objects that match the keyword.
+            """
+        key = (keyword, limit, offset)
+        future = self._searches.get(key)
+        if future is None:
+            future = self._searches[key] = asyncio.ensure_future(
+                self._call('search_contacts', keyword, limit, offset))
+            future.add_done_callback(lambda _: self._searches.pop(key, None))
+        # shielded, so a caller that is cancelled does not cancel the query for the others
+        return list(await asyncio.shield(future))
+
+    async def update_contact(self, email, number, new_name, new_surname, new_number, new_email):
+        """
+            Updates a contact like DatabaseManager.update_contact.
+            Returns True if the contact was successfully updated, False otherwise.
+            """
+        return await self._call('update_contact', email, number, new_name, new_surname, new_number, new_email)
+
+    async def download_contacts(self):
+        """
+            Returns every contact in the 'contacts' table as a list of Contact objects.
+            """
+        return await self._call('download_contacts')
+
+    async def count_contacts(self):
+        return await self._call('count_contacts')
+
+    async def backup(self, contacts, batch_size=500, progress=None):
+        """
+           Backs up the provided Contact objects like DatabaseManager.backup.
+           progress, if provided, is called on the event loop with the report after every batch.
+           Cancelling the call rolls the backup back at the next batch.
+           Returns a BackupReport.
+           """
+        loop = asyncio.get_running_loop()
+        cancelled = False
+
+        def on_batch(report):
+            if cancelled:
+                raise asyncio.CancelledError()
+            if progress is not None:
+                loop.call_soon_threadsafe(progress, report)
+
+        contacts = list(contacts)
+        try:
+            return await self._call('backup', contacts, batch_size, on_batch)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+
+    async def iter_contacts(self, batch_size=500):
+        """
+            Asynchronously iterates over every contact in the 'contacts' table, in id order,
+            reading batch_size rows at a time.
+            """
+        async for contact in self._stream(lambda: self._manager().iter_contacts(batch_size), batch_size):
+            yield contact
+
+    async def iter_search_contacts(self, keyword, batch_size=500):
+        """
+            Asynchronously iterates over the contacts search_contacts returns for the keyword,
+            reading batch_size rows at a time.
+            """
+        async for contact in self._stream(lambda: self._manager().iter_search_contacts(keyword, batch_size=batch_size),
+                                          batch_size):
+            yield contact
+
+    async def _stream(self, make_iterator, batch_size):
+        """
+            Advances the DatabaseManager generator from make_iterator() on the executor thread,
+            batch_size contacts per step, and yields its contacts.
+            """
+        iterator = await self._run(make_iterator)
+        try:
+            while True:
+                contacts = await self._run(lambda: list(islice(iterator, batch_size)))
+                if not contacts:
+                    return
+                for contact in contacts:
+                    yield contact
+        finally:
+            # closes the generator's cursor on the thread that uses it
+            self._executor.submit(iterator.close)
+
+    async def close(self):
+        """
+            Closes the database connection and stops the executor thread.
+            """
+        if self._db_manager is not None:
+            await self._run(self._db_manager.close_connection)
+        self._executor.shutdown(wait=False)
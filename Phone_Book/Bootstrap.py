@@ -0,0 +1,185 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from Contact import Contact, import_contacts_from_csv
+from ContactSnapshot import SnapshotSaver, load_snapshot
+from DatabaseManager import DatabaseManager
+from LiveSearch import CloudSearch, LocalSearch
+from QueryCache import QueryCache
+from QueryMetrics import QueryMetrics
+from SyncEngine import SyncEngine
+
+# contacts on PC are kept in a snapshot file between runs, the seed CSV is only imported on the first run
+SNAPSHOT_FILE = "contacts_snapshot.bin"
+SEED_FILE = "file"
+# entries and seconds the results of repeated database lookups are kept for, see QueryCache
+QUERY_CACHE_SIZE = 256
+QUERY_CACHE_TTL = 30
+
+
+class StartupTimer:
+    """
+        Records how long each phase of startup took, measured from 'start' (a time.perf_counter() value).
+        Phases may run on different threads and overlap, e.g. the data load runs while the window paints;
+        report() lists them in the order they started, with when each started and how long it took.
+        """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def record(self, phase, started, finished=None):
+        """
+            Records a phase that ran from started to finished, both time.perf_counter() values;
+            finished defaults to now.
+            """
+        finished = time.perf_counter() if finished is None else finished
+        with self._lock:
+            self.phases.append((phase, started - self.start, finished - started))
+
+    def mark(self, event):
+        """
+            Records an event that took no time of its own, e.g. the first paint of the window.
+            """
+        now = time.perf_counter()
+        self.record(event, now, now)
+
+    @contextmanager
+    def phase(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, started)
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def report(self):
+        """
+            Returns the recorded phases as a printable table.
+            """
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        lines = ["Startup:"]
+        for phase, started, duration in phases:
+            took = f"{duration * 1000:8.1f} ms" if duration else " " * 11
+            lines.append(f"  {phase:<12}{took}   at {started * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+class AppData:
+    """
+        The data the application works on, set up on demand rather than at import time.
+
+        The database is opened on first use of 'db_manager', from whichever thread needs it first, and the
+        contacts on PC are loaded by load_local(), which the GUI runs in the background after the window is
+        shown. Nothing here imports customtkinter, so the data layer can be used without the GUI.
+        The database statements are timed by 'metrics' when one is provided or PHONEBOOK_QUERY_METRICS=1
+        is set in the environment, see QueryMetrics. Repeated lookups are served from 'query_cache'.
+        """
+
+    def __init__(self, db_name="contacts_database.db", snapshot_file=SNAPSHOT_FILE, seed_file=SEED_FILE,
+                 timer=None, metrics=None, query_cache=None):
+        self.db_name = db_name
+        self.metrics = metrics if metrics is not None else QueryMetrics.from_environment()
+        self.query_cache = query_cache if query_cache is not None else QueryCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+        self.snapshot_file = snapshot_file
+        self.seed_file = seed_file
+        self.timer = timer if timer is not None else StartupTimer()
+        self.store = Contact.static_contacts
+        self.snapshot_saver = SnapshotSaver(snapshot_file, self.store, self.store.version)
+        self.local_search = LocalSearch(self.store)
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._db_manager = None
+        self._sync_engine = None
+        self._cloud_search = None
+        self._sync_revision = -1
+
+    @property
+    def db_manager(self):
+        """
+            The DatabaseManager, created on first use, which opens the database and creates the tables.
+            """
+        with self._lock:
+            if self._db_manager is None:
+                with self.timer.phase("DB open"):
+                    self._db_manager = DatabaseManager(self.db_name, metrics=self.metrics,
+                                                       cache=self.query_cache)
+            return self._db_manager
+
+    @property
+    def sync_engine(self):
+        """
+            The SyncEngine between the contacts on PC and the database, created on first use.
+            """
+        db_manager = self.db_manager
+        with self._lock:
+            if self._sync_engine is None:
+                self._sync_engine = SyncEngine(self.store, db_manager)
+                self._sync_engine.last_revision = self._sync_revision
+            return self._sync_engine
+
+    @property
+    def cloud_search(self):
+        """
+            The CloudSearch over the database, created on first use.
+            """
+        db_manager = self.db_manager
+        with self._lock:
+            if self._cloud_search is None:
+                self._cloud_search = CloudSearch(db_manager)
+            return self._cloud_search
+
+    @property
+    def sync_revision(self):
+        return self._sync_engine.last_revision if self._sync_engine is not None else self._sync_revision
+
+    def load_local(self, progress=None):
+        """
+            Loads the contacts on PC from the snapshot file, or imports the seed CSV file, if there is one,
+            when the snapshot file is missing or cannot be loaded. progress, if provided, is passed on to import_contacts_from_csv.
+            Returns the number of contacts loaded.
+            """
+        with self.timer.phase("data load"):
+            # an empty snapshot is kept empty, contacts deleted on PC do not come back from the seed
+            seed = not os.path.exists(self.snapshot_file)
+            if not seed:
+                try:
+                    self._sync_revision = load_snapshot(self.snapshot_file, self.store)
+                    self.snapshot_saver.saved_version = self.store.version
+                except (ValueError, OSError) as e:
+                    print(f"Failed to load {self.snapshot_file}: {e}", file=sys.stderr)
+                    self.store.clear()
+                    seed = True
+            if seed and self.seed_file is not None and os.path.exists(self.seed_file):
+                import_contacts_from_csv(self.seed_file, progress=progress)
+            # built here in the background rather than on the first search
+            self.store.name_index()
+            if self._sync_engine is not None:
+                self._sync_engine.last_revision = self._sync_revision
+        self.loaded = True
+        return len(self.store)
+
+    def close(self):
+        """
+            Closes the database connections, if the database was opened.
+            """
+        with self._lock:
+            if self._db_manager is not None:
+                self._db_manager.close_connection()
+
+    def save_snapshot(self):
+        """
+            Saves the contacts on PC to the snapshot file if they changed since the last save.
+            Does nothing before load_local() finished, so a half loaded store never replaces the snapshot.
+            Returns True if the snapshot was saved.
+            """
+        if not self.loaded:
+            return False
+        return self.snapshot_saver.save_if_changed(self.sync_revision)
@@ -0,0 +1,226 @@
+import time
+from array import array
+from bisect import bisect_right
+
+import Validation
+from Contact import Contact, ImportReport, read_csv_chunks
+from ContactExport import export_rows
+
+
+class _CodedColumn:
+    """
+        Column of strings that repeat a lot, like names: every distinct value is stored once
+        and each row holds a 4 byte code into that vocabulary.
+        """
+    __slots__ = ('values', 'codes', '_lookup')
+
+    def __init__(self):
+        self.values = []
+        self.codes = array('I')
+        self._lookup = {}
+
+    def append(self, value):
+        code = self._lookup.get(value)
+        if code is None:
+            code = self._lookup[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    def __getitem__(self, index):
+        return self.values[self.codes[index]]
+
+
+class _PackedColumn:
+    """
+        Column of mostly unique strings, like numbers and emails, packed as UTF-8 into a single
+        bytearray with an array of end offsets, so a row costs its encoded length plus 8 bytes.
+        """
+    __slots__ = ('data', 'ends')
+
+    def __init__(self):
+        self.data = bytearray()
+        self.ends = array('Q')
+
+    def append(self, value):
+        self.data += value.encode()
+        self.ends.append(len(self.data))
+
+    def _start(self, index):
+        return self.ends[index - 1] if index else 0
+
+    def __getitem__(self, index):
+        return self.data[self._start(index):self.ends[index]].decode()
+
+    def find(self, value):
+        """
+            Returns the index of the first row holding exactly the provided value, or -1.
+            """
+        encoded = value.encode()
+        position = self.data.find(encoded)
+        while position != -1:
+            index = bisect_right(self.ends, position)
+            if self._start(index) == position and self.ends[index] == position + len(encoded):
+                return index
+            position = self.data.find(encoded, position + 1)
+        return -1
+
+
+class ContactRow:
+    """
+        Lightweight read-only view of one row of a ColumnarContactStore, with the same fields as Contact.
+        """
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def name(self):
+        return self._store._names[self._index]
+
+    @property
+    def surname(self):
+        return self._store._surnames[self._index]
+
+    @property
+    def number(self):
+        return self._store._numbers[self._index]
+
+    @property
+    def email(self):
+        return self._store._emails[self._index]
+
+    def as_row(self):
+        return self.name, self.surname, self.number, self.email
+
+    def to_contact(self):
+        """
+            Returns a standalone Contact object with this row's fields.
+            """
+        return Contact.from_validated(*self.as_row())
+
+    def __eq__(self, other):
+        if not isinstance(other, (ContactRow, Contact)):
+            return NotImplemented
+        return self.number == other.number and self.email == other.email
+
+    def __hash__(self):
+        return hash((self.number, self.email))
+
+    def __str__(self):
+        return f"{self.name} {self.surname}"
+
+
+class ColumnarContactStore:
+    """
+        Append-only, memory compact contact collection for very large address books.
+
+        Names and surnames are dictionary coded and numbers and emails are packed into byte arrays,
+        instead of one Contact object and four string objects per contact. Rows are handed out as
+        ContactRow views. Rows are expected to be validated before they are appended.
+        """
+
+    def __init__(self):
+        self._names = _CodedColumn()
+        self._surnames = _CodedColumn()
+        self._numbers = _PackedColumn()
+        self._emails = _PackedColumn()
+
+    def __len__(self):
+        return len(self._names.codes)
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return ContactRow(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield ContactRow(self, index)
+
+    def append(self, name, surname, number, email):
+        """
+            Appends one already validated contact.
+            """
+        self._names.append(name)
+        self._surnames.append(surname)
+        self._numbers.append(number)
+        self._emails.append(email)
+
+    def extend(self, contacts):
+        """
+            Appends every Contact (or ContactRow) from the provided iterable.
+            """
+        for contact in contacts:
+            self.append(contact.name, contact.surname, contact.number, contact.email)
+
+    def iter_rows(self):
+        """
+            Yields every contact as a (name, surname, number, email) tuple.
+            """
+        for index in range(len(self)):
+            yield self._names[index], self._surnames[index], self._numbers[index], self._emails[index]
+
+    def find_number(self, number):
+        """
+            Returns the ContactRow with the provided number, or None.
+            """
+        index = self._numbers.find(number)
+        return None if index == -1 else ContactRow(self, index)
+
+    def find_email(self, email):
+        """
+            Returns the ContactRow with the provided email, or None.
+            """
+        index = self._emails.find(email) if email else -1
+        return None if index == -1 else ContactRow(self, index)
+
+    def search(self, keyword):
+        """
+            Searches for contacts that match the provided keyword in either name or surname, ignoring case.
+            Only the distinct names are compared with the keyword, rows are then selected by their codes.
+            Returns a list of matching ContactRow objects.
+            """
+        keyword = keyword.casefold()
+        name_codes = {code for code, value in enumerate(self._names.values) if keyword in value.casefold()}
+        surname_codes = {code for code, value in enumerate(self._surnames.values) if keyword in value.casefold()}
+        return [ContactRow(self, index)
+                for index, (name_code, surname_code) in enumerate(zip(self._names.codes, self._surnames.codes))
+                if name_code in name_codes or surname_code in surname_codes]
+
+    def export_csv(self, filename, compression='auto', progress=None):
+        """
+            Writes every contact to a CSV file with the same columns as export_contacts_to_csv.
+            Returns an ExportReport describing the export.
+            """
+        return export_rows(filename, self.iter_rows(), compression, progress=progress)
+
+    @classmethod
+    def from_csv(cls, filename, chunk_size=10000, max_errors=100):
+        """
+            Loads a contacts CSV file, validating it a chunk at a time and skipping duplicate numbers and emails.
+            Returns a (ColumnarContactStore, ImportReport) pair.
+            """
+        store = cls()
+        report = ImportReport(max_errors)
+        start = time.perf_counter()
+        # only needed while loading, dropped with the function's frame
+        seen_numbers = set()
+        seen_emails = set()
+        for chunk in read_csv_chunks(filename, chunk_size):
+            for (line_number, row), codes in zip(chunk, Validation.validate_batch([row for _, row in chunk])):
+                name, surname, number, email = row
+                if codes is not None:
+                    report.reject(line_number, row, Validation.first_error(codes))
+                elif number in seen_numbers:
+                    report.reject(line_number, row, f"\n{number}\nnumber already added ")
+                elif email in seen_emails:
+                    report.reject(line_number, row, f"{email}\nmail already added")
+                else:
+                    seen_numbers.add(number)
+                    seen_emails.add(email)
+                    store.append(name, surname, number, email)
+                    report.imported += 1
+        report.elapsed = time.perf_counter() - start
+        return store, report
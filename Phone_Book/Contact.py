@@ -1,49 +1,135 @@
-import re
 import csv
+import time
 
+import Validation
+from ContactExport import FIELDNAMES, contact_rows, export_rows
+from ContactStore import ContactStore
 
-# Import contacts from a CSV file
-def import_contacts_from_csv(filename):
+
+class ImportReport:
     """
-        Imports contacts from a CSV file with the provided filename.
-        Returns a list of Contact objects created from the CSV data.
+        Outcome of a CSV import: how many rows were imported or rejected, the first max_errors
+        rejections as (line number, row, reason) tuples and the import speed so far.
         """
-    contacts = []
-    with open(filename, 'r') as file:
+
+    def __init__(self, max_errors=100):
+        self.imported = 0
+        self.rejected = 0
+        self.errors = []
+        self.max_errors = max_errors
+        self.elapsed = 0.0
+
+    def reject(self, line_number, row, reason):
+        self.rejected += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line_number, row, reason))
+
+    @property
+    def rows(self):
+        return self.imported + self.rejected
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return f"{self.imported} imported, {self.rejected} rejected ({self.rows_per_second:.0f} rows/s)"
+
+
+def check_csv_header(filename, fieldnames):
+    """
+        Raises a ValueError naming the FIELDNAMES columns missing from the header of a contacts CSV file.
+        """
+    missing = [field for field in FIELDNAMES if field not in (fieldnames or ())]
+    if missing:
+        raise ValueError(f"{filename} is missing the columns: {', '.join(missing)}")
+
+
+def read_csv_chunks(filename, chunk_size=1000):
+    """
+        Reads a contacts CSV file lazily and yields lists of up to chunk_size (line number, row) pairs.
+        Rows are (name, surname, number, email) tuples, missing fields read as empty strings.
+        Raises a ValueError if the header lacks one of the FIELDNAMES columns.
+        """
+    with open(filename, 'r', newline='') as file:
         reader = csv.DictReader(file)
+        check_csv_header(filename, reader.fieldnames)
+        chunk = []
         for row in reader:
-            name = row['Name']
-            surname = row['Surname']
-            number = row['Number']
-            email = row['Email']
+            chunk.append((reader.line_num, (row['Name'] or "", row['Surname'] or "",
+                                            row['Number'] or "", row['Email'] or "")))
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
 
+
+def validate_rows(chunk, report):
+    """
+        Validates a chunk of (line number, row) pairs as read by read_csv_chunks.
+        Invalid rows are recorded in the ImportReport, returns a list of (line number, Contact) pairs.
+        """
+    contacts = []
+    for (line_number, row), codes in zip(chunk, Validation.validate_batch([row for line_number, row in chunk])):
+        if codes is None:
+            contacts.append((line_number, Contact.from_validated(*row)))
+        else:
+            report.reject(line_number, row, Validation.first_error(codes))
+    return contacts
+
+
+def store_imported_contacts(contacts, report, db_manager=None):
+    """
+        Adds (line number, Contact) pairs from an import to Contact.static_contacts, or to the database
+        when a DatabaseManager is provided. Duplicates are recorded in the ImportReport.
+        """
+    if db_manager is None:
+        for line_number, contact in contacts:
             try:
-                contact = create_contact(name, surname, number, email)
-                print(f"Imported contact: {name} {surname}")
-                contacts.append(contact)
+                Contact.static_contacts.add(contact)
+                report.imported += 1
             except ValueError as e:
-                print(f"Failed to insert contact: {name} {surname}. Reason: {str(e)}")
+                report.reject(line_number, contact.as_row(), str(e))
+    else:
+        backup_report = db_manager.backup([contact for line_number, contact in contacts])
+        report.imported += len(backup_report.accepted)
+        lines = {id(contact): line_number for line_number, contact in contacts}
+        for contact, reason in backup_report.rejected:
+            report.reject(lines[id(contact)], contact.as_row(), reason)
 
-    return contacts
+
+# Import contacts from a CSV file
+def import_contacts_from_csv(filename, db_manager=None, chunk_size=1000, progress=None, max_errors=100):
+    """
+        Imports contacts from a CSV file with the provided filename, streaming it in chunks of chunk_size rows
+        so memory use does not grow with the file size.
+        Valid contacts go to Contact.static_contacts, or straight to the database when a DatabaseManager is
+        provided. Invalid and duplicate rows are collected in the report instead of being printed.
+        progress, if provided, is called with the ImportReport after every chunk.
+        Returns an ImportReport describing the import.
+        """
+    report = ImportReport(max_errors)
+    start = time.perf_counter()
+    for chunk in read_csv_chunks(filename, chunk_size):
+        store_imported_contacts(validate_rows(chunk, report), report, db_manager)
+        report.elapsed = time.perf_counter() - start
+        if progress is not None:
+            progress(report)
+
+    return report
 
 
 # Export contacts to a CSV file
-def export_contacts_to_csv(filename, contacts):
+def export_contacts_to_csv(filename, contacts, compression='auto', progress=None):
     """
-        Exports the provided list of Contact objects to a CSV file with the provided filename.
+        Exports the provided Contact objects to a CSV file with the provided filename.
         The CSV file is structured with columns for Name, Surname, Number, and Email.
+        contacts may be any iterable, it is written in chunks as it is read. compression and progress
+        are passed on to ContactExport.export_rows, by default a .gz or .xz filename is compressed.
+        Returns an ExportReport describing the export.
         """
-    fieldnames = ['Name', 'Surname', 'Number', 'Email']
-    with open(filename, 'w', newline='') as file:
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        for contact in contacts:
-            writer.writerow({
-                'Name': contact.name,
-                'Surname': contact.surname,
-                'Number': contact.number,
-                'Email': contact.email
-            })
+    return export_rows(filename, contact_rows(contacts), compression, progress=progress)
 
 
 # Create a new contact
@@ -72,12 +158,12 @@ def delete_contact(contact):
 
 def search_contact_by_object(contact_object):
     """
-    Searches for a contact by the provided contact object in the given set of contacts.
+    Searches for a contact equal to the provided contact object (same number and email) in the stored contacts.
     Returns the matching contact object if found, None otherwise.
     """
-    for contact in Contact.static_contacts:
-        if contact == contact_object:
-            return contact
+    contact = Contact.static_contacts.get_by_number(contact_object.number)
+    if contact is not None and contact == contact_object:
+        return contact
     return None
 
 
@@ -88,69 +174,64 @@ def search_contact(full_name):
         Returns the matching Contact object if found, None otherwise.
         """
     name, surname = full_name.split()
-    for contact in Contact.static_contacts:
+    # exact matches come straight from the (name, surname) index
+    exact_matches = Contact.static_contacts.get_by_full_name(name, surname)
+    if exact_matches:
+        return exact_matches[0]
+    # the name index matches ignoring case, the search itself is case sensitive
+    for contact in Contact.static_contacts.search_full_name(name, surname):
         if name in contact.name and surname in contact.surname:
             return contact
 
 
 def search_contacts_by_keyword(keyword):
     """
-        Searches for contacts that match the provided keyword in either name or surname.
+        Searches for contacts that match the provided keyword in either name or surname, ignoring case.
         Returns a list of matching Contact objects.
         """
-    matches = []
-    keyword = keyword.lower()
-    for contact in Contact.static_contacts:
-        if keyword in contact.name.lower() or keyword in contact.surname.lower():
-            matches.append(contact)
-    return matches
+    return Contact.static_contacts.search_names(keyword)
 
 
 # Class representing a contact
 class Contact:
-    MAX_NAME_LENGTH, MAX_SURNAME_LENGTH = (50, 50)
-    MAX_NUMBER_LENGTH = 15
-    MAX_EMAIL_LENGTH = 63
+    MAX_NAME_LENGTH, MAX_SURNAME_LENGTH = (Validation.MAX_NAME_LENGTH, Validation.MAX_SURNAME_LENGTH)
+    MAX_NUMBER_LENGTH = Validation.MAX_NUMBER_LENGTH
+    MAX_EMAIL_LENGTH = Validation.MAX_EMAIL_LENGTH
+
+    # static store for contacts to insure uniqueness, indexed by number, email and full name
+    static_contacts = ContactStore()
 
-    # static set for contacts to insure uniqueness
-    static_contacts = set()
+    # fixed attribute slots instead of a per-contact __dict__,
+    # _store is the store the contact is indexed in, kept in sync by the setters below,
+    # _cloud_id and _cloud_revision link the contact to its database row for SyncEngine
+    __slots__ = ('_name', '_surname', '_number', '_email', '_store', '_cloud_id', '_cloud_revision')
 
     def __init__(self, name, surname, number, email):
-        # Handle exceptions for name input
-        if not name:
-            raise ValueError("Name cannot be empty")
-        if len(name) > Contact.MAX_NAME_LENGTH:
-            raise ValueError(f"Name cannot exceed {Contact.MAX_NAME_LENGTH} characters")
-        if not all(char.isalpha() or char.isspace() for char in name):
-            raise ValueError("Name can only contain alphabetic characters and spaces")
-
-        # Handle exceptions for surname input
-        if not surname:
-            raise ValueError("Surname cannot be empty")
-        if len(surname) > Contact.MAX_SURNAME_LENGTH:
-            raise ValueError(f"Surname cannot exceed {Contact.MAX_NAME_LENGTH} characters")
-        if not all(char.isalpha() or char.isspace() for char in surname):
-            raise ValueError("Surname can only contain alphabetic characters and spaces")
-
-        # Handle exceptions for number input
-        if not number:
-            raise ValueError("Number cannot be empty")
-        if len(number) > Contact.MAX_NAME_LENGTH:
-            raise ValueError(f"Number cannot exceed {Contact.MAX_NUMBER_LENGTH} integers")
-        if not number.isdigit():
-            raise ValueError("Number can only contain digits")
-
-        # Handle exceptions for email input
-        # A person can have no email
-        if len(email) > Contact.MAX_EMAIL_LENGTH:
-            raise ValueError(f"Email cannot exceed {Contact.MAX_EMAIL_LENGTH} characters")
-        if email and not re.match(r'^[\w.-]+@[a-zA-Z]+\.[a-zA-Z]{2,}$', email):
-            raise ValueError("Invalid email format")
+        # Handle exceptions for every field, a person can have no email
+        Validation.raise_for_codes(Validation.validate_contact(name, surname, number, email))
 
         self._name = name
         self._surname = surname
         self._number = number
         self._email = email
+        self._store = None
+        self._cloud_id = None
+        self._cloud_revision = None
+
+    @classmethod
+    def from_validated(cls, name, surname, number, email):
+        """
+            Creates a Contact from fields that already passed validation, skipping the checks in __init__.
+            """
+        contact = cls.__new__(cls)
+        contact._name = name
+        contact._surname = surname
+        contact._number = number
+        contact._email = email
+        contact._store = None
+        contact._cloud_id = None
+        contact._cloud_revision = None
+        return contact
 
     # Getter for the name property
     @property
@@ -160,12 +241,9 @@ class Contact:
     # edit name
     @name.setter
     def name(self, name):
-        if not name:
-            raise ValueError("Name cannot be empty")
-        if len(name) > Contact.MAX_NAME_LENGTH:
-            raise ValueError(f"Name cannot exceed {Contact.MAX_NAME_LENGTH} characters")
-        if not all(char.isalpha() or char.isspace() for char in name):
-            raise ValueError("Name can only contain alphabetic characters and spaces")
+        Validation.validate_field('name', name)
+        if self._store is not None:
+            self._store.reindex(self, 'name', name)
         self._name = name
 
     # Getter for the surname property
@@ -176,12 +254,9 @@ class Contact:
     # edit surname
     @surname.setter
     def surname(self, surname):
-        if not surname:
-            raise ValueError("Surname cannot be empty")
-        if len(surname) > Contact.MAX_SURNAME_LENGTH:
-            raise ValueError(f"Surname cannot exceed {Contact.MAX_NAME_LENGTH} characters")
-        if not all(char.isalpha() or char.isspace() for char in surname):
-            raise ValueError("Surname can only contain alphabetic characters and spaces")
+        Validation.validate_field('surname', surname)
+        if self._store is not None:
+            self._store.reindex(self, 'surname', surname)
         self._surname = surname
 
     # Getter for the number property
@@ -192,12 +267,9 @@ class Contact:
     # edit number
     @number.setter
     def number(self, number):
-        if not number:
-            raise ValueError("Number cannot be empty")
-        if len(number) > Contact.MAX_NAME_LENGTH:
-            raise ValueError(f"Number cannot exceed {Contact.MAX_NUMBER_LENGTH} integers")
-        if not number.isdigit():
-            raise ValueError("Name can only contain alphabetic characters")
+        Validation.validate_field('number', number)
+        if self._store is not None:
+            self._store.reindex(self, 'number', number)
         self._number = number
 
     # Getter for the number property
@@ -208,10 +280,9 @@ class Contact:
     # edit email
     @email.setter
     def email(self, email):
-        if len(email) > Contact.MAX_EMAIL_LENGTH:
-            raise ValueError(f"Email cannot exceed {Contact.MAX_EMAIL_LENGTH} characters")
-        if email and not re.match(r'^[\w.-]+@[a-zA-Z]+\.[a-zA-Z]{2,}$', email):
-            raise ValueError("Invalid email format")
+        Validation.validate_field('email', email)
+        if self._store is not None:
+            self._store.reindex(self, 'email', email)
         self._email = email
 
     # Check if an email already exists in the contacts
@@ -221,10 +292,7 @@ class Contact:
                 Checks if a contact with the provided email already exists in the list of contacts.
                 Returns True if a match is found, False otherwise.
                 """
-        for contact in cls.static_contacts:
-            if contact.email == email:
-                return True
-        return False
+        return cls.static_contacts.email_exists(email)
 
     # Check if a number already exists in the contacts
     @classmethod
@@ -233,10 +301,23 @@ class Contact:
                 Checks if a contact with the provided number already exists in the list of contacts.
                 Returns True if a match is found, False otherwise.
                 """
-        for contact in cls.static_contacts:
-            if contact.number == number:
-                return True
-        return False
+        return cls.static_contacts.number_exists(number)
+
+    def as_row(self):
+        """
+            Returns the contact as a (name, surname, number, email) tuple.
+            """
+        return self._name, self._surname, self._number, self._email
+
+    # Contacts are identified by number and email, like rows in DatabaseManager.update_contact.
+    # The hash changes when either is edited, so a contact must not be edited while it is a set member or dict key.
+    def __eq__(self, other):
+        if not isinstance(other, Contact):
+            return NotImplemented
+        return self._number == other._number and self._email == other._email
+
+    def __hash__(self):
+        return hash((self._number, self._email))
 
     def __str__(self):
         return f"{self._name} {self._surname}"
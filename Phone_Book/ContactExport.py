@@ -0,0 +1,96 @@
+import csv
+import gzip
+import lzma
+import os
+import time
+from itertools import islice
+
+FIELDNAMES = ['Name', 'Surname', 'Number', 'Email']
+# compression by file extension, used when export_rows is not told the compression
+COMPRESSION_EXTENSIONS = {'.gz': 'gzip', '.xz': 'lzma', '.lzma': 'lzma'}
+# bytes buffered before an uncompressed export is written out
+BUFFER_SIZE = 1 << 20
+
+
+class ExportReport:
+    """
+        Outcome of a CSV export: how many rows were written and the export speed so far.
+        """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.rows = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return f"{self.rows} exported ({self.rows_per_second:.0f} rows/s)"
+
+
+def compression_for(filename):
+    """
+        Returns the compression export_rows uses for the filename by default: 'gzip', 'lzma' or None.
+        """
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def open_export_file(filename, compression=None):
+    """
+        Opens filename for writing CSV text, compressed on the fly with 'gzip' or 'lzma', or uncompressed if
+        compression is None. Raises a ValueError for any other compression.
+        """
+    if compression is None:
+        return open(filename, 'w', newline='', buffering=BUFFER_SIZE)
+    if compression == 'gzip':
+        # compresslevel 6 is the gzip command's default, the module's 9 is much slower for little gain
+        return gzip.open(filename, 'wt', compresslevel=6, newline='')
+    if compression == 'lzma':
+        # preset 1 compresses several times faster than the default 6, the files come out about as small
+        return lzma.open(filename, 'wt', preset=1, newline='')
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def contact_rows(contacts):
+    """
+        Yields the (name, surname, number, email) row of every Contact object of the iterable.
+        """
+    for contact in contacts:
+        yield contact.name, contact.surname, contact.number, contact.email
+
+
+def export_rows(filename, rows, compression='auto', chunk_size=1000, progress=None):
+    """
+        Writes (name, surname, number, email) rows to a CSV file with the provided filename, under the
+        Name, Surname, Number and Email header. rows may be any iterable, e.g. a database cursor, and is
+        consumed chunk_size rows at a time, so memory use does not grow with the number of rows.
+        compression is 'gzip', 'lzma', None, or 'auto' to pick it from the file extension (.gz, .xz, .lzma).
+        progress, if provided, is called with the ExportReport after every chunk; an exception raised from
+        it stops the export. A file left incomplete by an exception is removed.
+        Returns an ExportReport describing the export.
+        """
+    if compression == 'auto':
+        compression = compression_for(filename)
+    report = ExportReport(filename)
+    start = time.perf_counter()
+    rows = iter(rows)
+    file = open_export_file(filename, compression)
+    try:
+        with file:
+            writer = csv.writer(file)
+            writer.writerow(FIELDNAMES)
+            chunk = list(islice(rows, chunk_size))
+            while chunk:
+                writer.writerows(chunk)
+                report.rows += len(chunk)
+                report.elapsed = time.perf_counter() - start
+                if progress is not None:
+                    progress(report)
+                chunk = list(islice(rows, chunk_size))
+    except BaseException:
+        os.unlink(filename)
+        raise
+    report.elapsed = time.perf_counter() - start
+    return report
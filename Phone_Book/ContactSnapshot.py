@@ -0,0 +1,148 @@
+import gc
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from array import array
+
+from Contact import Contact
+
+# File layout, all integers little endian:
+#   header      magic, format version, contact count, tombstone count, sync revision
+#   columns     name, surname, number and email, each a byte length followed by the column's values
+#               encoded as UTF-8 and joined by NUL, which no valid field contains
+#   cloud ids   one int64 per contact, -1 for contacts never synced
+#   revisions   one int64 per contact
+#   dirty       one byte per contact
+#   tombstones  int64 cloud ids followed by int64 revisions
+#   trailer     CRC-32 of everything before it
+MAGIC = b"PBSNAP\r\n"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sHQQq")
+_LENGTH = struct.Struct("<Q")
+_TRAILER = struct.Struct("<I")
+_SEPARATOR = "\0"
+_NO_CLOUD_ID = -1
+
+
+def _join_column(values):
+    text = _SEPARATOR.join(values)
+    if text.count(_SEPARATOR) != len(values) - 1:
+        raise ValueError("Contact fields cannot contain NUL characters")
+    return text.encode()
+
+
+def save_snapshot(filename, store, sync_revision=-1):
+    """
+        Writes the contacts of the provided ContactStore, with their sync state, to a snapshot file.
+        The file is written next to the old one and moved over it in one step, so a crash while saving
+        leaves the previous snapshot intact. sync_revision is stored for SyncEngine.last_revision.
+        Returns the store version that was saved.
+        """
+    contacts, dirty, tombstones, version = store.export_state()
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(contacts), len(tombstones), sync_revision)
+    chunks = [header]
+    for field in ('name', 'surname', 'number', 'email'):
+        column = _join_column([getattr(contact, field) for contact in contacts]) if contacts else b""
+        chunks.append(_LENGTH.pack(len(column)))
+        chunks.append(column)
+    chunks.append(array('q', [_NO_CLOUD_ID if contact._cloud_id is None else contact._cloud_id
+                              for contact in contacts]).tobytes())
+    chunks.append(array('q', [contact._cloud_revision or 0 for contact in contacts]).tobytes())
+    chunks.append(bytes(id(contact) in dirty for contact in contacts))
+    chunks.append(array('q', [cloud_id for cloud_id, _ in tombstones]).tobytes())
+    chunks.append(array('q', [revision for _, revision in tombstones]).tobytes())
+    checksum = 0
+    for chunk in chunks:
+        checksum = zlib.crc32(chunk, checksum)
+    chunks.append(_TRAILER.pack(checksum))
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    file_descriptor, temporary = tempfile.mkstemp(prefix=".snapshot-", dir=directory)
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.writelines(chunks)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, filename)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return version
+
+
+def load_snapshot(filename, store):
+    """
+        Loads a snapshot file into the provided empty ContactStore. The file is memory-mapped and the
+        contacts are created with Contact.from_validated, since they were validated before they were saved.
+        Returns the sync revision stored with the snapshot.
+        Raises a ValueError if the file is not a snapshot, has an unsupported format version or is corrupt.
+        """
+    with open(filename, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if len(data) < _HEADER.size + _TRAILER.size:
+            raise ValueError(f"{filename} is not a contacts snapshot")
+        magic, format_version, count, tombstone_count, sync_revision = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a contacts snapshot")
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported contacts snapshot version {format_version}")
+        body_size = len(data) - _TRAILER.size
+        if zlib.crc32(memoryview(data)[:body_size]) != _TRAILER.unpack_from(data, body_size)[0]:
+            raise ValueError(f"{filename} is corrupt")
+
+        offset = _HEADER.size
+        columns = []
+        for _ in range(4):
+            length, = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            columns.append(data[offset:offset + length].decode().split(_SEPARATOR) if count else [])
+            offset += length
+        cloud_ids = array('q', data[offset:offset + 8 * count])
+        offset += 8 * count
+        revisions = array('q', data[offset:offset + 8 * count])
+        offset += 8 * count
+        dirty = data[offset:offset + count]
+        offset += count
+        tombstone_ids = array('q', data[offset:offset + 8 * tombstone_count])
+        offset += 8 * tombstone_count
+        tombstone_revisions = array('q', data[offset:offset + 8 * tombstone_count])
+
+    # creating millions of objects would otherwise trigger many full garbage collections that find nothing
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        contacts = list(map(Contact.from_validated, *columns))
+        for contact, cloud_id, revision in zip(contacts, cloud_ids, revisions):
+            if cloud_id != _NO_CLOUD_ID:
+                contact._cloud_id = cloud_id
+                contact._cloud_revision = revision
+        store.restore(contacts, dirty, zip(tombstone_ids, tombstone_revisions))
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return sync_revision
+
+
+class SnapshotSaver:
+    """
+        Keeps a snapshot file up to date with a ContactStore: save_if_changed() rewrites the file
+        only when the store's version moved since the last save.
+        """
+
+    def __init__(self, filename, store, saved_version=None):
+        self.filename = filename
+        self.store = store
+        self.saved_version = saved_version
+
+    def changed(self):
+        return self.store.version != self.saved_version
+
+    def save_if_changed(self, sync_revision=-1):
+        """
+            Saves the store if it changed since the last save. Returns True if it was saved.
+            """
+        if not self.changed():
+            return False
+        self.saved_version = save_snapshot(self.filename, self.store, sync_revision)
+        return True
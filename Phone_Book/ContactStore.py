@@ -0,0 +1,305 @@
+import threading
+
+from NameIndex import NameIndex
+
+
+class ContactStore:
+    """
+        In-memory collection of Contact objects with hash indexes for constant time lookups.
+
+        Contacts are kept in a unique index on number, a unique index on email and a
+        non-unique index on (name, surname). Contacts added to a store keep a reference to it,
+        so the Contact property setters can move them between index slots when edited in place.
+        'version' goes up on every change, so readers can tell a cached view of the store is stale.
+        Changes are made under a lock, so background tasks can read a snapshot() while the GUI edits the store.
+
+        Name and surname searches go through a NameIndex, built on the first search and then kept up to date
+        as contacts are added, edited and removed.
+
+        For SyncEngine the store also tracks which contacts were added or edited since they were last synced
+        (the dirty contacts) and keeps a tombstone for every removed contact that had been synced, so only
+        those changes have to be sent to the database.
+        """
+
+    def __init__(self, contacts=()):
+        self.version = 0
+        self._lock = threading.RLock()
+        self._by_number = {}
+        self._by_email = {}
+        self._by_full_name = {}
+        self._by_cloud_id = {}
+        self._name_index = None
+        # id(contact) -> (contact, version of its last change), and cloud id -> revision of deleted contacts
+        self._dirty = {}
+        self._tombstones = {}
+        for contact in contacts:
+            self.add(contact)
+
+    def __len__(self):
+        return len(self._by_number)
+
+    def __iter__(self):
+        return iter(self._by_number.values())
+
+    def __contains__(self, contact):
+        return self._by_number.get(contact.number) is contact
+
+    def add(self, contact):
+        """
+            Adds the provided Contact object to the store.
+            Raises a ValueError if another contact with the same number or email is already stored.
+            """
+        with self._lock:
+            if contact in self:
+                return
+            if contact.number in self._by_number:
+                raise ValueError(f"\n{contact.number}\nnumber already added ")
+            if contact.email in self._by_email:
+                raise ValueError(f"{contact.email}\nmail already added")
+            self._by_number[contact.number] = contact
+            self._by_email[contact.email] = contact
+            self._by_full_name.setdefault((contact.name, contact.surname), {})[id(contact)] = contact
+            if contact._cloud_id is not None:
+                self._by_cloud_id[contact._cloud_id] = contact
+            if self._name_index is not None:
+                self._name_index.add(contact)
+            contact._store = self
+            self.version += 1
+            self._dirty[id(contact)] = (contact, self.version)
+
+    def update(self, contacts):
+        """
+            Adds every contact from the provided iterable that does not clash with a stored one.
+            Returns a list of the Contact objects that were added.
+            """
+        added = []
+        with self._lock:
+            for contact in contacts:
+                try:
+                    self.add(contact)
+                    added.append(contact)
+                except ValueError:
+                    pass
+        return added
+
+    def remove(self, contact, tombstone=True):
+        """
+            Removes the provided Contact object from the store.
+            If the contact was synced, a tombstone is kept so the removal reaches the database on the next sync,
+            unless tombstone is False.
+            Raises a KeyError if the contact is not stored.
+            """
+        with self._lock:
+            if contact not in self:
+                raise KeyError(contact)
+            del self._by_number[contact.number]
+            del self._by_email[contact.email]
+            self._unlink_full_name(contact, (contact.name, contact.surname))
+            if self._name_index is not None:
+                self._name_index.remove(contact)
+            self._dirty.pop(id(contact), None)
+            if contact._cloud_id is not None:
+                del self._by_cloud_id[contact._cloud_id]
+                if tombstone:
+                    self._tombstones[contact._cloud_id] = contact._cloud_revision
+            contact._store = None
+            self.version += 1
+
+    def clear(self):
+        """
+            Removes every contact from the store.
+            """
+        with self._lock:
+            for contact in self._by_number.values():
+                contact._store = None
+            self._by_number.clear()
+            self._by_email.clear()
+            self._by_full_name.clear()
+            self._by_cloud_id.clear()
+            self._name_index = None
+            self._dirty.clear()
+            self._tombstones.clear()
+            self.version += 1
+
+    def snapshot(self):
+        """
+            Returns a list of the stored contacts, taken under the lock so it is safe to call from another thread.
+            """
+        with self._lock:
+            return list(self._by_number.values())
+
+    def export_state(self):
+        """
+            Returns a consistent (contacts, dirty, tombstones, version) view of the store for persisting it:
+            the list of stored contacts, the set of id()s of the dirty ones, the list of (cloud id, revision)
+            tombstones and the version it was taken at.
+            """
+        with self._lock:
+            return list(self._by_number.values()), set(self._dirty), list(self._tombstones.items()), self.version
+
+    def restore(self, contacts, dirty, tombstones):
+        """
+            Fills an empty store with contacts that are known to be valid and free of duplicates, e.g. loaded
+            from a snapshot, building the indexes in bulk instead of adding one contact at a time.
+            dirty is a parallel sequence of booleans and tombstones a list of (cloud id, revision) pairs.
+            Raises a ValueError if the store is not empty or the contacts hold a duplicate number or email.
+            """
+        with self._lock:
+            if self._by_number:
+                raise ValueError("Contacts can only be restored into an empty store")
+            # the slot attributes are read directly, this runs once per contact on startup
+            by_number = {contact._number: contact for contact in contacts}
+            by_email = {contact._email: contact for contact in contacts}
+            if len(by_number) != len(contacts) or len(by_email) != len(contacts):
+                raise ValueError("Restored contacts hold a duplicate number or email")
+            self.version += 1
+            by_full_name = self._by_full_name
+            for contact in contacts:
+                key = (contact._name, contact._surname)
+                same_name = by_full_name.get(key)
+                if same_name is None:
+                    same_name = by_full_name[key] = {}
+                same_name[id(contact)] = contact
+                contact._store = self
+            self._by_cloud_id = {contact._cloud_id: contact for contact in contacts if contact._cloud_id is not None}
+            self._dirty = {id(contact): (contact, self.version)
+                           for contact, is_dirty in zip(contacts, dirty) if is_dirty}
+            self._by_number = by_number
+            self._by_email = by_email
+            self._tombstones = dict(tombstones)
+            self._name_index = None
+
+    def search_names(self, keyword, prefix=False):
+        """
+            Returns a list of the stored contacts whose name or surname contains the keyword, ignoring case,
+            or starts with it if prefix is True.
+            """
+        with self._lock:
+            name_index = self.name_index()
+            return name_index.with_prefix(keyword) if prefix else name_index.containing(keyword)
+
+    def search_full_name(self, name, surname):
+        """
+            Returns a list of the stored contacts whose name contains name and surname contains surname,
+            ignoring case.
+            """
+        with self._lock:
+            name_index = self.name_index()
+            surnames = {id(contact) for contact in name_index.containing(surname, fields=('surname',))}
+            return [contact for contact in name_index.containing(name, fields=('name',)) if id(contact) in surnames]
+
+    def name_index(self):
+        """
+            Returns the store's NameIndex, building it on first use.
+            """
+        if self._name_index is None:
+            self._name_index = NameIndex(self._by_number.values())
+        return self._name_index
+
+    def get_by_cloud_id(self, cloud_id):
+        """
+            Returns the stored contact linked to the database row with the provided id, or None.
+            """
+        return self._by_cloud_id.get(cloud_id)
+
+    def dirty_contacts(self):
+        """
+            Returns a list of (contact, change) pairs for the contacts added or edited since they were last synced;
+            change is passed back to mark_synced.
+            """
+        with self._lock:
+            return list(self._dirty.values())
+
+    def is_dirty(self, contact):
+        return id(contact) in self._dirty
+
+    def tombstones(self):
+        """
+            Returns a list of (cloud id, revision) pairs for the synced contacts removed since the last sync.
+            """
+        with self._lock:
+            return list(self._tombstones.items())
+
+    def mark_synced(self, contact, cloud_id, revision, change=None):
+        """
+            Links a stored contact to its database row and revision and clears its dirty flag,
+            unless the contact changed again after change, the version dirty_contacts returned with it.
+            """
+        with self._lock:
+            if contact not in self:
+                return
+            if contact._cloud_id is not None:
+                self._by_cloud_id.pop(contact._cloud_id, None)
+            contact._cloud_id = cloud_id
+            contact._cloud_revision = revision
+            self._by_cloud_id[cloud_id] = contact
+            dirty = self._dirty.get(id(contact))
+            if dirty is not None and (change is None or dirty[1] == change):
+                del self._dirty[id(contact)]
+
+    def forget_tombstone(self, cloud_id):
+        with self._lock:
+            self._tombstones.pop(cloud_id, None)
+
+    def get_by_number(self, number):
+        """
+            Returns the contact stored with the provided number, or None.
+            """
+        return self._by_number.get(number)
+
+    def get_by_email(self, email):
+        """
+            Returns the contact stored with the provided email, or None.
+            """
+        return self._by_email.get(email)
+
+    def get_by_full_name(self, name, surname):
+        """
+            Returns a list of the contacts stored with exactly the provided name and surname.
+            """
+        return list(self._by_full_name.get((name, surname), {}).values())
+
+    def number_exists(self, number):
+        return number in self._by_number
+
+    def email_exists(self, email):
+        return email in self._by_email
+
+    def reindex(self, contact, field, value):
+        """
+            Moves a stored contact to the index slots for a new field value.
+            Must be called before the attribute changes, while the old value is still readable.
+            Raises a ValueError if the new number or email belongs to another stored contact.
+            """
+        with self._lock:
+            # checked before anything changes, so a rejected edit leaves the store and the contact as they were
+            if field == 'number':
+                owner = self._by_number.get(value)
+                if owner is not None and owner is not contact:
+                    raise ValueError(f"\n{value}\nnumber already added ")
+            elif field == 'email':
+                owner = self._by_email.get(value)
+                if owner is not None and owner is not contact:
+                    raise ValueError(f"{value}\nmail already added")
+            self.version += 1
+            self._dirty[id(contact)] = (contact, self.version)
+            if field == 'number':
+                del self._by_number[contact.number]
+                self._by_number[value] = contact
+            elif field == 'email':
+                del self._by_email[contact.email]
+                self._by_email[value] = contact
+            else:
+                old_key = (contact.name, contact.surname)
+                new_key = (value, contact.surname) if field == 'name' else (contact.name, value)
+                self._unlink_full_name(contact, old_key)
+                self._by_full_name.setdefault(new_key, {})[id(contact)] = contact
+                if self._name_index is not None:
+                    self._name_index.move(contact, field, value)
+
+    def _unlink_full_name(self, contact, full_name):
+        # buckets are keyed by object identity, so contacts sharing a full name unlink in O(1)
+        same_name = self._by_full_name[full_name]
+        del same_name[id(contact)]
+        if not same_name:
+            del self._by_full_name[full_name]
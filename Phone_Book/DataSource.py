@@ -0,0 +1,295 @@
+from bisect import bisect_right, insort
+from itertools import islice
+
+
+class ContactDataSource:
+    """
+        Interface the contact list pages through, so it only ever reads the rows it shows.
+        count() returns the number of contacts, fetch(offset, limit) returns a list of at most limit of them.
+        """
+
+    def count(self):
+        raise NotImplementedError
+
+    def fetch(self, offset, limit):
+        raise NotImplementedError
+
+
+def contact_key(contact):
+    """
+        Returns the key a contact is tracked by in a ListDataSource, its (number, email) pair.
+        """
+    return contact.number, contact.email
+
+
+class ListDataSource(ContactDataSource):
+    """
+        Data source over a list of contacts, e.g. search results, that can be edited one contact at a time.
+        Contacts are kept in a dict by contact_key and their keys in a list of slots in display order, updated
+        in place. Removing a contact empties its slot rather than shifting the ones after it, the indexes of
+        the empty slots are kept sorted, so the slot of a position is found by bisecting them, and the slots
+        are compacted once more than half of them are empty. Adding, removing and updating one contact is O(1)
+        amortized, apart from inserting into the short sorted list of empty slots; fetching a page is
+        O(log n + limit).
+        """
+
+    def __init__(self, contacts=()):
+        self._items = {}
+        # keys in display order, None where a contact was removed
+        self._slots = []
+        self._slot_of = {}
+        self._empty = []
+        for contact in contacts:
+            self.add(contact)
+
+    def count(self):
+        return len(self._items)
+
+    def fetch(self, offset, limit):
+        slots = self._slots
+        slot = self._slot_at(offset)
+        contacts = []
+        while slot < len(slots) and len(contacts) < limit:
+            key = slots[slot]
+            if key is not None:
+                contacts.append(self._items[key])
+            slot += 1
+        return contacts
+
+    def _slot_at(self, position):
+        """
+            Returns the slot of the contact at the position: the position plus the empty slots before it.
+            """
+        empty = self._empty
+        # empty[i] - i, the position the i-th empty slot sits at, never decreases
+        return position + bisect_right(range(len(empty)), position, key=lambda i: empty[i] - i)
+
+    def __contains__(self, contact):
+        return contact_key(contact) in self._items
+
+    def add(self, contact):
+        """
+            Appends a contact, or replaces the contact with the same key where it is.
+            """
+        key = contact_key(contact)
+        if key not in self._items:
+            self._slot_of[key] = len(self._slots)
+            self._slots.append(key)
+        self._items[key] = contact
+
+    def remove(self, contact):
+        """
+            Removes the contact with the same key as the provided one, if there is one.
+            """
+        key = contact_key(contact)
+        if self._items.pop(key, None) is None:
+            return
+        slot = self._slot_of.pop(key)
+        self._slots[slot] = None
+        insort(self._empty, slot)
+        if len(self._empty) * 2 > len(self._slots):
+            self._compact()
+
+    def _compact(self):
+        self._slots = [key for key in self._slots if key is not None]
+        self._slot_of = {key: slot for slot, key in enumerate(self._slots)}
+        self._empty = []
+
+    def update(self, contact, old_key=None):
+        """
+            Replaces the contact stored under old_key (the contact's own key by default) where it is,
+            also when its number or email was edited and it moves to a new key.
+            """
+        key = contact_key(contact)
+        if old_key is not None and old_key != key:
+            if old_key not in self._items:
+                return
+            del self._items[old_key]
+            slot = self._slot_of.pop(old_key)
+            self._slots[slot] = key
+            self._slot_of[key] = slot
+        self._items[key] = contact
+
+
+class StoreDataSource(ContactDataSource):
+    """
+        Data source over a ContactStore. Contacts are read from the store lazily, only as far as the
+        furthest page fetched so far, and the cache is dropped as soon as the store's version changes.
+        If a background task changes the store mid-read, the page is read again from a snapshot of it.
+        """
+
+    def __init__(self, store):
+        self.store = store
+        self._version = None
+        self._iterator = None
+        self._cache = []
+
+    def count(self):
+        return len(self.store)
+
+    def fetch(self, offset, limit):
+        if self._version != self.store.version:
+            self._version = self.store.version
+            self._iterator = iter(self.store)
+            self._cache = []
+        missing = offset + limit - len(self._cache)
+        if missing > 0:
+            try:
+                self._cache.extend(islice(self._iterator, missing))
+            except RuntimeError:
+                # dictionary changed size during iteration
+                self._version = self.store.version
+                self._iterator = iter(self.store.snapshot())
+                self._cache = list(islice(self._iterator, offset + limit))
+        return self._cache[offset:offset + limit]
+
+
+class PlaceholderRow:
+    """
+        Stands in a list for a row that cannot be shown as a contact, so the rows after it keep their
+        positions: a row of a page that is still loading, or a database row that failed validation.
+        It has the number and email contact_key reads, None while loading, and shows its text.
+        """
+
+    __slots__ = ('text', 'number', 'email')
+
+    def __init__(self, text, number=None, email=None):
+        self.text = text
+        self.number = number
+        self.email = email
+
+    def __str__(self):
+        return self.text
+
+
+LOADING = PlaceholderRow("Loading...")
+
+
+def fetch_page_task(task, db_manager, page_size, position, token, token_position):
+    """
+        Fetches the page of the (surname, name, id) order starting at position, seeking from the page
+        starting at token_position, whose token is known. Returns the ContactPage, None past the end.
+        Runs on the database thread of a TaskRunner, task is its Task, or directly with task None.
+        """
+    if position != token_position:
+        token = db_manager.page_token_at(position, token, token_position)
+        if token is None:
+            return None
+    return db_manager.fetch_page(page_size, token, with_total=False)
+
+
+class DatabaseDataSource(ContactDataSource):
+    """
+        Data source over the 'contacts' table of a DatabaseManager, ordered by surname, name and id and read
+        one keyset page at a time as the list scrolls. Continuation tokens are remembered per page, so
+        scrolling back and forth seeks straight to a page; a jump to an unvisited part of the table looks up
+        its token by position, starting from the nearest page before it whose token is known.
+        Up to MAX_CACHED_PAGES pages are kept, the least recently used page is dropped first. The row count
+        is taken from the first page, when the source is created. A row that failed validation is shown as
+        a PlaceholderRow, so the positions of the rows after it do not depend on it.
+
+        With a TaskRunner, pages are fetched on its database thread: fetch() returns LOADING for the rows
+        of a page that is not there yet, asks for it and for the page after the last one shown, and
+        on_loaded() is called on the Tk thread once a page arrived, on_error(error) if fetching it failed.
+        Without one, pages are fetched by fetch() itself.
+        """
+
+    MAX_CACHED_PAGES = 50
+
+    def __init__(self, db_manager, first_page=None, page_size=100, task_runner=None, on_loaded=None,
+                 on_error=None):
+        self.db_manager = db_manager
+        self.page_size = page_size
+        self.task_runner = task_runner
+        self.on_loaded = on_loaded
+        self.on_error = on_error
+        if first_page is None:
+            first_page = db_manager.fetch_page(page_size)
+        self._count = first_page.total
+        self._pages = {}
+        self._tokens = {0: None}
+        self._loading = set()
+        self._store_page(0, first_page)
+
+    def count(self):
+        return self._count
+
+    def fetch(self, offset, limit):
+        limit = min(limit, self._count - offset)
+        if limit <= 0:
+            return []
+        first = offset // self.page_size
+        last = (offset + limit - 1) // self.page_size
+        contacts = []
+        for page_number in range(first, last + 1):
+            contacts.extend(self._page(page_number))
+        if self.task_runner is not None and last + 1 in self._tokens and last + 1 not in self._pages:
+            # the page after is prefetched, its token is known so it is cheap
+            self._request(last + 1)
+        start = offset - first * self.page_size
+        return contacts[start:start + limit]
+
+    def _page(self, page_number):
+        contacts = self._pages.pop(page_number, None)
+        if contacts is None:
+            if self.task_runner is not None:
+                self._request(page_number)
+                return [LOADING] * min(self.page_size, self._count - page_number * self.page_size)
+            page = fetch_page_task(None, self.db_manager, self.page_size, *self._seek(page_number))
+            if page is None:
+                return []
+            contacts = self._store_page(page_number, page)
+        # re-inserted, so the dict stays in least recently used order
+        self._pages[page_number] = contacts
+        return contacts
+
+    def _seek(self, page_number):
+        """
+            Returns the (position, token, token_position) fetch_page_task reads the page with,
+            seeking from the nearest page at or before it whose token is known.
+            """
+        known = max(number for number in self._tokens if number <= page_number)
+        return page_number * self.page_size, self._tokens[known], known * self.page_size
+
+    def _request(self, page_number):
+        """
+            Fetches the page on the database thread of the task runner, unless it is already on its way.
+            """
+        if page_number in self._loading:
+            return
+        self._loading.add(page_number)
+        self.task_runner.submit_db(fetch_page_task, self.page_size, *self._seek(page_number),
+                                   on_done=lambda page: self._page_loaded(page_number, page),
+                                   on_error=lambda error: self._page_failed(page_number, error),
+                                   on_cancel=lambda: self._loading.discard(page_number),
+                                   cancellable=False)
+
+    def _page_loaded(self, page_number, page):
+        self._loading.discard(page_number)
+        if page is None:
+            # past the end of a table that shrank, kept empty so it is not asked for again
+            self._pages[page_number] = []
+        else:
+            self._store_page(page_number, page)
+        if self.on_loaded is not None:
+            self.on_loaded()
+
+    def _page_failed(self, page_number, error):
+        self._loading.discard(page_number)
+        if self.on_error is not None:
+            self.on_error(error)
+
+    def _store_page(self, page_number, page):
+        """
+            Keeps the contacts of the page, with a PlaceholderRow where a row failed validation.
+            Returns them.
+            """
+        contacts = list(page.contacts)
+        for position, (name, surname, number, email) in page.rejected:
+            contacts.insert(position, PlaceholderRow(f"{name} {surname} (invalid)", number, email))
+        self._pages[page_number] = contacts
+        if page.next_token is not None:
+            self._tokens[page_number + 1] = page.next_token
+        while len(self._pages) > self.MAX_CACHED_PAGES:
+            del self._pages[next(iter(self._pages))]
+        return contacts
@@ -1,18 +1,458 @@
+import base64
+import json
+import os
+import re
 import sqlite3
+import sys
+import tempfile
+import threading
+import unicodedata
+from contextlib import contextmanager
+from itertools import islice
 
+import Validation
 from Contact import Contact
+from ContactExport import export_rows
+from QueryMetrics import InstrumentedConnection
+
+
+def _batched(iterable, batch_size):
+    """
+        Yields lists of up to batch_size items from the provided iterable.
+        """
+    iterator = iter(iterable)
+    batch = list(islice(iterator, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, batch_size))
+
+
+def _duplicate_column(error):
+    """
+        Returns the contacts column named in a UNIQUE constraint IntegrityError, e.g. 'email'.
+        """
+    return str(error).rsplit(".", 1)[-1]
+
+
+def _fold(text):
+    """
+        Returns the text casefolded and without diacritics, as the full-text search compares words.
+        """
+    return "".join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char)).casefold()
+
+
+# LIKE wildcards, '_' included although it is a word character, and any other character outside words
+_WILDCARD = re.compile(r"[%_]|[^\w\s]")
+
+
+def _affected_lookups(rows):
+    """
+        Returns a predicate telling whether the cached result of a search_contact or search_contacts lookup
+        may change when the provided (name, surname, number, email) rows are written or removed.
+        It errs on the side of True: a keyword counts as matching a row if each of its words appears
+        anywhere in the row, which every full-text, trigram and LIKE match of that row satisfies.
+        A keyword with a LIKE wildcard or any other character outside words, e.g. '%', 'a_b' or '@',
+        can match rows sharing no word with it and always counts as matching.
+        """
+    full_names = {(row[0], row[1]) for row in rows}
+    texts = [_fold(" ".join(row[:4])) for row in rows]
+
+    def affected(key):
+        if key[0] == 'contact':
+            return tuple(key[1].split()) in full_names
+        keyword = key[1].strip()
+        if _WILDCARD.search(keyword):
+            return True
+        words = [_fold(word) for word in re.findall(r"\w+", keyword)] or [_fold(keyword)]
+        return any(all(word in text for word in words) for text in texts)
+
+    return affected
+
+
+def _valid_rows(rows, rejected=None):
+    """
+        Yields the provided (name, surname, number, email) rows that pass validation, validated as one batch.
+        Prints an error message to stderr for every row that fails and leaves it out; rejected, if provided,
+        is a list the (index, row) pair of every row left out is appended to.
+        """
+    for index, (row, codes) in enumerate(zip(rows, Validation.validate_batch(rows))):
+        if codes is None:
+            yield row
+        else:
+            if rejected is not None:
+                rejected.append((index, row))
+            print(f"Failed to load contact: {row[0]} {row[1]}. Reason: {Validation.first_error(codes)}",
+                  file=sys.stderr)
+
+
+def _valid_contacts(rows, rejected=None):
+    """
+        Yields the provided rows that pass validation as Contact objects, like _valid_rows.
+        """
+    for row in _valid_rows(rows, rejected):
+        yield Contact.from_validated(*row)
+
+
+def _migrate_unique_indexes(cursor):
+    """
+        Schema version 1: UNIQUE indexes on number and email and a (surname, name) index.
+        Rows that would violate the new UNIQUE indexes are moved to the 'contact_conflicts' table,
+        keeping the oldest row for every number and email.
+        Returns the list of moved rows as (id, name, surname, number, email, reason) tuples.
+        """
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contact_conflicts (
+            id INTEGER PRIMARY KEY,
+            name TEXT,
+            surname TEXT,
+            number TEXT,
+            email TEXT,
+            reason TEXT
+        )
+    ''')
+    conflicts = []
+    for column in ('number', 'email'):
+        cursor.execute(f'''
+            SELECT id, name, surname, number, email
+            FROM contacts
+            WHERE {column} IS NOT NULL
+              AND id NOT IN (SELECT MIN(id) FROM contacts WHERE {column} IS NOT NULL GROUP BY {column})
+        ''')
+        reason = f"duplicate {column}"
+        duplicates = [row + (reason,) for row in cursor.fetchall()]
+        cursor.executemany("INSERT INTO contact_conflicts (id, name, surname, number, email, reason) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", duplicates)
+        cursor.executemany("DELETE FROM contacts WHERE id = ?", [(row[0],) for row in duplicates])
+        conflicts.extend(duplicates)
+
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS contacts_number ON contacts (number)")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS contacts_email ON contacts (email)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS contacts_surname_name ON contacts (surname, name)")
+    return conflicts
+
+
+def _create_fts_table(cursor, table, columns, tokenize):
+    """
+        Creates an external content FTS5 table over 'contacts' and the triggers keeping it in sync.
+        Returns False without creating anything if this SQLite build lacks FTS5 or the tokenizer.
+        """
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    try:
+        cursor.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                       f"{column_list}, content='contacts', content_rowid='id', tokenize='{tokenize}')")
+    except sqlite3.OperationalError:
+        return False
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_after_insert AFTER INSERT ON contacts BEGIN
+            INSERT INTO {table} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_after_delete AFTER DELETE ON contacts BEGIN
+            INSERT INTO {table} ({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_after_update AFTER UPDATE ON contacts BEGIN
+            INSERT INTO {table} ({table}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {table} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    ''')
+    cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('rebuild')")
+    return True
+
+
+def _migrate_full_text_search(cursor):
+    """
+        Schema version 2: FTS5 indexes mirroring 'contacts' for DatabaseManager.search_contacts.
+        'contacts_fts' tokenizes every column for ranked token and prefix matches,
+        'contacts_number_trigram' indexes numbers by trigram for substring matches inside them.
+        On SQLite builds without FTS5 nothing is created and searches keep using LIKE.
+        """
+    _create_fts_table(cursor, 'contacts_fts', ('name', 'surname', 'number', 'email'), 'unicode61')
+    _create_fts_table(cursor, 'contacts_number_trigram', ('number',), 'trigram')
+    return []
+
+
+def _migrate_sync_columns(cursor):
+    """
+        Schema version 3: change tracking for SyncEngine.
+        Every write stamps the rows it touches with a new revision from 'sync_state' in 'updated_at',
+        and deleted rows leave a tombstone with the revision of the delete in 'contact_tombstones'.
+        Rows from before the migration have revision 0.
+        """
+    cursor.execute("ALTER TABLE contacts ADD COLUMN updated_at INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("CREATE INDEX IF NOT EXISTS contacts_updated_at ON contacts (updated_at)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS contact_tombstones (
+            id INTEGER PRIMARY KEY,
+            number TEXT,
+            email TEXT,
+            updated_at INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS contact_tombstones_updated_at ON contact_tombstones (updated_at)")
+    cursor.execute("CREATE TABLE IF NOT EXISTS sync_state (revision INTEGER NOT NULL)")
+    cursor.execute("INSERT INTO sync_state (revision) VALUES (0)")
+    return []
+
+
+def _migrate_sort_key_index(cursor):
+    """
+        Schema version 4: an index on the fetch_page sort key, surname and name with NULL as ''.
+        Rows with a NULL surname or name would otherwise never match the keyset comparison of a page token.
+        """
+    cursor.execute("CREATE INDEX IF NOT EXISTS contacts_sort_key "
+                   "ON contacts (COALESCE(surname, ''), COALESCE(name, ''))")
+    return []
+
+
+# Schema migrations in order, migration N upgrades a database from user_version N - 1 to N
+MIGRATIONS = [
+    _migrate_unique_indexes,
+    _migrate_full_text_search,
+    _migrate_sync_columns,
+    _migrate_sort_key_index,
+]
+
+# The (surname, name, id) order of fetch_page, a NULL surname or name sorts as '' so it has a page token
+_SORT_KEY = "COALESCE(surname, ''), COALESCE(name, ''), id"
+# Seeks the contacts_sort_key index past a page token; the leading range on the surname alone is what lets
+# SQLite search the expression index, the row value comparison then skips the rest of that surname
+_AFTER_TOKEN = f"COALESCE(surname, '') >= ? AND ({_SORT_KEY}) > (?, ?, ?)"
+
+# Smallest keyword the trigram tokenizer can match, shorter number searches fall back to LIKE
+TRIGRAM_LENGTH = 3
+
+
+class BackupReport:
+    """
+        Per-row outcome of DatabaseManager.backup.
+        'accepted' lists the Contact objects that were backed up, 'rejected' lists
+        (contact, reason) pairs for the contacts that were skipped.
+        """
+
+    def __init__(self):
+        self.accepted = []
+        self.rejected = []
+
+    def accept(self, contact):
+        self.accepted.append(contact)
+
+    def reject(self, contact, reason):
+        self.rejected.append((contact, reason))
+
+    def __str__(self):
+        return f"{len(self.accepted)} backed up, {len(self.rejected)} rejected"
+
+
+class ContactPage:
+    """
+        One page of DatabaseManager.fetch_page.
+        'contacts' lists the page's Contact objects, 'total' is the number of contacts in the table
+        (None if it was not counted) and 'next_token' continues after this page, None on the last page.
+        'rejected' lists the rows of the page that failed validation and are not in 'contacts',
+        as (position in the page, (name, surname, number, email)) pairs.
+        """
+
+    def __init__(self, contacts, total, next_token, rejected=()):
+        self.contacts = contacts
+        self.total = total
+        self.next_token = next_token
+        self.rejected = rejected
+
+    def __iter__(self):
+        return iter(self.contacts)
+
+    def __len__(self):
+        return len(self.contacts)
+
+
+def _encode_page_token(key):
+    """
+        Encodes a (surname, name, id) sort key as an opaque continuation token.
+        """
+    return base64.urlsafe_b64encode(json.dumps(key, ensure_ascii=False).encode()).decode()
+
+
+def _decode_page_token(token):
+    """
+        Decodes a continuation token back into its (surname, name, id) sort key.
+        Raises a ValueError if the token is not one fetch_page handed out.
+        """
+    try:
+        surname, name, contact_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid page token") from e
+    if not (isinstance(surname, str) and isinstance(name, str) and isinstance(contact_id, int)):
+        raise ValueError("Invalid page token")
+    return surname, name, contact_id
+
+
+def _token_params(token):
+    """
+        Returns the parameters of _AFTER_TOKEN for a continuation token.
+        """
+    surname, name, contact_id = _decode_page_token(token)
+    return surname, surname, name, contact_id
 
 
 class DatabaseManager:
     """
         Initializes the DatabaseManager object and establishes a connection to the SQLite database.
         If no database name is provided, 'contacts_database.db' is used as the default.
+
+        Every thread that uses the manager gets its own pooled connection and cursor, so it can be shared
+        between the GUI thread and worker threads. The database runs in WAL journal mode, where readers
+        do not block the writer and the writer does not block readers.
+        'generation' goes up after every committed write transaction, so caches of query results can tell
+        they are stale without asking the database.
+        With a QueryMetrics provided as metrics, every statement run on the manager's connections is timed
+        and slow ones are logged with their query plan; without one the connections are plain sqlite3 ones.
+        With a QueryCache provided as cache, search_contact and search_contacts results are cached until a
+        committed write may change them: insert_contact and update_contact only drop the results their rows
+        can affect, any other write drops them all.
         """
 
-    def __init__(self, db_name='contacts_database.db'):
-        self.connection = sqlite3.connect(db_name)
-        self.cursor = self.connection.cursor()
+    # applied to every new connection; synchronous=NORMAL is durable across crashes of the app in WAL mode
+    PRAGMAS = {
+        'synchronous': 'NORMAL',
+        'cache_size': -16384,  # KiB, 16 MiB per connection
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    }
+    # prepared statements kept per connection, the module default is 128
+    CACHED_STATEMENTS = 256
+    # seconds a connection waits for another one's write lock before raising 'database is locked'
+    BUSY_TIMEOUT = 10.0
+
+    def __init__(self, db_name='contacts_database.db', journal_mode='WAL', metrics=None, cache=None):
+        self.db_name = db_name
+        self.journal_mode = journal_mode
+        self.metrics = metrics
+        self.cache = cache
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self.generation = 0
         self.create_table()
+        self.migration_conflicts = self.migrate()
+        self.full_text_tables = self._existing_tables('contacts_fts', 'contacts_number_trigram')
+
+    @property
+    def connection(self):
+        """
+            The calling thread's connection, opened on first use.
+            """
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            if self.db_name == ':memory:' and self._connections:
+                # an in-memory database only exists inside its one connection, so there every thread shares it
+                connection = self._local.connection = self._connections[0]
+            else:
+                connection = self._local.connection = self._connect()
+            self._local.cursor = connection.cursor()
+            self._local.depth = 0
+            self._local.revision = None
+            self._local.changes = None
+        return connection
+
+    @property
+    def cursor(self):
+        """
+            The calling thread's cursor.
+            """
+        self.connection
+        return self._local.cursor
+
+    def _connect(self):
+        """
+            Opens a new connection with the journal mode and pragmas of this manager and adds it to the pool.
+            """
+        # each connection is only ever used by the thread that opened it,
+        # check_same_thread is off so close_connection can close all of them
+        if self.metrics is None:
+            connection = sqlite3.connect(self.db_name, timeout=self.BUSY_TIMEOUT, check_same_thread=False,
+                                         cached_statements=self.CACHED_STATEMENTS)
+        else:
+            connection = sqlite3.connect(self.db_name, timeout=self.BUSY_TIMEOUT, check_same_thread=False,
+                                         cached_statements=self.CACHED_STATEMENTS, factory=InstrumentedConnection)
+            connection.metrics = self.metrics
+        connection.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        for pragma, value in self.PRAGMAS.items():
+            connection.execute(f"PRAGMA {pragma} = {value}")
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    @contextmanager
+    def transaction(self, changes=None):
+        """
+            Runs the body of a with block in a write transaction on the calling thread's connection,
+            committed when the block ends and rolled back if it raises. Yields the thread's cursor.
+            Nested transaction blocks join the outermost one.
+            changes, if provided, is a list the body fills with the (name, surname, number, email) rows of
+            every contact it writes, before and after the write; on commit the cache then only drops the
+            results these rows can affect. Without it the commit drops every cached result.
+            """
+        connection = self.connection
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield self._local.cursor
+            finally:
+                self._local.depth -= 1
+            # a nested block's writes are committed with the outer one
+            if self._local.changes is not None:
+                if changes is None:
+                    self._local.changes = None
+                else:
+                    self._local.changes.extend(changes)
+            return
+        # IMMEDIATE takes the write lock up front, so two writers never deadlock upgrading a read lock
+        self._local.cursor.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        self._local.changes = changes
+        try:
+            yield self._local.cursor
+        except BaseException:
+            connection.rollback()
+            raise
+        else:
+            connection.commit()
+            changes = self._local.changes
+            with self._connections_lock:
+                self.generation += 1
+                if self.cache is not None:
+                    self.cache.advance(self.generation, None if changes is None else _affected_lookups(changes))
+        finally:
+            self._local.depth = 0
+            self._local.revision = None
+            self._local.changes = None
+
+    def _cached(self, key, load, *args):
+        """
+            Returns load(*args) through the cache, if the manager has one.
+            """
+        # inside a transaction the thread sees its own uncommitted writes, which a rollback would undo
+        if self.cache is None or getattr(self._local, 'depth', 0):
+            return load(*args)
+        return self.cache.get(key, self.generation, load, *args)
+
+    def _revision(self):
+        """
+            Returns the revision the calling thread's open transaction stamps its writes with,
+            taking the next one from 'sync_state' on first use. Call it before executing a statement
+            whose cursor state (lastrowid, rowcount) is still needed, it runs on the thread's cursor.
+            """
+        revision = self._local.revision
+        if revision is None:
+            self.cursor.execute("UPDATE sync_state SET revision = revision + 1")
+            self.cursor.execute("SELECT revision FROM sync_state")
+            revision = self._local.revision = self.cursor.fetchone()[0]
+        return revision
 
     """
         Creates the 'contacts' table in the database if it does not already exist.
@@ -31,94 +471,364 @@ class DatabaseManager:
         '''
         self.cursor.execute(create_table_query)
 
+    def migrate(self):
+        """
+            Upgrades the database schema in place to the latest version, tracked in PRAGMA user_version.
+            Each pending migration runs in its own transaction together with the version bump. The version
+            is read again once the transaction holds the write lock, so a migration another process applied
+            meanwhile, e.g. the GUI and cli.py opening an old database at the same time, is skipped.
+            Returns the list of conflicting rows the migrations moved aside, empty if there were none.
+            """
+        conflicts = []
+        self.cursor.execute("PRAGMA user_version")
+        version = self.cursor.fetchone()[0]
+        for target_version, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            with self.transaction() as cursor:
+                cursor.execute("PRAGMA user_version")
+                if cursor.fetchone()[0] >= target_version:
+                    continue
+                conflicts.extend(migration(cursor))
+                cursor.execute(f"PRAGMA user_version = {target_version}")
+        return conflicts
+
+    def _existing_tables(self, *tables):
+        """
+            Returns the set of the provided table names that exist in the database.
+            """
+        placeholders = ", ".join("?" * len(tables))
+        self.cursor.execute(f"SELECT name FROM sqlite_master WHERE name IN ({placeholders})", tables)
+        return {row[0] for row in self.cursor.fetchall()}
+
     def insert_contact(self, name, surname, number, email):
         """
            Inserts a new contact into the 'contacts' table with the provided name, surname, number, and email.
            Raises a ValueError if a contact with the same email or number already exists in the table.
            Returns the ID of the newly inserted contact.
            """
-        self.cursor.execute("SELECT COUNT(*) FROM contacts WHERE email = ?", (email,))
-        result = self.cursor.fetchone()
-        if result[0] > 0:
-            raise ValueError("Contact with the same \nemail already exists")
-
-        # Check if contact with the same number exists
-        self.cursor.execute("SELECT COUNT(*) FROM contacts WHERE number = ?", (number,))
-        result = self.cursor.fetchone()
-        if result[0] > 0:
-            raise ValueError("Contact with the same \nnumber already exists")
-
-        # Insert the new contact
-        self.cursor.execute("INSERT INTO contacts (name, surname, number, email) VALUES (?, ?, ?, ?)",
-                            (name, surname, number, email))
-        self.connection.commit()
-        contact_id = self.cursor.lastrowid
+        try:
+            with self.transaction([(name, surname, number, email)]) as cursor:
+                revision = self._revision()
+                cursor.execute("INSERT INTO contacts (name, surname, number, email, updated_at) "
+                               "VALUES (?, ?, ?, ?, ?)", (name, surname, number, email, revision))
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Contact with the same \n{_duplicate_column(e)} already exists") from e
+        contact_id = cursor.lastrowid
 
         return contact_id
 
+    def insert_contacts(self, rows):
+        """
+           Inserts several (name, surname, number, email) rows into the 'contacts' table in one transaction.
+           Each row is inserted under its own savepoint, so a duplicate only undoes that row.
+           Returns a list with, for each row, the ID of the new contact or the ValueError insert_contact
+           would have raised for it.
+           """
+        results = []
+        if not rows:
+            return results
+        with self.transaction() as cursor:
+            revision = self._revision()
+            for row in rows:
+                cursor.execute("SAVEPOINT insert_contact")
+                try:
+                    cursor.execute("INSERT INTO contacts (name, surname, number, email, updated_at) "
+                                   "VALUES (?, ?, ?, ?, ?)", tuple(row) + (revision,))
+                except sqlite3.IntegrityError as e:
+                    cursor.execute("ROLLBACK TO insert_contact")
+                    results.append(ValueError(f"Contact with the same \n{_duplicate_column(e)} already exists"))
+                else:
+                    results.append(cursor.lastrowid)
+                cursor.execute("RELEASE insert_contact")
+        return results
+
     def download_contacts(self):
         """
             Fetches all contacts from the 'contacts' table and returns them as a list of Contact objects.
-            Prints status messages for each contact that is successfully inserted, and prints error messages
-            for contacts that fail to insert due to validation errors.
+            Prints error messages for contacts that fail to load due to validation errors.
+            Use iter_contacts to process the contacts without holding all of them in memory.
             """
-        self.cursor.execute("SELECT name, surname, number, email FROM contacts")
-        rows = self.cursor.fetchall()
+        return list(self.iter_contacts())
+
+    def iter_rows(self, query, params=(), batch_size=500):
+        """
+            Runs the query on a cursor of its own and yields its rows as tuples, reading batch_size rows at a time,
+            so the calling thread's shared cursor stays free while the rows are consumed.
+            """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(query, params)
+            rows = cursor.fetchmany(batch_size)
+            while rows:
+                yield from rows
+                rows = cursor.fetchmany(batch_size)
+        finally:
+            cursor.close()
 
-        contacts2 = []
-        for row in rows:
-            name, surname, number, email = row
+    def export_to_csv(self, filename, compression='auto', batch_size=1000, progress=None):
+        """
+            Exports the 'contacts' table, in id order, to a CSV file with the provided filename.
+            Rows go from the cursor to the file batch_size at a time without becoming Contact objects,
+            so memory use stays the same however large the table is. compression and progress are passed
+            on to ContactExport.export_rows, by default a .gz or .xz filename is compressed.
+            Returns an ExportReport describing the export.
+            """
+        rows = self.iter_rows("SELECT name, surname, number, email FROM contacts ORDER BY id", (), batch_size)
+        return export_rows(filename, rows, compression, batch_size, progress)
+
+    def copy_to(self, filename, pages=1024, progress=None):
+        """
+            Writes a consistent copy of the database to filename with SQLite's online backup, pages pages at
+            a time, so writes on other connections are only held up for one step. The copy is written next
+            to filename and moved over it when complete. progress, if provided, is called after every step
+            with (status, remaining pages, total pages).
+            Returns the number of pages copied.
+            """
+        directory = os.path.dirname(os.path.abspath(filename))
+        descriptor, temporary = tempfile.mkstemp(prefix=".contacts-", suffix=".tmp", dir=directory)
+        os.close(descriptor)
+        try:
+            target = sqlite3.connect(temporary)
+            try:
+                self.connection.backup(target, pages=pages, progress=progress)
+                # a copy in rollback journal mode is one self-contained file
+                target.execute("PRAGMA journal_mode = DELETE")
+                page_count = target.execute("PRAGMA page_count").fetchone()[0]
+            finally:
+                target.close()
+            os.replace(temporary, filename)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return page_count
+
+    def restore_from(self, filename, pages=1024, progress=None):
+        """
+            Replaces the contents of the database with the copy in filename, made by copy_to, pages pages at
+            a time; progress is called like by copy_to. An older copy is migrated to the current schema.
+            Raises a ValueError if filename is not an intact contacts database, in which case nothing is
+            changed. Must not be called while other threads are using the manager.
+            Returns the number of pages restored.
+            """
+        if not os.path.isfile(filename):
+            raise ValueError(f"No such backup: {filename}")
+        source = sqlite3.connect(f"file:{filename}?mode=ro", uri=True)
+        try:
             try:
-                contact = Contact(name, surname, number, email)
-                print(f"Inserted contact: {name} {surname}")
-                contacts2.append(contact)
-            except ValueError as e:
-                print(f"Failed to insert contact: {name} {surname}. Reason: {str(e)}")
+                check = source.execute("PRAGMA quick_check").fetchone()[0]
+                has_contacts = source.execute("SELECT 1 FROM sqlite_master WHERE name = 'contacts'").fetchone()
+            except sqlite3.DatabaseError as e:
+                raise ValueError(f"{filename} is not a contacts database: {e}") from e
+            if check != 'ok' or has_contacts is None:
+                raise ValueError(f"{filename} is not an intact contacts database")
+            page_count = source.execute("PRAGMA page_count").fetchone()[0]
+            source.backup(self.connection, pages=pages, progress=progress)
+        finally:
+            source.close()
+        self.migration_conflicts = self.migrate()
+        self.full_text_tables = self._existing_tables('contacts_fts', 'contacts_number_trigram')
+        with self._connections_lock:
+            self.generation += 1
+            if self.cache is not None:
+                self.cache.advance(self.generation)
+        return page_count
+
+    def iter_contacts(self, batch_size=500):
+        """
+            Yields every contact in the 'contacts' table as a Contact object, in id order, reading and
+            validating batch_size rows at a time. Prints error messages for rows that fail validation.
+            """
+        yield from self._iter_valid_contacts("SELECT name, surname, number, email FROM contacts ORDER BY id", (),
+                                             batch_size)
+
+    def iter_search_contacts(self, keyword, limit=None, offset=0, batch_size=500):
+        """
+            Yields the contacts search_contacts returns for the keyword, in the same order,
+            reading and validating batch_size rows at a time.
+            """
+        query, params = self._search_query(keyword, limit, offset)
+        yield from self._iter_valid_contacts(query, params, batch_size)
+
+    def _iter_valid_contacts(self, query, params, batch_size):
+        """
+            Yields the rows of the query as Contact objects, validating one batch of rows at a time.
+            """
+        for row in self._iter_valid_rows(query, params, batch_size):
+            yield Contact.from_validated(*row)
+
+    def _iter_valid_rows(self, query, params, batch_size=500):
+        """
+            Yields the rows of the query that pass validation, validating one batch of rows at a time.
+            """
+        rows = self.iter_rows(query, params, batch_size)
+        batch = list(islice(rows, batch_size))
+        while batch:
+            yield from _valid_rows(batch)
+            batch = list(islice(rows, batch_size))
+
+    def count_contacts(self):
+        """
+            Returns the number of contacts in the 'contacts' table.
+            """
+        self.cursor.execute("SELECT COUNT(*) FROM contacts")
+        return self.cursor.fetchone()[0]
+
+    def fetch_contacts(self, limit, offset=0):
+        """
+            Fetches one page of contacts from the 'contacts' table, in id order.
+            Returns a list of at most limit Contact objects, skipping the first offset contacts.
+            Prints error messages for rows that fail validation and leaves them out.
+            """
+        self.cursor.execute("SELECT name, surname, number, email FROM contacts ORDER BY id LIMIT ? OFFSET ?",
+                            (limit, offset))
+        return list(_valid_contacts(self.cursor.fetchall()))
+
+    def fetch_page(self, page_size=100, token=None, with_total=True):
+        """
+            Fetches one page of contacts from the 'contacts' table, ordered by surname, name and id, a NULL
+            surname or name sorting as ''. token is the next_token of the previous page, or None for the
+            first page. Pages are found by seeking the contacts_sort_key index to the last key of the
+            previous page, so every page is as fast as the first no matter how deep into the table it is.
+            Returns a ContactPage; its total is only counted when with_total is True. Rows that fail
+            validation are left out of the page's contacts, with an error message printed, like by
+            iter_contacts, and listed in its 'rejected'.
+            Raises a ValueError if the token is invalid.
+            """
+        if token is None:
+            self.cursor.execute(f"SELECT id, name, surname, number, email FROM contacts "
+                                f"ORDER BY {_SORT_KEY} LIMIT ?", (page_size,))
+        else:
+            self.cursor.execute(f"SELECT id, name, surname, number, email FROM contacts WHERE {_AFTER_TOKEN} "
+                                f"ORDER BY {_SORT_KEY} LIMIT ?", _token_params(token) + (page_size,))
+        rows = self.cursor.fetchall()
+        rejected = []
+        contacts = list(_valid_contacts([row[1:] for row in rows], rejected))
+        next_token = None
+        if len(rows) == page_size:
+            contact_id, name, surname = rows[-1][:3]
+            next_token = _encode_page_token((surname or '', name or '', contact_id))
+        total = self.count_contacts() if with_total else None
+        return ContactPage(contacts, total, next_token, rejected)
 
-        return contacts2
+    def page_token_at(self, position, token=None, token_position=0):
+        """
+            Returns the token fetch_page continues with to start a page at the provided position
+            of the (surname, name, id) order, None for position 0 or past the end of the table.
+            The row before the position is found by stepping through the index, which is cheaper than
+            an OFFSET over the full rows but still linear, so use it only to jump, not to page.
+            With a token of an earlier page, starting at token_position, the steps start from that page,
+            so a jump only costs the distance from the nearest page whose token is known.
+            Raises a ValueError if the position is before token_position or the token is invalid.
+            """
+        if position <= 0:
+            return None
+        if position <= token_position:
+            if position < token_position:
+                raise ValueError("position is before the page of the token")
+            return token
+        # only the id is stepped over, it is in the index, the sort key of the one row found is read after
+        if token is None:
+            self.cursor.execute(f"SELECT id FROM contacts ORDER BY {_SORT_KEY} LIMIT 1 OFFSET ?", (position - 1,))
+        else:
+            self.cursor.execute(f"SELECT id FROM contacts WHERE {_AFTER_TOKEN} ORDER BY {_SORT_KEY} LIMIT 1 OFFSET ?",
+                                _token_params(token) + (position - token_position - 1,))
+        row = self.cursor.fetchone()
+        if row is not None:
+            self.cursor.execute(f"SELECT {_SORT_KEY} FROM contacts WHERE id = ?", row)
+            row = self.cursor.fetchone()
+        return None if row is None else _encode_page_token(row)
 
     def search_contact(self, full_name):
         """
             Searches for a contact with the provided full name in the 'contacts' table.
             Returns the matching Contact object if found, None otherwise.
         """
+        row = self._cached(('contact', full_name), self._search_contact, full_name)
+        # a new Contact on every call, so a caller editing it does not change what later lookups return
+        return None if row is None else Contact(*row)
+
+    def _search_contact(self, full_name):
         name, surname = full_name.split()
         query = '''
             SELECT name, surname, number, email
             FROM contacts
             WHERE name = ? AND surname = ?
+            LIMIT 1
         '''
+        # with LIMIT 1 the statement is done after the one row, an unfinished one would keep the
+        # thread's connection reading the snapshot it started in, and a cache would keep what it read
         self.cursor.execute(query, (name, surname))
-        row = self.cursor.fetchone()
+        return self.cursor.fetchone()
 
-        if row:
-            name, surname, number, email = row
-            contact = Contact(name, surname, number, email)
-            return contact
+    def search_contacts(self, keyword, limit=None, offset=0):
+        """
+            Searches for contacts in the 'contacts' table based on the provided keyword.
+            Every word of the keyword must prefix-match a word of the name, surname, number or email;
+            a keyword made of digits instead matches anywhere inside the number.
+            Results are ranked best match first, limit and offset select a page of them.
+            Falls back to a LIKE scan when the full-text tables are unavailable.
+            Returns a list of Contact objects that match the keyword.
+            """
+        rows = self._cached(('keyword', keyword, limit, offset), self._search_contacts, keyword, limit, offset)
+        # new Contacts on every call, so a caller editing one does not change what later lookups return
+        return [Contact.from_validated(*row) for row in rows]
 
-        return None
+    def _search_contacts(self, keyword, limit, offset):
+        """
+            Returns the rows search_contacts makes its contacts of, as a tuple of validated rows.
+            """
+        query, params = self._search_query(keyword, limit, offset)
+        return tuple(self._iter_valid_rows(query, params))
 
-    def search_contacts(self, keyword):
+    def _search_query(self, keyword, limit=None, offset=0):
         """
-            Searches for contacts in the 'contacts' table based on the provided keyword.
-            Returns a list of Contact objects that match the keyword in name, surname, number, or email.
+            Returns the (query, params) pair search_contacts runs for the provided keyword and page.
+            """
+        keyword = keyword.strip()
+        page = (-1 if limit is None else limit, offset)
+        words = re.findall(r"\w+", keyword)
+        if not keyword:
+            query = "SELECT name, surname, number, email FROM contacts LIMIT ? OFFSET ?"
+            params = page
+        elif keyword.isdigit() and 'contacts_number_trigram' in self.full_text_tables:
+            if len(keyword) < TRIGRAM_LENGTH:
+                query = "SELECT name, surname, number, email FROM contacts WHERE number LIKE ? LIMIT ? OFFSET ?"
+                params = (f"%{keyword}%",) + page
+            else:
+                query = '''
+                    SELECT contacts.name, contacts.surname, contacts.number, contacts.email
+                    FROM contacts_number_trigram
+                    JOIN contacts ON contacts.id = contacts_number_trigram.rowid
+                    WHERE contacts_number_trigram MATCH ?
+                    ORDER BY rank
+                    LIMIT ? OFFSET ?
+                '''
+                params = (f'"{keyword}"',) + page
+        elif words and 'contacts_fts' in self.full_text_tables:
+            query = '''
+                SELECT contacts.name, contacts.surname, contacts.number, contacts.email
+                FROM contacts_fts
+                JOIN contacts ON contacts.id = contacts_fts.rowid
+                WHERE contacts_fts MATCH ?
+                ORDER BY rank
+                LIMIT ? OFFSET ?
+            '''
+            params = (" ".join(f'"{word}"*' for word in words),) + page
+        else:
+            return self._like_query(keyword, limit, offset)
+        return query, params
+
+    def _like_query(self, keyword, limit=None, offset=0):
+        """
+            Returns the (query, params) pair of a LIKE scan for the keyword over every column.
             """
         query = '''
             SELECT name, surname, number, email
             FROM contacts
             WHERE name LIKE ? OR surname LIKE ? OR number LIKE ? OR email LIKE ?
+            LIMIT ? OFFSET ?
         '''
         pattern = f"%{keyword}%"
-        self.cursor.execute(query, (pattern, pattern, pattern, pattern))
-        rows = self.cursor.fetchall()
-
-        contacts = []
-        for row in rows:
-            name, surname, number, email = row
-            contact = Contact(name, surname, number, email)
-            contacts.append(contact)
-
-        return contacts
+        return query, (pattern, pattern, pattern, pattern, -1 if limit is None else limit, offset)
 
     def update_contact(self, email, number, new_name, new_surname, new_number, new_email):
         """
@@ -126,54 +836,154 @@ class DatabaseManager:
         with the new name, surname, number, and email.
         Returns True if the contact was successfully updated, False otherwise.
         """
-        # Check if the new email is already taken
-        self.cursor.execute("SELECT COUNT(*) FROM contacts WHERE email = ? AND (number != ? OR email != ?)",
-                            (new_email, number, email))
-        result = self.cursor.fetchone()
-        if result[0] > 0:
-            raise ValueError("Contact with the same email already exists")
-
-        # Check if the new number is already taken
-        self.cursor.execute("SELECT COUNT(*) FROM contacts WHERE number = ? AND (email != ? OR number != ?)",
-                            (new_number, email, number))
-        result = self.cursor.fetchone()
-        if result[0] > 0:
-            raise ValueError("Contact with the same number already exists")
-
-        # Update the contact
         query = '''
             UPDATE contacts
-            SET name = ?, surname = ?, number = ?, email = ?
+            SET name = ?, surname = ?, number = ?, email = ?, updated_at = ?
             WHERE email = ? AND number = ?
         '''
-        params = (new_name, new_surname, new_number, new_email, email, number)
-        self.cursor.execute(query, params)
-        self.connection.commit()
+        # only needed to drop the cached results that list the contact as it was
+        changes = [] if self.cache is not None else None
+        # the UNIQUE indexes reject a new email or number that belongs to another contact
+        try:
+            with self.transaction(changes) as cursor:
+                if changes is not None:
+                    cursor.execute("SELECT name, surname, number, email FROM contacts WHERE email = ? AND number = ?",
+                                   (email, number))
+                    changes.extend(cursor.fetchall())
+                    changes.append((new_name, new_surname, new_number, new_email))
+                params = (new_name, new_surname, new_number, new_email, self._revision(), email, number)
+                cursor.execute(query, params)
+        except sqlite3.IntegrityError as e:
+            raise ValueError(f"Contact with the same {_duplicate_column(e)} already exists") from e
 
-        if self.cursor.rowcount > 0:
+        if cursor.rowcount > 0:
             return True
         else:
             return False
 
-    def backup(self, contacts):
+    def backup(self, contacts, batch_size=500, progress=None):
         """
-           Creates a backup of the provided list of Contact objects by inserting them into the 'contacts' table.
-           Prints status messages for each contact that is successfully backed up, and prints error messages
-           for contacts that fail to back up due to validation errors.
-           Returns a list of Contact objects that were successfully backed up.
+           Creates a backup of the provided Contact objects by inserting them into the 'contacts' table.
+           Contacts are checked for duplicates a batch at a time with one set-based query per column and
+           inserted with executemany, all inside a single transaction that is committed once at the end.
+           batch_size must stay below SQLite's limit on host parameters per statement (999 on old builds).
+           progress, if provided, is called with the report after every batch; an exception raised from it
+           rolls the whole backup back.
+           Returns a BackupReport listing which contacts were backed up and which were rejected and why.
            """
-        backup_contacts = []
-        for contact in contacts:
-            try:
-                self.insert_contact(contact.name, contact.surname, contact.number, contact.email)
-                backup_contacts.append(contact)
-            except ValueError as e:
-                print(f"Failed to backup contact: {contact}. Reason: {str(e)}")
+        report = BackupReport()
+        seen_emails = set()
+        seen_numbers = set()
+        with self.transaction() as cursor:
+            revision = self._revision()
+            for batch in _batched(contacts, batch_size):
+                existing_emails = self._existing_values('email', [contact.email for contact in batch])
+                existing_numbers = self._existing_values('number', [contact.number for contact in batch])
+                rows = []
+                for contact in batch:
+                    if contact.email in existing_emails or contact.email in seen_emails:
+                        report.reject(contact, "Contact with the same \nemail already exists")
+                    elif contact.number in existing_numbers or contact.number in seen_numbers:
+                        report.reject(contact, "Contact with the same \nnumber already exists")
+                    else:
+                        seen_emails.add(contact.email)
+                        seen_numbers.add(contact.number)
+                        rows.append((contact.name, contact.surname, contact.number, contact.email, revision))
+                        report.accept(contact)
+                cursor.executemany("INSERT INTO contacts (name, surname, number, email, updated_at) "
+                                   "VALUES (?, ?, ?, ?, ?)", rows)
+                if progress is not None:
+                    progress(report)
+
+        return report
+
+    def _existing_values(self, column, values):
+        """
+            Returns the set of the provided values that are already stored in the given column.
+            """
+        placeholders = ", ".join("?" * len(values))
+        self.cursor.execute(f"SELECT {column} FROM contacts WHERE {column} IN ({placeholders})", values)
+        return {row[0] for row in self.cursor.fetchall()}
+
+    def sync_revision(self):
+        """
+            Returns the latest revision written to the database.
+            """
+        self.cursor.execute("SELECT revision FROM sync_state")
+        return self.cursor.fetchone()[0]
 
-        return backup_contacts
+    def changes_since(self, revision, batch_size=500):
+        """
+            Returns the changes written after the provided revision, oldest first, as a pair of iterators
+            streaming batch_size rows at a time like iter_rows: (id, name, surname, number, email, updated_at)
+            rows that were inserted or updated, and (id, number, email, updated_at) tombstones of rows that
+            were deleted.
+            """
+        rows = self.iter_rows("SELECT id, name, surname, number, email, updated_at FROM contacts "
+                              "WHERE updated_at > ? ORDER BY updated_at, id", (revision,), batch_size)
+        tombstones = self.iter_rows("SELECT id, number, email, updated_at FROM contact_tombstones "
+                                    "WHERE updated_at > ? ORDER BY updated_at, id", (revision,), batch_size)
+        return rows, tombstones
+
+    def sync_rows(self, column, values, batch_size=500):
+        """
+            Looks up the rows whose id, number or email (column) is one of the provided values.
+            Returns a dict from value to its (id, name, surname, number, email, updated_at) row.
+            """
+        rows = {}
+        position = ('id', 'name', 'surname', 'number', 'email').index(column)
+        for batch in _batched(values, batch_size):
+            placeholders = ", ".join("?" * len(batch))
+            self.cursor.execute(f"SELECT id, name, surname, number, email, updated_at FROM contacts "
+                                f"WHERE {column} IN ({placeholders})", batch)
+            rows.update((row[position], row) for row in self.cursor.fetchall())
+        return rows
+
+    def update_contacts_by_id(self, rows):
+        """
+           Updates several (id, name, surname, number, email) rows in one transaction, each under its own savepoint.
+           Returns a list with, for each row, True or the ValueError update_contact would have raised for it.
+           """
+        results = []
+        if not rows:
+            return results
+        with self.transaction() as cursor:
+            revision = self._revision()
+            for contact_id, name, surname, number, email in rows:
+                cursor.execute("SAVEPOINT update_contact")
+                try:
+                    cursor.execute("UPDATE contacts SET name = ?, surname = ?, number = ?, email = ?, updated_at = ? "
+                                   "WHERE id = ?", (name, surname, number, email, revision, contact_id))
+                except sqlite3.IntegrityError as e:
+                    cursor.execute("ROLLBACK TO update_contact")
+                    results.append(ValueError(f"Contact with the same {_duplicate_column(e)} already exists"))
+                else:
+                    results.append(True)
+                cursor.execute("RELEASE update_contact")
+        return results
+
+    def delete_contacts_by_id(self, ids):
+        """
+            Deletes the rows with the provided ids in one transaction, leaving a tombstone for each.
+            """
+        if not ids:
+            return
+        with self.transaction() as cursor:
+            revision = self._revision()
+            for batch in _batched(ids, 500):
+                placeholders = ", ".join("?" * len(batch))
+                cursor.execute(f"INSERT OR REPLACE INTO contact_tombstones (id, number, email, updated_at) "
+                               f"SELECT id, number, email, ? FROM contacts WHERE id IN ({placeholders})",
+                               [revision] + batch)
+                cursor.execute(f"DELETE FROM contacts WHERE id IN ({placeholders})", batch)
 
     def close_connection(self):
         """
-            Closes the connection to the SQLite database.
+            Closes every pooled connection to the SQLite database.
+            Must not be called while other threads are still using the manager.
             """
-        self.connection.close()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
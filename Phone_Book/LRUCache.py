@@ -0,0 +1,87 @@
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+        Mapping of at most maxsize entries that evicts the least recently used entry when a new one
+        does not fit. With a ttl, entries also expire ttl seconds after they were put.
+        Hits, misses, evictions and expirations are counted to help size the cache, see stats().
+        Not thread-safe, each cache is meant to be used from one thread.
+        """
+
+    def __init__(self, maxsize=128, ttl=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        # key -> (value, time it expires at or None)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and (entry[1] is None or entry[1] > self.clock())
+
+    def get(self, key, default=None):
+        """
+            Returns the value cached for key, marking it as the most recently used, or default.
+            """
+        try:
+            value, expires = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        if expires is not None and expires <= self.clock():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+            Caches value for key, evicting the least recently used entry if the cache is full.
+            """
+        self._entries[key] = (value, None if self.ttl is None else self.clock() + self.ttl)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def keys(self):
+        """
+            Returns a view of the cached keys, least recently used first, including expired ones.
+            """
+        return self._entries.keys()
+
+    def discard(self, key):
+        """
+            Removes the entry for key, if there is one.
+            """
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        """
+            Returns a dict of the size of the cache and its counters, with the share of lookups that hit.
+            """
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,70 @@
+from LRUCache import LRUCache
+from NameIndex import SCAN_FRACTION, normalize
+
+
+class LocalSearch:
+    """
+        Search-as-you-type over a ContactStore. Matches like search_contacts_by_keyword: the keyword
+        anywhere in the name or surname, ignoring case, with results in the order they were added.
+
+        Results for recent keywords are kept in an LRUCache. A keyword that contains the previous one is only
+        matched against the previous results, since a contact matching the longer keyword matches the shorter
+        one too, unless they are more than SCAN_FRACTION of the store, e.g. after a single vowel: filtering
+        them would cost a scan, the name index answers the longer keyword faster. Any other keyword is
+        looked up in the name index.
+        The cache is dropped when the store's version changes, i.e. on every insert, edit and delete.
+        """
+
+    def __init__(self, store, cache_size=64):
+        self.store = store
+        self._cache = LRUCache(cache_size)
+        self._version = None
+        # (keyword, matching contacts) of the previous search
+        self._previous = None
+
+    def search(self, keyword):
+        """
+            Returns a list of the stored contacts whose name or surname contains the keyword.
+            """
+        keyword = normalize(keyword)
+        if self.store.version != self._version:
+            self.invalidate()
+        matches = self._cache.get(keyword)
+        if matches is None:
+            if (self._previous is not None and self._previous[0] in keyword
+                    and len(self._previous[1]) <= len(self.store) * SCAN_FRACTION):
+                matches = [contact for contact in self._previous[1]
+                           if keyword in normalize(contact.name) or keyword in normalize(contact.surname)]
+            else:
+                matches = self.store.search_names(keyword)
+            self._cache.put(keyword, matches)
+        self._previous = (keyword, matches)
+        return matches
+
+    def invalidate(self):
+        """
+            Drops the cached results, the next search starts over from the store.
+            """
+        # read before the store is, so a change made while searching invalidates the next search again
+        self._version = self.store.version
+        self._cache.clear()
+        self._previous = None
+
+
+class CloudSearch:
+    """
+        Search-as-you-type against the database with DatabaseManager.search_contacts. Results for recent
+        keywords are served by the manager's QueryCache, if it has one, so they follow its ttl and are dropped
+        after every committed write; this class keeps no cache of its own.
+        Full-text results are ranked, so a longer keyword is searched again rather than filtered.
+        Use it from one thread, e.g. the database thread of a TaskRunner.
+        """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+
+    def search(self, keyword):
+        """
+            Returns a list of the Contact objects DatabaseManager.search_contacts finds for the keyword.
+            """
+        return self.db_manager.search_contacts(keyword.strip())
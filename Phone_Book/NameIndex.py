@@ -0,0 +1,183 @@
+from bisect import bisect_left, insort
+
+# substrings up to this length are indexed, longer keywords intersect the postings of their trigrams
+GRAM_LENGTH = 3
+# a lookup whose buckets hold more than this fraction of the contacts scans the normalized names instead,
+# merging and ordering that many matches costs more than testing every contact
+SCAN_FRACTION = 0.1
+
+
+def normalize(text):
+    return text.casefold()
+
+
+def _grams(token):
+    """
+        Returns the set of substrings of the token of length 1 to GRAM_LENGTH.
+        """
+    return {token[start:start + length]
+            for length in range(1, GRAM_LENGTH + 1) for start in range(len(token) - length + 1)}
+
+
+class _FieldIndex:
+    """
+        Index of contacts by one normalized field. Contacts are grouped by their distinct field value (token);
+        the tokens are kept sorted for prefix lookups and in n-gram postings for substring lookups.
+        """
+
+    def __init__(self):
+        self._contacts = {}
+        self._tokens = []
+        self._postings = {}
+
+    def add(self, token, contact):
+        same_token = self._contacts.get(token)
+        if same_token is None:
+            same_token = self._contacts[token] = {}
+            insort(self._tokens, token)
+            for gram in _grams(token):
+                self._postings.setdefault(gram, set()).add(token)
+        same_token[id(contact)] = contact
+
+    def remove(self, token, contact):
+        same_token = self._contacts[token]
+        del same_token[id(contact)]
+        if same_token:
+            return
+        del self._contacts[token]
+        del self._tokens[bisect_left(self._tokens, token)]
+        for gram in _grams(token):
+            tokens = self._postings[gram]
+            tokens.discard(token)
+            if not tokens:
+                del self._postings[gram]
+
+    def with_prefix(self, prefix):
+        """
+            Yields the contact buckets of the tokens starting with prefix, O(log n + k).
+            """
+        tokens = self._tokens
+        position = bisect_left(tokens, prefix)
+        while position < len(tokens) and tokens[position].startswith(prefix):
+            yield self._contacts[tokens[position]]
+            position += 1
+
+    def containing(self, text):
+        """
+            Yields the contact buckets of the tokens containing text.
+            """
+        if not text:
+            tokens = self._tokens
+        elif len(text) <= GRAM_LENGTH:
+            tokens = self._postings.get(text, ())
+        else:
+            postings = sorted((self._postings.get(text[start:start + GRAM_LENGTH], set())
+                               for start in range(len(text) - GRAM_LENGTH + 1)), key=len)
+            # sharing every trigram does not make text a substring, the candidates are checked
+            tokens = [token for token in postings[0].intersection(*postings[1:]) if text in token]
+        for token in tokens:
+            yield self._contacts[token]
+
+
+class NameIndex:
+    """
+        Prefix and substring index over the casefolded names and surnames of contacts, kept up to date one
+        contact at a time by ContactStore.
+
+        The distinct names and surnames are kept in sorted lists, so a prefix lookup bisects to the first
+        match and reads the run that follows, O(log n + k). Every substring of up to GRAM_LENGTH characters
+        maps to the names containing it, so a short substring lookup is one dict read and a longer one
+        intersects the postings of its trigrams. Results come back in the order the contacts were added.
+        A short keyword can match most of the contacts, e.g. a single vowel; when the buckets it selects hold
+        more than SCAN_FRACTION of them, the casefolded names kept per contact are scanned in order instead.
+        """
+
+    FIELDS = ('name', 'surname')
+
+    def __init__(self, contacts=()):
+        self._fields = {field: _FieldIndex() for field in self.FIELDS}
+        # id(contact) -> sequence number, to return results in a stable order
+        self._order = {}
+        self._next = 0
+        # id(contact) -> (contact, casefolded name, casefolded surname), in the order the contacts were added
+        self._normalized = {}
+        for contact in contacts:
+            self.add(contact)
+
+    def __len__(self):
+        return len(self._order)
+
+    def add(self, contact):
+        self._order[id(contact)] = self._next
+        self._next += 1
+        name, surname = normalize(contact.name), normalize(contact.surname)
+        self._normalized[id(contact)] = (contact, name, surname)
+        self._fields['name'].add(name, contact)
+        self._fields['surname'].add(surname, contact)
+
+    def remove(self, contact):
+        del self._order[id(contact)]
+        del self._normalized[id(contact)]
+        for field, index in self._fields.items():
+            index.remove(normalize(getattr(contact, field)), contact)
+
+    def move(self, contact, field, value):
+        """
+            Moves the contact to a new name or surname. Must be called while the old value is still readable.
+            """
+        index = self._fields[field]
+        index.remove(normalize(getattr(contact, field)), contact)
+        value = normalize(value)
+        index.add(value, contact)
+        _, name, surname = self._normalized[id(contact)]
+        # replaced in place, the contact keeps its position
+        self._normalized[id(contact)] = (contact, value, surname) if field == 'name' else (contact, name, value)
+
+    def with_prefix(self, prefix, fields=FIELDS):
+        """
+            Returns a list of the contacts with a name or surname starting with the prefix, ignoring case.
+            """
+        prefix = normalize(prefix)
+        buckets = [bucket for field in fields for bucket in self._fields[field].with_prefix(prefix)]
+        if self._should_scan(buckets):
+            return self._scan(fields, lambda value: value.startswith(prefix))
+        return self._collect(buckets)
+
+    def containing(self, text, fields=FIELDS):
+        """
+            Returns a list of the contacts with a name or surname containing the text, ignoring case.
+            """
+        text = normalize(text)
+        buckets = [bucket for field in fields for bucket in self._fields[field].containing(text)]
+        if not self._should_scan(buckets):
+            return self._collect(buckets)
+        entries = self._normalized.values()
+        # the common case is tested inline, a call per contact would cost as much as the test
+        if fields == self.FIELDS:
+            return [contact for contact, name, surname in entries if text in name or text in surname]
+        return self._scan(fields, lambda value: text in value)
+
+    def _should_scan(self, buckets):
+        return sum(map(len, buckets)) > len(self._order) * SCAN_FRACTION
+
+    def _scan(self, fields, matches_value):
+        """
+            Returns the contacts with a name or surname, of the provided fields, that matches_value accepts,
+            in the order they were added.
+            """
+        entries = self._normalized.values()
+        if fields == ('name',):
+            return [contact for contact, name, _ in entries if matches_value(name)]
+        if fields == ('surname',):
+            return [contact for contact, _, surname in entries if matches_value(surname)]
+        return [contact for contact, name, surname in entries if matches_value(name) or matches_value(surname)]
+
+    def _collect(self, buckets):
+        """
+            Returns the contacts of the buckets in the order they were added.
+            """
+        matches = {}
+        for bucket in buckets:
+            matches.update(bucket)
+        order = self._order
+        return [matches[key] for key in sorted(matches, key=order.__getitem__)]
@@ -0,0 +1,99 @@
+import csv
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import Validation
+from Contact import Contact, ImportReport, check_csv_header, store_imported_contacts
+from ContactExport import FIELDNAMES
+
+
+def split_byte_ranges(filename, chunk_bytes):
+    """
+        Splits a CSV file into (start, end) byte ranges of about chunk_bytes each, skipping the header line.
+        Every range starts at the beginning of a line and ends just after a newline or at the end of the file,
+        so a range holds whole records as long as no quoted field spans several lines.
+        """
+    size = os.path.getsize(filename)
+    ranges = []
+    with open(filename, 'rb') as file:
+        file.readline()
+        start = file.tell()
+        while start < size:
+            file.seek(min(start + chunk_bytes, size))
+            if file.tell() < size:
+                file.readline()
+            end = file.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def validate_byte_range(filename, start, end, columns, encoding):
+    """
+        Parses and validates the CSV records between two byte offsets, the worker side of a parallel import.
+        columns gives the position of the Name, Surname, Number and Email fields in a record.
+        Returns (lines, valid, invalid): the number of lines read, (line, row) pairs for valid rows and
+        (line, row, reason) tuples for invalid ones, with lines counted from the start of the range.
+        """
+    with open(filename, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding)
+    valid = []
+    invalid = []
+    lines = []
+    rows = []
+    reader = csv.reader(io.StringIO(text, newline=''))
+    for record in reader:
+        if record:
+            lines.append(reader.line_num)
+            rows.append(tuple(record[column] if column < len(record) else "" for column in columns))
+    for line, row, codes in zip(lines, rows, Validation.validate_batch(rows)):
+        if codes is None:
+            valid.append((line, row))
+        else:
+            invalid.append((line, row, Validation.first_error(codes)))
+    return text.count('\n'), valid, invalid
+
+
+def import_contacts_from_csv_parallel(filename, workers=None, db_manager=None, chunk_bytes=4 * 1024 * 1024,
+                                      progress=None, max_errors=100, encoding='utf-8'):
+    """
+        Imports contacts from a CSV file like import_contacts_from_csv, validating byte ranges of the file
+        in a pool of worker processes (os.cpu_count() of them by default).
+        Results are merged in file order in this process, so duplicate numbers and emails are resolved
+        exactly as a sequential import would resolve them.
+        At most two ranges per worker are in flight, which keeps memory bounded for large files.
+        Returns an ImportReport describing the import.
+        """
+    with open(filename, 'r', newline='', encoding=encoding) as file:
+        header = next(csv.reader(file), [])
+    check_csv_header(filename, header)
+    columns = [header.index(field) for field in FIELDNAMES]
+
+    workers = workers or os.cpu_count()
+    report = ImportReport(max_errors)
+    start_time = time.perf_counter()
+    ranges = deque(split_byte_ranges(filename, chunk_bytes))
+    # line 1 is the header
+    lines_before = 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        window = 2 * workers
+        while ranges or pending:
+            while ranges and len(pending) < window:
+                start, end = ranges.popleft()
+                pending.append(executor.submit(validate_byte_range, filename, start, end, columns, encoding))
+            lines, valid, invalid = pending.popleft().result()
+            for line, row, reason in invalid:
+                report.reject(lines_before + line, row, reason)
+            contacts = [(lines_before + line, Contact.from_validated(*row)) for line, row in valid]
+            store_imported_contacts(contacts, report, db_manager)
+            lines_before += lines
+            report.elapsed = time.perf_counter() - start_time
+            if progress is not None:
+                progress(report)
+
+    return report
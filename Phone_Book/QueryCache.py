@@ -0,0 +1,76 @@
+import threading
+
+from LRUCache import LRUCache
+
+_MISSING = object()
+
+
+class QueryCache:
+    """
+        Read-through cache of DatabaseManager lookups, shared by all the threads using the manager.
+
+        Entries belong to the manager's 'generation' they were loaded in, which goes up after every
+        committed write. On commit the manager calls advance(): a write that described the rows it changed
+        only drops the entries those rows can affect and carries the others over to the new generation,
+        any other write, e.g. a backup, drops them all. An entry of an older generation is never served,
+        so a result is never outdated by a write of the same manager.
+        Writes by other processes, e.g. a batch job on the same database file, do not change the generation;
+        a ttl bounds how long results can stay stale after those.
+        """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self._entries = LRUCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._generation = None
+        self.invalidations = 0
+
+    def get(self, key, generation, load, *args):
+        """
+            Returns the value cached for key in the generation, or loads it with load(*args) and caches it.
+            generation must be read before loading, so a write committed meanwhile discards the value.
+            Loading runs outside the lock, two threads missing the same key may both load it.
+            """
+        with self._lock:
+            if self._generation is None or generation > self._generation:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._generation = generation
+            if generation == self._generation:
+                value = self._entries.get(key, _MISSING)
+                if value is not _MISSING:
+                    return value
+            else:
+                # read before a write another thread has already seen, the value may be outdated
+                self._entries.misses += 1
+        value = load(*args)
+        with self._lock:
+            if generation == self._generation:
+                self._entries.put(key, value)
+        return value
+
+    def advance(self, generation, affected=None):
+        """
+            Moves the cache to the generation a write has just committed. With affected, a predicate over
+            keys, the entries of the previous generation it is False for are kept, the others dropped.
+            """
+        with self._lock:
+            if affected is None or self._generation != generation - 1:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+            else:
+                for key in [key for key in self._entries.keys() if affected(key)]:
+                    self._entries.discard(key)
+                    self.invalidations += 1
+            self._generation = generation
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self):
+        """
+            Returns the LRUCache.stats() of the entries with the number of entries dropped by writes.
+            """
+        with self._lock:
+            return dict(self._entries.stats(), invalidations=self.invalidations, generation=self._generation)
@@ -0,0 +1,304 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from functools import lru_cache
+
+# upper bounds of the latency histogram buckets in milliseconds, the last bucket takes everything slower
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# statements the slow query log can show the EXPLAIN QUERY PLAN of
+EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH')
+
+_STRING_PATTERN = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_PATTERN = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def query_shape(sql):
+    """
+        Returns the shape of an SQL statement, the key its metrics are kept under: whitespace collapsed,
+        string and number literals replaced by ? and lists of parameters, e.g. IN (?, ?, ?), by (?...),
+        so statements that differ only in their values share a shape.
+        """
+    shape = _STRING_PATTERN.sub("?", sql)
+    shape = _NUMBER_PATTERN.sub("?", shape)
+    shape = _PARAMETER_LIST_PATTERN.sub("(?...)", shape)
+    return _WHITESPACE_PATTERN.sub(" ", shape).strip()
+
+
+class QueryStats:
+    """
+        Count, total and maximum time and latency histogram of the statements of one shape.
+        Fetching a statement's rows counts towards its latency, it ends when its rows are exhausted,
+        its cursor runs another statement or is closed.
+        """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect_left(BUCKETS_MS, seconds * 1000)] += 1
+
+    def percentile(self, percent):
+        """
+            Returns the upper bound in milliseconds of the bucket holding the percentile, capped by the maximum.
+            """
+        rank = percent / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max * 1000)
+        return self.max * 1000
+
+    def as_dict(self):
+        bounds = [f"<={bound}ms" for bound in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+        return {
+            'count': self.count,
+            'total_ms': round(self.total * 1000, 3),
+            'mean_ms': round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max * 1000, 3),
+            'p50_ms': round(self.percentile(50), 3),
+            'p99_ms': round(self.percentile(99), 3),
+            'histogram': {bound: count for bound, count in zip(bounds, self.buckets) if count},
+        }
+
+
+class QueryMetrics:
+    """
+        Statement metrics of the connections a DatabaseManager opens with it: QueryStats per query shape and
+        a log of the last max_slow_queries statements that took slow_query_ms or longer, each with the
+        EXPLAIN QUERY PLAN of the statement.
+
+        Only connections opened while a QueryMetrics is passed to the DatabaseManager are instrumented, a
+        manager without one runs on plain sqlite3 connections and pays nothing. 'enabled' pauses the
+        recording of instrumented connections, which then only pay for the check of the flag.
+        """
+
+    def __init__(self, slow_query_ms=100, max_slow_queries=100):
+        self.enabled = True
+        self.slow_query_ms = slow_query_ms
+        self.slow_queries = deque(maxlen=max_slow_queries)
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls):
+        """
+            Returns a QueryMetrics if the PHONEBOOK_QUERY_METRICS environment variable is set to 1, with the
+            slow query threshold from PHONEBOOK_SLOW_QUERY_MS, or None otherwise.
+            """
+        if os.environ.get('PHONEBOOK_QUERY_METRICS') != '1':
+            return None
+        return cls(slow_query_ms=float(os.environ.get('PHONEBOOK_SLOW_QUERY_MS', 100)))
+
+    def record(self, sql, seconds, connection=None, parameters=None):
+        """
+            Records one statement that took seconds. A slow statement run with execute (connection and
+            parameters are provided) is explained on that connection for the slow query log.
+            """
+        shape = query_shape(sql)
+        with self._lock:
+            stats = self._stats.get(shape)
+            if stats is None:
+                stats = self._stats[shape] = QueryStats()
+            stats.add(seconds)
+        if seconds * 1000 >= self.slow_query_ms:
+            self.slow_queries.append({
+                'time': time.strftime("%Y-%m-%dT%H:%M:%S"),
+                'thread': threading.current_thread().name,
+                'shape': shape,
+                'sql': sql.strip(),
+                'ms': round(seconds * 1000, 3),
+                'plan': self._explain(connection, sql, parameters),
+            })
+
+    @staticmethod
+    def _explain(connection, sql, parameters):
+        if connection is None or sql.split(None, 1)[0].upper() not in EXPLAINABLE:
+            return None
+        try:
+            # a plain cursor, so explaining is not itself recorded
+            cursor = sqlite3.Cursor(connection)
+            try:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+                return [row[3] for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        except sqlite3.Error as e:
+            return [f"EXPLAIN QUERY PLAN failed: {e}"]
+
+    def snapshot(self):
+        """
+            Returns the metrics as plain data: {'queries': {shape: stats}, 'slow_queries': [entries]}, with the
+            shapes ordered by total time, the most expensive first.
+            """
+        with self._lock:
+            stats = sorted(self._stats.items(), key=lambda item: item[1].total, reverse=True)
+            queries = {shape: shape_stats.as_dict() for shape, shape_stats in stats}
+        return {'queries': queries, 'slow_queries': list(self.slow_queries)}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow_queries.clear()
+
+    def report(self, limit=10):
+        """
+            Returns a printable summary of the limit most expensive query shapes and the slow query log.
+            """
+        snapshot = self.snapshot()
+        lines = [f"{'count':>8} {'total ms':>10} {'mean ms':>9} {'p99 ms':>9}  query"]
+        for shape, stats in list(snapshot['queries'].items())[:limit]:
+            lines.append(f"{stats['count']:>8} {stats['total_ms']:>10.1f} {stats['mean_ms']:>9.3f} "
+                         f"{stats['p99_ms']:>9.3f}  {shape[:100]}")
+        if snapshot['slow_queries']:
+            lines.append(f"{len(snapshot['slow_queries'])} slow queries (>= {self.slow_query_ms} ms):")
+            for entry in snapshot['slow_queries'][-limit:]:
+                lines.append(f"  {entry['ms']:>9.1f} ms  {entry['shape'][:100]}")
+                for step in entry['plan'] or ():
+                    lines.append(f"      {step}")
+        return "\n".join(lines)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+        Cursor that reports every statement it runs to the QueryMetrics of its InstrumentedConnection.
+        A statement's time runs from execute until its rows are exhausted or the cursor moves on, a query
+        whose rows are never read to the end is recorded when the cursor runs the next one or is closed.
+        """
+
+    _pending = None
+
+    def execute(self, sql, parameters=()):
+        metrics = self.connection.metrics
+        if not metrics.enabled:
+            return super().execute(sql, parameters)
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._pending = [sql, parameters, time.perf_counter() - start]
+            if self.description is None:
+                # no rows to fetch, the statement is done
+                self._finish()
+
+    def executemany(self, sql, seq_of_parameters):
+        metrics = self.connection.metrics
+        if not metrics.enabled:
+            return super().executemany(sql, seq_of_parameters)
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            metrics.record(sql, time.perf_counter() - start)
+
+    def executescript(self, sql_script):
+        metrics = self.connection.metrics
+        if not metrics.enabled:
+            return super().executescript(sql_script)
+        self._finish()
+        start = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            metrics.record(sql_script, time.perf_counter() - start)
+
+    def fetchone(self):
+        if self._pending is None:
+            return super().fetchone()
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._pending[2] += time.perf_counter() - start
+        if row is None:
+            self._finish()
+        return row
+
+    def fetchmany(self, size=None):
+        if self._pending is None:
+            return super().fetchmany(self.arraysize if size is None else size)
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._pending[2] += time.perf_counter() - start
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        if self._pending is None:
+            return super().fetchall()
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._pending[2] += time.perf_counter() - start
+        self._finish()
+        return rows
+
+    def __next__(self):
+        if self._pending is None:
+            return super().__next__()
+        start = time.perf_counter()
+        try:
+            return super().__next__()
+        except StopIteration:
+            self._finish()
+            raise
+        finally:
+            if self._pending is not None:
+                self._pending[2] += time.perf_counter() - start
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            sql, parameters, seconds = pending
+            self.connection.metrics.record(sql, seconds, self.connection, parameters)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+        Connection whose cursors, including the ones execute and executemany use, are InstrumentedCursors.
+        Commits are recorded as COMMIT statements, in WAL mode that is where writes wait for the disk.
+        Opened by DatabaseManager with sqlite3.connect(..., factory=InstrumentedConnection), 'metrics' is
+        set right after.
+        """
+
+    metrics = None
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+    def commit(self):
+        if not self.metrics.enabled:
+            return super().commit()
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            self.metrics.record("COMMIT", time.perf_counter() - start)
@@ -0,0 +1,231 @@
+import Validation
+from Contact import Contact
+
+
+class SyncConflict:
+    """
+        A contact that changed on both sides since the last sync, or clashes with a different contact on the
+        other side. Conflicted contacts are left as they are on both sides and stay dirty until resolved.
+        'contact' is the local Contact (None if there is none), 'row' the (id, name, surname, number, email,
+        updated_at) database row or tombstone (None if there is none) and 'reason' explains the conflict.
+        """
+
+    def __init__(self, contact, row, reason):
+        self.contact = contact
+        self.row = row
+        self.reason = reason
+
+    def __str__(self):
+        return f"{self.contact if self.contact is not None else self.row}: {self.reason}"
+
+
+class SyncReport:
+    """
+        Outcome of SyncEngine.push or SyncEngine.pull: how many contacts were inserted, updated and deleted
+        on the receiving side, how many were linked to an identical contact without transferring anything,
+        and the list of SyncConflict objects.
+        """
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.linked = 0
+        self.conflicts = []
+
+    @property
+    def transferred(self):
+        return self.inserted + self.updated + self.deleted
+
+    def conflict(self, contact, row, reason):
+        self.conflicts.append(SyncConflict(contact, row, reason))
+
+    def __str__(self):
+        return (f"{self.inserted} new, {self.updated} updated, {self.deleted} deleted, "
+                f"{self.linked} in sync, {len(self.conflicts)} conflicts")
+
+
+def _fields(contact):
+    return contact.name, contact.surname, contact.number, contact.email
+
+
+def _set_fields(contact, fields):
+    contact.name, contact.surname, contact.number, contact.email = fields
+
+
+class SyncEngine:
+    """
+        Delta sync between a ContactStore and the 'contacts' table of a DatabaseManager.
+
+        The store records which contacts were added or edited since their last sync and keeps tombstones of
+        removed ones; the database stamps every row with the revision that last wrote it and keeps tombstones
+        of deleted rows. push() sends only the local changes, pull() fetches only the rows changed after the
+        last revision pulled, so neither costs more than the size of the change.
+
+        Each synced contact remembers the id and revision of its row. A contact edited locally whose row has
+        a different revision by now, or a row changed remotely whose contact has unsynced edits, is reported
+        as a conflict instead of overwriting either side, unless both sides hold the same fields.
+        """
+
+    def __init__(self, store, db_manager):
+        self.store = store
+        self.db_manager = db_manager
+        # revision of the newest change pull() has seen, -1 before the first pull
+        self.last_revision = -1
+
+    def push(self, progress=None):
+        """
+            Writes the contacts added, edited and removed locally since their last sync to the database,
+            in a single transaction. progress, if provided, is called with the report before the writes;
+            an exception raised from it rolls the push back.
+            Returns a SyncReport.
+            """
+        report = SyncReport()
+        dirty = self.store.dirty_contacts()
+        tombstones = self.store.tombstones()
+        if not dirty and not tombstones:
+            return report
+        with self.db_manager.transaction():
+            linked_ids = [contact._cloud_id for contact, _ in dirty if contact._cloud_id is not None]
+            rows_by_id = self.db_manager.sync_rows('id', linked_ids + [cloud_id for cloud_id, _ in tombstones])
+            unlinked = [(contact, change) for contact, change in dirty if contact._cloud_id is None]
+            rows_by_number = self.db_manager.sync_rows('number', [contact.number for contact, _ in unlinked])
+            rows_by_email = self.db_manager.sync_rows('email', [contact.email for contact, _ in unlinked])
+
+            inserts = []
+            updates = []
+            for contact, change in dirty:
+                if contact._cloud_id is None:
+                    row = rows_by_number.get(contact.number) or rows_by_email.get(contact.email)
+                    if row is None:
+                        inserts.append((contact, change))
+                    elif row[1:5] == _fields(contact):
+                        self.store.mark_synced(contact, row[0], row[5], change)
+                        report.linked += 1
+                    else:
+                        report.conflict(contact, row, "number or email already used on the Cloud")
+                    continue
+                row = rows_by_id.get(contact._cloud_id)
+                if row is None:
+                    report.conflict(contact, None, "deleted on the Cloud, edited on PC")
+                elif row[1:5] == _fields(contact):
+                    self.store.mark_synced(contact, row[0], row[5], change)
+                    report.linked += 1
+                elif row[5] != contact._cloud_revision:
+                    report.conflict(contact, row, "edited on the Cloud and on PC")
+                else:
+                    updates.append((contact, change))
+
+            deletes = []
+            for cloud_id, revision in tombstones:
+                row = rows_by_id.get(cloud_id)
+                if row is None:
+                    self.store.forget_tombstone(cloud_id)
+                elif row[5] != revision:
+                    report.conflict(None, row, "edited on the Cloud, deleted on PC")
+                else:
+                    deletes.append(cloud_id)
+
+            if progress is not None:
+                progress(report)
+            insert_results = self.db_manager.insert_contacts([_fields(contact) for contact, _ in inserts])
+            update_results = self.db_manager.update_contacts_by_id([(contact._cloud_id,) + _fields(contact)
+                                                                    for contact, _ in updates])
+            self.db_manager.delete_contacts_by_id(deletes)
+            revision = self.db_manager.sync_revision()
+
+        for (contact, change), result in zip(inserts, insert_results):
+            if isinstance(result, ValueError):
+                report.conflict(contact, None, str(result))
+            else:
+                self.store.mark_synced(contact, result, revision, change)
+                report.inserted += 1
+        for (contact, change), result in zip(updates, update_results):
+            if isinstance(result, ValueError):
+                report.conflict(contact, rows_by_id[contact._cloud_id], str(result))
+            else:
+                self.store.mark_synced(contact, contact._cloud_id, revision, change)
+                report.updated += 1
+        for cloud_id in deletes:
+            self.store.forget_tombstone(cloud_id)
+            report.deleted += 1
+        return report
+
+    def pull(self, progress=None, batch_size=500):
+        """
+            Applies the rows changed in the database since the last pull to the store: new rows are added,
+            changed rows update their linked contact and deleted rows remove it.
+            progress, if provided, is called with the report after every batch_size rows.
+            Returns a SyncReport.
+            """
+        report = SyncReport()
+        revision = self.db_manager.sync_revision()
+        rows, tombstones = self.db_manager.changes_since(self.last_revision, batch_size)
+
+        # deletes first: a row id SQLite reuses after a delete must not be matched to the deleted contact
+        for tombstone in tombstones:
+            cloud_id, _, _, deleted_at = tombstone
+            contact = self.store.get_by_cloud_id(cloud_id)
+            if contact is None or contact._cloud_revision >= deleted_at:
+                continue
+            if self.store.is_dirty(contact):
+                report.conflict(contact, tombstone, "deleted on the Cloud, edited on PC")
+            else:
+                self.store.remove(contact, tombstone=False)
+                report.deleted += 1
+
+        for position, row in enumerate(rows, start=1):
+            self._pull_row(row, report)
+            if progress is not None and position % batch_size == 0:
+                progress(report)
+
+        self.last_revision = revision
+        return report
+
+    def _pull_row(self, row, report):
+        cloud_id, name, surname, number, email, updated_at = row
+        contact = self.store.get_by_cloud_id(cloud_id)
+        if contact is None:
+            local = self.store.get_by_number(number) or self.store.get_by_email(email)
+            if local is not None:
+                if local._cloud_id is None and _fields(local) == row[1:5]:
+                    self.store.mark_synced(local, cloud_id, updated_at)
+                    report.linked += 1
+                else:
+                    report.conflict(local, row, "number or email already used on PC")
+                return
+            codes = Validation.validate_contact(name, surname, number, email)
+            if any(codes):
+                report.conflict(None, row, Validation.first_error(codes))
+                return
+            contact = Contact.from_validated(name, surname, number, email)
+            self.store.add(contact)
+            self.store.mark_synced(contact, cloud_id, updated_at)
+            report.inserted += 1
+        elif contact._cloud_revision == updated_at:
+            return
+        elif _fields(contact) == row[1:5]:
+            self.store.mark_synced(contact, cloud_id, updated_at)
+        elif self.store.is_dirty(contact):
+            report.conflict(contact, row, "edited on the Cloud and on PC")
+        else:
+            codes = Validation.validate_contact(name, surname, number, email)
+            if any(codes):
+                report.conflict(contact, row, Validation.first_error(codes))
+                return
+            # both owners are checked before any field changes, either may be a different contact
+            for owner in (self.store.get_by_number(number), self.store.get_by_email(email)):
+                if owner is not None and owner is not contact:
+                    report.conflict(contact, row, "number or email already used on PC")
+                    return
+            fields = _fields(contact)
+            try:
+                _set_fields(contact, row[1:5])
+            except ValueError as e:
+                # put back what was already assigned, the contact stays as it was before the pull
+                _set_fields(contact, fields)
+                self.store.mark_synced(contact, cloud_id, contact._cloud_revision)
+                report.conflict(contact, row, str(e))
+                return
+            self.store.mark_synced(contact, cloud_id, updated_at)
+            report.updated += 1
@@ -0,0 +1,168 @@
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TaskCancelled(Exception):
+    """
+        Raised inside a task's work function once the task has been cancelled.
+        """
+
+
+class Task:
+    """
+        Handle for work submitted to a TaskRunner.
+
+        The work function receives the task as its first argument: it calls progress(value) to report
+        progress, which also stops the work with TaskCancelled once cancel() has been called.
+        A task that is not 'cancellable' is left alone by cancel_all(cancellable_only=True), e.g. the
+        startup work the user's Cancel button must not interrupt.
+        """
+
+    def __init__(self, runner, on_done=None, on_error=None, on_progress=None, on_cancel=None, cancellable=True):
+        self._runner = runner
+        self.cancellable = cancellable
+        self._cancel_event = threading.Event()
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancel = on_cancel
+        self.finished = False
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """
+            Asks the task to stop at its next progress report.
+            """
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+
+    def progress(self, value):
+        """
+            Reports progress to the on_progress callback, raising TaskCancelled if the task was cancelled.
+            """
+        self.check_cancelled()
+        self._runner._results.put((self, 'progress', value))
+
+
+class TaskRunner:
+    """
+        Runs blocking file and database work off the Tk thread.
+
+        Work runs on a thread pool, or on a dedicated database thread that runs database tasks one at a time,
+        in the order they were submitted, with the DatabaseManager returned by db_factory.
+        Outcomes are put on a queue that poll() drains on the Tk thread, where the on_done, on_error,
+        on_progress and on_cancel callbacks run, so they can update widgets safely.
+        """
+
+    def __init__(self, db_factory=None, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="phonebook-worker")
+        self._db_executor = ThreadPoolExecutor(1, thread_name_prefix="phonebook-db")
+        self._db_factory = db_factory
+        self._db_manager = None
+        self._results = queue.Queue()
+        self._running = set()
+
+    @property
+    def busy(self):
+        return bool(self._running)
+
+    def submit(self, function, *args, on_done=None, on_error=None, on_progress=None, on_cancel=None,
+               cancellable=True):
+        """
+            Runs function(task, *args) on the worker pool. Returns the Task handle.
+            """
+        task = Task(self, on_done, on_error, on_progress, on_cancel, cancellable)
+        self._running.add(task)
+        self._executor.submit(self._run, task, function, args)
+        return task
+
+    def submit_db(self, function, *args, on_done=None, on_error=None, on_progress=None, on_cancel=None,
+                  cancellable=True):
+        """
+            Runs function(task, db_manager, *args) on the database thread, with the DatabaseManager
+            that thread owns. Returns the Task handle.
+            """
+        task = Task(self, on_done, on_error, on_progress, on_cancel, cancellable)
+        self._running.add(task)
+        self._db_executor.submit(self._run, task, self._run_with_db, (function, args))
+        return task
+
+    def _run_with_db(self, task, function, args):
+        if self._db_manager is None:
+            self._db_manager = self._db_factory()
+        return function(task, self._db_manager, *args)
+
+    def _run(self, task, function, args):
+        try:
+            task.check_cancelled()
+            result = function(task, *args)
+        except TaskCancelled:
+            self._results.put((task, 'cancelled', None))
+        except Exception as e:
+            self._results.put((task, 'error', e))
+        else:
+            self._results.put((task, 'done', result))
+
+    def cancel_all(self, cancellable_only=False):
+        """
+            Cancels every task that has not finished yet, or only the cancellable ones if cancellable_only.
+            """
+        for task in list(self._running):
+            if task.cancellable or not cancellable_only:
+                task.cancel()
+
+    def poll(self):
+        """
+            Runs the callbacks for every outcome queued since the last poll. Must be called on the Tk thread.
+            A callback that raises has its traceback printed to stderr, the outcomes after it still run.
+            """
+        while True:
+            try:
+                task, kind, value = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if kind != 'progress':
+                task.finished = True
+                self._running.discard(task)
+            callback = {'progress': task.on_progress, 'done': task.on_done,
+                        'error': task.on_error, 'cancelled': task.on_cancel}[kind]
+            if callback is None:
+                continue
+            try:
+                if kind == 'cancelled':
+                    callback()
+                else:
+                    callback(value)
+            except Exception:
+                traceback.print_exc()
+
+    def start_polling(self, widget, interval=50):
+        """
+            Polls the result queue every interval milliseconds with the Tk after() timer of the provided widget.
+            """
+        def poll_loop():
+            try:
+                self.poll()
+            finally:
+                # rescheduled whatever happens, or every later outcome would be lost
+                widget.after(interval, poll_loop)
+
+        widget.after(interval, poll_loop)
+
+    def shutdown(self):
+        """
+            Cancels running tasks, waits for the threads to stop and closes the database manager's connections.
+            """
+        self.cancel_all()
+        self._executor.shutdown(wait=True)
+        if self._db_manager is not None:
+            self._db_executor.submit(self._db_manager.close_connection)
+        self._db_executor.shutdown(wait=True)
@@ -0,0 +1,184 @@
+import re
+
+MAX_NAME_LENGTH, MAX_SURNAME_LENGTH = (50, 50)
+# numbers have always been checked against 50 characters, tightening it would reject stored contacts
+MAX_NUMBER_LENGTH = 50
+MAX_EMAIL_LENGTH = 63
+
+# Error codes reported for a field, None means the field is valid
+EMPTY = 'empty'
+TOO_LONG = 'too_long'
+INVALID_CHARACTERS = 'invalid_characters'
+INVALID_FORMAT = 'invalid_format'
+
+FIELDS = ('name', 'surname', 'number', 'email')
+_VALID = (None, None, None, None)
+
+_EMAIL_PATTERN = re.compile(r'^[\w.-]+@[a-zA-Z]+\.[a-zA-Z]{2,}$')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+# a whole column of emails joined by newlines, each one empty or well formed
+_EMAIL_COLUMN_PATTERN = re.compile(r'(?:(?:[\w.-]+@[a-zA-Z]+\.[a-zA-Z]{2,})?\n)*')
+
+MESSAGES = {
+    ('name', EMPTY): "Name cannot be empty",
+    ('name', TOO_LONG): f"Name cannot exceed {MAX_NAME_LENGTH} characters",
+    ('name', INVALID_CHARACTERS): "Name can only contain alphabetic characters and spaces",
+    ('surname', EMPTY): "Surname cannot be empty",
+    ('surname', TOO_LONG): f"Surname cannot exceed {MAX_SURNAME_LENGTH} characters",
+    ('surname', INVALID_CHARACTERS): "Surname can only contain alphabetic characters and spaces",
+    ('number', EMPTY): "Number cannot be empty",
+    ('number', TOO_LONG): f"Number cannot exceed {MAX_NUMBER_LENGTH} integers",
+    ('number', INVALID_CHARACTERS): "Number can only contain digits",
+    ('email', TOO_LONG): f"Email cannot exceed {MAX_EMAIL_LENGTH} characters",
+    ('email', INVALID_FORMAT): "Invalid email format",
+}
+
+
+def check_name(name, max_length=MAX_NAME_LENGTH):
+    """
+        Checks a name or surname: not empty, at most max_length long, only letters and whitespace.
+        Returns an error code, or None if the value is valid.
+        """
+    if not name:
+        return EMPTY
+    if len(name) > max_length:
+        return TOO_LONG
+    # str.isalpha covers the common single word case in one C call, whitespace is only stripped otherwise
+    if not name.isalpha():
+        letters = _WHITESPACE_PATTERN.sub('', name)
+        if letters and not letters.isalpha():
+            return INVALID_CHARACTERS
+    return None
+
+
+def check_surname(surname):
+    """
+        Checks a surname, see check_name. Returns an error code, or None if the value is valid.
+        """
+    return check_name(surname, MAX_SURNAME_LENGTH)
+
+
+def check_number(number):
+    """
+        Checks a phone number: not empty, at most MAX_NUMBER_LENGTH long, only digits.
+        Returns an error code, or None if the value is valid.
+        """
+    if not number:
+        return EMPTY
+    if len(number) > MAX_NUMBER_LENGTH:
+        return TOO_LONG
+    if not number.isdigit():
+        return INVALID_CHARACTERS
+    return None
+
+
+def check_email(email):
+    """
+        Checks an email address, which may be empty: at most MAX_EMAIL_LENGTH long and well formed.
+        None, e.g. a NULL read from the database, is not an empty email but an invalid one.
+        Returns an error code, or None if the value is valid.
+        """
+    if email is None:
+        return INVALID_FORMAT
+    if len(email) > MAX_EMAIL_LENGTH:
+        return TOO_LONG
+    if email and not _EMAIL_PATTERN.match(email):
+        return INVALID_FORMAT
+    return None
+
+
+CHECKS = {
+    'name': check_name,
+    'surname': check_surname,
+    'number': check_number,
+    'email': check_email,
+}
+
+
+def validate_contact(name, surname, number, email):
+    """
+        Checks every field of a contact.
+        Returns a (name, surname, number, email) tuple of error codes, None for each valid field.
+        """
+    return check_name(name), check_surname(surname), check_number(number), check_email(email)
+
+
+# the column checks below take the fast path only for a column of strings, a None (a NULL read from the
+# database) is left to the per value checks, which reject it
+
+
+def _check_letters_column(values, max_length):
+    # a whole column of single word names is checked with one join and one str.isalpha call
+    if None in values:
+        return [check_name(value, max_length) for value in values]
+    lengths = list(map(len, values))
+    if min(lengths) > 0 and max(lengths) <= max_length and "".join(values).isalpha():
+        return [None] * len(values)
+    return [check_name(value, max_length) for value in values]
+
+
+def _check_numbers_column(numbers):
+    if None in numbers:
+        return list(map(check_number, numbers))
+    lengths = list(map(len, numbers))
+    if min(lengths) > 0 and max(lengths) <= MAX_NUMBER_LENGTH and "".join(numbers).isdigit():
+        return [None] * len(numbers)
+    return list(map(check_number, numbers))
+
+
+def _check_emails_column(emails):
+    if None in emails:
+        return list(map(check_email, emails))
+    joined = "\n".join(emails) + "\n"
+    if (max(map(len, emails)) <= MAX_EMAIL_LENGTH and joined.count("\n") == len(emails)
+            and _EMAIL_COLUMN_PATTERN.fullmatch(joined)):
+        return [None] * len(emails)
+    return list(map(check_email, emails))
+
+
+def validate_batch(rows):
+    """
+        Checks a batch of (name, surname, number, email) rows one column at a time.
+        Returns a list with a tuple of error codes per row, or None for a row whose fields are all valid.
+        """
+    if not rows:
+        return []
+    names, surnames, numbers, emails = zip(*rows)
+    columns = zip(_check_letters_column(names, MAX_NAME_LENGTH), _check_letters_column(surnames, MAX_SURNAME_LENGTH),
+                  _check_numbers_column(numbers), _check_emails_column(emails))
+    return [None if codes == _VALID else codes for codes in columns]
+
+
+def error_message(field, code):
+    """
+        Returns the error message for a field's error code.
+        """
+    return MESSAGES[(field, code)]
+
+
+def first_error(codes):
+    """
+        Returns the error message for the first field that has an error code, or None if all fields are valid.
+        """
+    for field, code in zip(FIELDS, codes):
+        if code is not None:
+            return error_message(field, code)
+    return None
+
+
+def raise_for_codes(codes):
+    """
+        Raises a ValueError with the message for the first field that has an error code, if any.
+        """
+    message = first_error(codes)
+    if message is not None:
+        raise ValueError(message)
+
+
+def validate_field(field, value):
+    """
+        Checks one contact field by name and raises a ValueError with its message if it is invalid.
+        """
+    code = CHECKS[field](value)
+    if code is not None:
+        raise ValueError(error_message(field, code))
@@ -0,0 +1,59 @@
+"""
+    Measures AsyncDatabaseManager throughput with 1, 10 and 100 coroutines inserting and searching concurrently.
+    Concurrent inserts are written in shared transactions, so insert throughput grows with concurrency.
+
+    Usage: python benchmarks/bench_async.py [operations] [concurrency]
+    concurrency is a comma separated list of coroutine counts, 1,10,100 by default.
+    """
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from AsyncDatabaseManager import AsyncDatabaseManager
+from generator import ContactGenerator
+
+
+async def timed(coroutines, operations):
+    start = time.perf_counter()
+    await asyncio.gather(*coroutines)
+    return operations / (time.perf_counter() - start)
+
+
+async def inserter(db_manager, rows):
+    for row in rows:
+        await db_manager.insert_contact(*row)
+
+
+async def searcher(db_manager, keywords):
+    for keyword in keywords:
+        await db_manager.search_contacts(keyword, limit=20)
+
+
+async def run(path, operations, concurrency):
+    generator = ContactGenerator()
+    rows = list(generator.valid(operations))
+    keywords = generator.keywords(operations)
+    async with AsyncDatabaseManager(path) as db_manager:
+        inserts = await timed([inserter(db_manager, rows[worker::concurrency])
+                               for worker in range(concurrency)], operations)
+        searches = await timed([searcher(db_manager, keywords[worker::concurrency])
+                                for worker in range(concurrency)], operations)
+    return inserts, searches
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    levels = [int(level) for level in (sys.argv[2] if len(sys.argv) > 2 else "1,10,100").split(",")]
+    with tempfile.TemporaryDirectory() as directory:
+        for concurrency in levels:
+            path = os.path.join(directory, f"bench_{concurrency}.db")
+            inserts, searches = asyncio.run(run(path, operations, concurrency))
+            print(f"{concurrency:4} coroutines  {inserts:10,.0f} inserts/s  {searches:10,.0f} searches/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+    Compares the batched DatabaseManager.backup path with one insert_contact call per contact.
+
+    Usage: python benchmarks/bench_backup.py [contacts] [batch_size]
+    """
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact
+from DatabaseManager import DatabaseManager
+from generator import ContactGenerator
+
+
+def time_per_contact_inserts(db_manager, contacts):
+    start = time.perf_counter()
+    for contact in contacts:
+        try:
+            db_manager.insert_contact(contact.name, contact.surname, contact.number, contact.email)
+        except ValueError:
+            pass
+    return time.perf_counter() - start
+
+
+def time_bulk_backup(db_manager, contacts, batch_size):
+    start = time.perf_counter()
+    db_manager.backup(contacts, batch_size=batch_size)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    contacts = [Contact(*row) for row in ContactGenerator().valid(count)]
+    with tempfile.TemporaryDirectory() as directory:
+        runs = (("insert_contact loop", lambda db: time_per_contact_inserts(db, contacts)),
+                (f"backup batch_size={batch_size}", lambda db: time_bulk_backup(db, contacts, batch_size)))
+        for position, (label, run) in enumerate(runs):
+            db_manager = DatabaseManager(os.path.join(directory, f"bench_{position}.db"))
+            elapsed = run(db_manager)
+            db_manager.close_connection()
+            print(f"{label:30} {count} contacts in {elapsed:.3f}s ({count / elapsed:,.0f} contacts/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+    Runs every command of cli.py the way a cron job does, in a fresh process, on a database holding rows
+    that fail validation and with a snapshot file that cannot be loaded, and times each run.
+    That stdout of every run parses as one JSON object is tested in tests/test_cli.py.
+
+    Usage: python benchmarks/bench_cli.py [contacts]
+    """
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DatabaseManager import DatabaseManager
+from generator import ContactGenerator
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli.py")
+INVALID_ROWS = 20
+
+
+def run_cli(directory, *arguments):
+    """
+        Runs cli.py with the database and snapshot in directory. Returns the parsed summary,
+        the seconds the process took and the number of lines it wrote to stderr.
+        """
+    command = [sys.executable, CLI, "--db", os.path.join(directory, "bench.db"),
+               "--snapshot", os.path.join(directory, "bench.snapshot"), *arguments]
+    start = time.perf_counter()
+    process = subprocess.run(command, capture_output=True, text=True, cwd=directory)
+    elapsed = time.perf_counter() - start
+    return json.loads(process.stdout), elapsed, len(process.stderr.splitlines())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    generator = ContactGenerator()
+    with tempfile.TemporaryDirectory() as directory:
+        db_manager = DatabaseManager(os.path.join(directory, "bench.db"))
+        db_manager.insert_contacts(generator.valid(count))
+        # written past validation, the way rows from an older version or another tool end up in the table
+        with db_manager.transaction() as cursor:
+            cursor.executemany("INSERT OR IGNORE INTO contacts (name, surname, number, email) VALUES (?, ?, ?, ?)",
+                               [row for row, _ in generator.invalid(INVALID_ROWS)])
+        db_manager.close_connection()
+        with open(os.path.join(directory, "bench.snapshot"), 'wb') as file:
+            file.write(b"not a snapshot")
+        generator.write_csv(os.path.join(directory, "import.csv"), count)
+
+        keyword = generator.keywords(1)[0]
+        runs = [
+            ("search", keyword),
+            ("search", keyword, "--local"),
+            ("stats",),
+            ("stats", "--local"),
+            ("export", "export.csv.gz"),
+            ("backup", "backup.db"),
+            ("import", "import.csv"),
+            ("import", "import.csv", "--local"),
+            ("restore", "backup.db"),
+        ]
+        for arguments in runs:
+            summary, elapsed, diagnostics = run_cli(directory, *arguments)
+            status = "ok" if summary['ok'] else summary['error']
+            print(f"{' '.join(arguments):32} {elapsed * 1000:9.1f} ms  {diagnostics:6} stderr lines  {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+    Compares how long it takes to get the local contacts back at startup: re-importing the seed CSV,
+    which parses and validates every row, against loading a binary snapshot with load_snapshot.
+
+    Usage: python benchmarks/bench_cold_start.py [sizes]
+    sizes is a comma separated list of contact counts, 10000,100000,1000000 by default.
+    """
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact, import_contacts_from_csv
+from ContactSnapshot import load_snapshot, save_snapshot
+from ContactStore import ContactStore
+from generator import ContactGenerator
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "10000,100000,1000000").split(",")]
+    with tempfile.TemporaryDirectory() as directory:
+        for count in sizes:
+            csv_file = os.path.join(directory, f"contacts_{count}.csv")
+            snapshot_file = os.path.join(directory, f"contacts_{count}.snapshot")
+            ContactGenerator().write_csv(csv_file, count, invalid_ratio=0)
+
+            Contact.static_contacts.clear()
+            start = time.perf_counter()
+            import_contacts_from_csv(csv_file)
+            csv_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            save_snapshot(snapshot_file, Contact.static_contacts)
+            save_time = time.perf_counter() - start
+            Contact.static_contacts.clear()
+
+            store = ContactStore()
+            start = time.perf_counter()
+            load_snapshot(snapshot_file, store)
+            load_time = time.perf_counter() - start
+            assert len(store) == count
+
+            print(f"{count:>9} contacts  CSV import {csv_time * 1000:9.1f} ms  snapshot load {load_time * 1000:8.1f} ms "
+                  f"({csv_time / load_time:4.1f}x)  save {save_time * 1000:8.1f} ms  "
+                  f"{os.path.getsize(snapshot_file) / 2 ** 20:6.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
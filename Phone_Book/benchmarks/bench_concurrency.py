@@ -0,0 +1,77 @@
+"""
+    Measures read and write throughput of one DatabaseManager shared by several threads:
+    reader threads page through and search the contacts while a writer thread inserts contacts,
+    with the rollback journal the database used to run in and with WAL.
+
+    Usage: python benchmarks/bench_concurrency.py [contacts] [readers] [seconds]
+    """
+import os
+import sys
+import tempfile
+import threading
+import time
+from itertools import islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact
+from DatabaseManager import DatabaseManager
+from generator import ContactGenerator
+
+# search keywords the readers take turns with
+KEYWORDS = 50
+
+
+def run(db_manager, rows, contacts, readers, seconds):
+    """
+        Runs the readers over the first contacts rows, already in the database, while the writer inserts
+        the rows that follow. Returns the reads and writes per second.
+        """
+    keywords = ContactGenerator().keywords(KEYWORDS)
+    stop = threading.Event()
+    reads = [0] * readers
+    writes = [0]
+
+    def read(position):
+        page = 0
+        while not stop.is_set():
+            if page % 2:
+                db_manager.search_contacts(keywords[page % len(keywords)], limit=50)
+            else:
+                db_manager.fetch_contacts(50, page * 50 % contacts)
+            page += 1
+            reads[position] += 1
+
+    def write():
+        while not stop.is_set():
+            db_manager.insert_contact(*next(rows))
+            writes[0] += 1
+
+    threads = [threading.Thread(target=read, args=(position,)) for position in range(readers)]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(reads) / seconds, writes[0] / seconds
+
+
+def main():
+    contacts = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    readers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 3
+    with tempfile.TemporaryDirectory() as directory:
+        for journal_mode in ("DELETE", "WAL"):
+            db_manager = DatabaseManager(os.path.join(directory, f"bench_{journal_mode}.db"), journal_mode)
+            # more rows than the writer can insert in the run, generated as it goes
+            rows = ContactGenerator().valid(contacts + 10 ** 9)
+            db_manager.backup([Contact.from_validated(*row) for row in islice(rows, contacts)])
+            reads, writes = run(db_manager, rows, contacts, readers, seconds)
+            db_manager.close_connection()
+            print(f"{journal_mode:7} {readers} readers + 1 writer  {reads:10,.0f} reads/s  {writes:8,.0f} writes/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+    Compares exporting the 'contacts' table to CSV the old way, downloading it into Contact objects and
+    writing one dict per row with DictWriter, with DatabaseManager.export_to_csv, which streams the rows
+    from the cursor in chunks, uncompressed and compressed with gzip and lzma.
+    Peak memory is measured with tracemalloc in a second run, which is slower.
+
+    Usage: python benchmarks/bench_export.py [contacts]
+    """
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact
+from DatabaseManager import DatabaseManager
+from generator import ContactGenerator
+
+
+def download_and_export(db_manager, filename):
+    contacts = db_manager.download_contacts()
+    with open(filename, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=['Name', 'Surname', 'Number', 'Email'])
+        writer.writeheader()
+        for contact in contacts:
+            writer.writerow({'Name': contact.name, 'Surname': contact.surname,
+                             'Number': contact.number, 'Email': contact.email})
+
+
+def measure(label, function, filename, memory=True):
+    start = time.perf_counter()
+    function(filename)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(filename)
+    peak = ""
+    if memory:
+        tracemalloc.start()
+        function(filename)
+        peak = f"peak {tracemalloc.get_traced_memory()[1] / 2 ** 20:7.1f} MiB"
+        tracemalloc.stop()
+    print(f"{label:36} {elapsed * 1000:9.1f} ms  {size / 2 ** 20:7.1f} MiB file  {peak}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as directory:
+        db_manager = DatabaseManager(os.path.join(directory, "bench.db"))
+        db_manager.backup((Contact.from_validated(*row) for row in ContactGenerator().valid(count)), batch_size=900)
+        print(f"{count} contacts")
+        measure("download_contacts + DictWriter", lambda filename: download_and_export(db_manager, filename),
+                os.path.join(directory, "old.csv"))
+        measure("export_to_csv", db_manager.export_to_csv, os.path.join(directory, "export.csv"))
+        measure("export_to_csv gzip", db_manager.export_to_csv, os.path.join(directory, "export.csv.gz"),
+                memory=False)
+        measure("export_to_csv lzma", db_manager.export_to_csv, os.path.join(directory, "export.csv.xz"),
+                memory=False)
+        db_manager.close_connection()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+    Measures what one keystroke of live search costs: typing a keyword one character at a time and
+    searching after every character with a scan of the whole store, with search_contacts_by_keyword,
+    which looks the keyword up in the store's name index, with LocalSearch, which filters the previous
+    results, and with CloudSearch against a database with a QueryCache.
+
+    Usage: python benchmarks/bench_live_search.py [contacts]
+    """
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact, search_contacts_by_keyword
+from DatabaseManager import DatabaseManager
+from LiveSearch import CloudSearch, LocalSearch
+from QueryCache import QueryCache
+from generator import ContactGenerator
+
+KEYWORDS = ["oliver", "anderson", "mia"]
+
+
+def type_keyword(search, keyword):
+    """
+        Searches for every prefix of the keyword, returns the time of each search in milliseconds.
+        """
+    times = []
+    for length in range(1, len(keyword) + 1):
+        start = time.perf_counter()
+        search(keyword[:length])
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def scan(keyword):
+    keyword = keyword.lower()
+    return [contact for contact in Contact.static_contacts
+            if keyword in contact.name.lower() or keyword in contact.surname.lower()]
+
+
+def report(label, search):
+    times = [took for keyword in KEYWORDS for took in type_keyword(search, keyword)]
+    print(f"{label:28} slowest keystroke {max(times):8.1f} ms  mean {sum(times) / len(times):7.1f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    Contact.static_contacts.update(Contact.from_validated(*row) for row in ContactGenerator().valid(count))
+    print(f"{count} contacts")
+    report("scan", scan)
+    start = time.perf_counter()
+    Contact.static_contacts.name_index()
+    print(f"{'NameIndex build':28} {(time.perf_counter() - start) * 1000:26.1f} ms")
+    report("search_contacts_by_keyword", search_contacts_by_keyword)
+    local_search = LocalSearch(Contact.static_contacts)
+    report("LocalSearch", local_search.search)
+    report("LocalSearch, cached", local_search.search)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "bench.db")
+        db_manager = DatabaseManager(filename)
+        db_manager.backup(Contact.static_contacts.snapshot(), batch_size=900)
+        report("search_contacts", db_manager.search_contacts)
+        db_manager.close_connection()
+        db_manager = DatabaseManager(filename, cache=QueryCache())
+        cloud_search = CloudSearch(db_manager)
+        report("CloudSearch", cloud_search.search)
+        report("CloudSearch, cached", cloud_search.search)
+        db_manager.close_connection()
+
+
+if __name__ == '__main__':
+    main()
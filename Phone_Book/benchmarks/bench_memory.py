@@ -0,0 +1,74 @@
+"""
+    Measures with tracemalloc how much memory an address book takes in each representation:
+    dict backed Contact objects in a set (the original layout), slotted Contact objects in a set and in
+    an indexed ContactStore, and a ColumnarContactStore.
+
+    Usage: python benchmarks/bench_memory.py [sizes]
+    sizes is a comma separated list of contact counts, 100000,1000000 by default.
+    """
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ColumnarStore import ColumnarContactStore
+from Contact import Contact
+from ContactStore import ContactStore
+from generator import ContactGenerator
+
+
+class DictContact:
+    # the attribute layout Contact had before __slots__
+    def __init__(self, name, surname, number, email):
+        self._name = name
+        self._surname = surname
+        self._number = number
+        self._email = email
+
+
+def rows(count):
+    return ContactGenerator().valid(count)
+
+
+def build_dict_contacts(count):
+    return {DictContact(*row) for row in rows(count)}
+
+
+def build_slotted_contacts(count):
+    return {Contact.from_validated(*row) for row in rows(count)}
+
+
+def build_contact_store(count):
+    return ContactStore(Contact.from_validated(*row) for row in rows(count))
+
+
+def build_columnar_store(count):
+    store = ColumnarContactStore()
+    for row in rows(count):
+        store.append(*row)
+    return store
+
+
+def measure(build, count):
+    tracemalloc.start()
+    kept = build(count)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return size
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "100000,1000000").split(",")]
+    for count in sizes:
+        for label, build in (("dict Contact set", build_dict_contacts),
+                             ("slotted Contact set", build_slotted_contacts),
+                             ("indexed ContactStore", build_contact_store),
+                             ("ColumnarContactStore", build_columnar_store)):
+            size = measure(build, count)
+            print(f"{count:>9} contacts  {label:22} {size / 2 ** 20:9.1f} MiB  {size / count:7.1f} bytes/contact")
+
+
+if __name__ == '__main__':
+    main()
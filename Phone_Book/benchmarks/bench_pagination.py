@@ -0,0 +1,48 @@
+"""
+    Compares what "All on Cloud" costs: downloading the whole table, the first keyset page, a deep page
+    reached by OFFSET and a deep page reached by its continuation token, and looking up the token of a deep
+    page from the start of the table and from a page ten pages before it.
+
+    Usage: python benchmarks/bench_pagination.py [contacts] [page_size]
+    """
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact
+from DatabaseManager import DatabaseManager
+from generator import ContactGenerator
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{label:36} {(time.perf_counter() - start) * 1000:10.1f} ms")
+    return result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with tempfile.TemporaryDirectory() as directory:
+        db_manager = DatabaseManager(os.path.join(directory, "bench.db"))
+        db_manager.backup((Contact.from_validated(*row) for row in ContactGenerator().valid(count)),
+                          batch_size=900)
+        deep = count - count // 10
+        token = db_manager.page_token_at(deep)
+        timed("download_contacts (full table)", db_manager.download_contacts)
+        timed("fetch_page first page + count", lambda: db_manager.fetch_page(page_size))
+        timed("fetch_page first page, no count", lambda: db_manager.fetch_page(page_size, with_total=False))
+        timed(f"fetch_contacts OFFSET {deep}", lambda: db_manager.fetch_contacts(page_size, deep))
+        timed(f"fetch_page token at {deep}", lambda: db_manager.fetch_page(page_size, token, with_total=False))
+        timed(f"page_token_at {deep}", lambda: db_manager.page_token_at(deep))
+        near = db_manager.page_token_at(deep - 10 * page_size)
+        timed(f"page_token_at {deep}, 10 pages on", lambda: db_manager.page_token_at(deep, near, deep - 10 * page_size))
+        db_manager.close_connection()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+    Measures how import_contacts_from_csv_parallel scales with the number of worker processes,
+    against the sequential import_contacts_from_csv.
+
+    Usage: python benchmarks/bench_parallel_import.py [rows] [max_workers]
+    """
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact, import_contacts_from_csv
+from ParallelImport import import_contacts_from_csv_parallel
+from generator import ContactGenerator
+
+# shares of the rows that fail validation and that repeat an earlier number
+INVALID_RATIO = 0.01
+DUPLICATE_RATIO = 0.001
+
+
+def run(label, import_function, rows):
+    Contact.static_contacts.clear()
+    start = time.perf_counter()
+    report = import_function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:22} {elapsed:7.2f}s  {rows / elapsed:10,.0f} rows/s  {report}")
+    return report
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "contacts.csv")
+        ContactGenerator().write_csv(filename, rows, INVALID_RATIO, DUPLICATE_RATIO)
+        sequential = run("sequential", lambda: import_contacts_from_csv(filename), rows)
+        workers = 1
+        while workers <= max_workers:
+            report = run(f"parallel workers={workers}",
+                         lambda: import_contacts_from_csv_parallel(filename, workers=workers), rows)
+            assert (report.imported, report.rejected) == (sequential.imported, sequential.rejected)
+            workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+    Measures the QueryCache in front of DatabaseManager: the same skewed stream of search_contact and
+    search_contacts lookups, a few names looked up most of the time, against a manager without a cache
+    and with caches of several sizes, then again with a write every WRITE_EVERY lookups.
+
+    Usage: python benchmarks/bench_query_cache.py [contacts] [lookups]
+    """
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DatabaseManager import DatabaseManager
+from QueryCache import QueryCache
+from generator import ContactGenerator
+
+CACHE_SIZES = [64, 256, 1024]
+WRITE_EVERY = 100
+
+
+def lookups(rows, count, seed=1):
+    """
+        Returns count ('contact', full name) or ('keyword', keyword) lookups, skewed like a Zipf distribution.
+        """
+    rng = random.Random(seed)
+    names = [f"{name} {surname}" for name, surname, _, _ in rows[:5000] if " " not in surname]
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    chosen = rng.choices(names, weights, k=count)
+    return [('contact', name) if i % 2 else ('keyword', name.split()[i % 4 // 2]) for i, name in enumerate(chosen)]
+
+
+def run(db_manager, stream, write_every=None):
+    generator = ContactGenerator(seed=2)
+    writes = generator.valid(len(stream))
+    start = time.perf_counter()
+    for i, (kind, text) in enumerate(stream):
+        if write_every and i % write_every == write_every - 1:
+            name, surname, number, email = next(writes)
+            db_manager.insert_contact(name, surname, str(int(number) + 100000000), email.replace("@", "+w@"))
+        if kind == 'contact':
+            db_manager.search_contact(text)
+        else:
+            db_manager.search_contacts(text, limit=50)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    lookup_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    rows = list(ContactGenerator(seed=1).valid(count))
+    stream = lookups(rows, lookup_count)
+    with tempfile.TemporaryDirectory() as directory:
+        prepared = os.path.join(directory, "prepared.db")
+        seed = DatabaseManager(prepared)
+        seed.insert_contacts(rows)
+        seed.close_connection()
+        filename = os.path.join(directory, "contacts.db")
+        print(f"{count} contacts, {lookup_count} lookups")
+        for write_every in (None, WRITE_EVERY):
+            print("read only" if write_every is None else f"a write every {write_every} lookups")
+            for cache_size in [None] + CACHE_SIZES:
+                # every run starts from the same database, the writes of one do not clash with the next
+                shutil.copy(prepared, filename)
+                cache = None if cache_size is None else QueryCache(cache_size)
+                db_manager = DatabaseManager(filename, cache=cache)
+                seconds = run(db_manager, stream, write_every)
+                db_manager.close_connection()
+                label = "no cache" if cache is None else f"cache {cache_size}"
+                line = f"  {label:<12} {seconds * 1000:>9.1f} ms {lookup_count / seconds:>10.0f} lookups/s"
+                if cache is not None:
+                    stats = cache.stats()
+                    line += (f"  hit ratio {stats['hit_ratio']:.2f}, {stats['evictions']} evictions, "
+                             f"{stats['invalidations']} invalidations")
+                print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+    Measures what query metrics cost: the same point lookups, searches, full scans and batched inserts
+    on a DatabaseManager without metrics, with paused metrics (enabled = False) and with metrics recording,
+    then prints the metrics report of the recording run.
+
+    Usage: python benchmarks/bench_query_metrics.py [contacts]
+    """
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DatabaseManager import DatabaseManager
+from QueryMetrics import QueryMetrics
+from generator import ContactGenerator
+
+LOOKUPS = 20000
+SEARCHES = 200
+SCANS = 3
+
+
+def workload(db_manager, rows, keywords):
+    """
+        Runs the workload, returns {operation: seconds}.
+        """
+    times = {}
+    start = time.perf_counter()
+    db_manager.insert_contacts(rows)
+    times['insert'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(LOOKUPS):
+        db_manager.count_contacts() if i % 2 else db_manager.fetch_contacts(1, i % len(rows))
+    times['lookup'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for keyword in keywords:
+        db_manager.search_contacts(keyword, limit=50)
+    times['search'] = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(SCANS):
+        for _ in db_manager.iter_contacts():
+            pass
+    times['scan'] = time.perf_counter() - start
+    return times
+
+
+def run(rows, keywords, metrics):
+    with tempfile.TemporaryDirectory() as directory:
+        db_manager = DatabaseManager(os.path.join(directory, "contacts.db"), metrics=metrics)
+        try:
+            return workload(db_manager, rows, keywords)
+        finally:
+            db_manager.close_connection()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    generator = ContactGenerator(seed=1)
+    rows = list(generator.valid(count))
+    keywords = generator.keywords(SEARCHES)
+
+    paused = QueryMetrics()
+    paused.enabled = False
+    recording = QueryMetrics(slow_query_ms=25)
+    results = {
+        'no metrics': run(rows, keywords, None),
+        'paused': run(rows, keywords, paused),
+        'recording': run(rows, keywords, recording),
+    }
+    baseline = results['no metrics']
+    print(f"{count} contacts, {LOOKUPS} lookups, {SEARCHES} searches, {SCANS} scans")
+    print(f"{'':<12}" + "".join(f"{operation:>18}" for operation in baseline))
+    for mode, times in results.items():
+        cells = (f"{times[operation] * 1000:>10.1f} ms {times[operation] / baseline[operation]:>4.2f}x"
+                 for operation in baseline)
+        print(f"{mode:<12}" + "".join(cells))
+    print()
+    print(recording.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+    Compares the FTS5 DatabaseManager.search_contacts with the LIKE scan it replaces.
+
+    Usage: python benchmarks/bench_search.py [sizes] [repeats]
+    sizes is a comma separated list of table sizes, 10000,100000,1000000 by default.
+    """
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact
+from DatabaseManager import DatabaseManager
+from generator import ContactGenerator
+
+# a surname, a surname prefix, a selective number fragment and a name, see generator.NAMES and SURNAMES
+KEYWORDS = ["Nelson", "wal", "3000123", "olivia"]
+
+
+def fill(db_manager, count):
+    db_manager.backup((Contact(*row) for row in ContactGenerator().valid(count)), batch_size=500)
+
+
+def like_searcher(db_manager):
+    """
+        Returns a search function running the LIKE scan search_contacts falls back to, the search it replaced.
+        """
+    def search(keyword, limit=None):
+        db_manager.cursor.execute(*db_manager._like_query(keyword, limit))
+        return [Contact(*row) for row in db_manager.cursor.fetchall()]
+
+    return search
+
+
+def time_searches(search, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for keyword in KEYWORDS:
+            search(keyword, limit=50)
+    return (time.perf_counter() - start) / (repeats * len(KEYWORDS))
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else "10000,100000,1000000").split(",")]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            db_manager = DatabaseManager(os.path.join(directory, f"bench_{size}.db"))
+            fill(db_manager, size)
+            like = time_searches(like_searcher(db_manager), repeats)
+            fts = time_searches(db_manager.search_contacts, repeats)
+            db_manager.close_connection()
+            print(f"{size:>9} rows  LIKE {like * 1000:9.2f} ms/query  FTS5 {fts * 1000:9.2f} ms/query  "
+                  f"({like / fts:,.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""
+    Compares the per-character contact validation Contact.__init__ used to run with the Validation module,
+    per contact and per batch.
+
+    Usage: python benchmarks/bench_validation.py [rows]
+    """
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Validation
+
+
+def legacy_validate(name, surname, number, email):
+    # the checks Contact.__init__ ran before the Validation module
+    if not name or len(name) > 50 or not all(char.isalpha() or char.isspace() for char in name):
+        return False
+    if not surname or len(surname) > 50 or not all(char.isalpha() or char.isspace() for char in surname):
+        return False
+    if not number or len(number) > 50 or not number.isdigit():
+        return False
+    if len(email) > 63 or (email and not re.match(r'^[\w.-]+@[a-zA-Z]+\.[a-zA-Z]{2,}$', email)):
+        return False
+    return True
+
+
+def timed(label, function, rows):
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:32} {elapsed * 1e9 / rows:8.0f} ns/contact")
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    data = [("Alexandra", "Montgomery", str(100000000 + i), f"alexandra.montgomery{i}@example.com")
+            for i in range(rows)]
+    timed("legacy per contact", lambda: [legacy_validate(*row) for row in data], rows)
+    timed("Validation.validate_contact", lambda: [Validation.validate_contact(*row) for row in data], rows)
+    timed("Validation.validate_batch", lambda: Validation.validate_batch(data), rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""
+    Seeded generator of synthetic contacts for the benchmarks. The same seed and count always produce the
+    same rows, so results from different runs and machines measure the same work.
+
+    Valid rows have unique numbers and emails. Invalid rows each break exactly one validation rule, chosen
+    in turn from INVALID_KINDS, so every rule is exercised at any ratio.
+    """
+import csv
+import random
+import string
+
+import Validation
+
+NAMES = ["Olivia", "Liam", "Emma", "Noah", "Amelia", "Oliver", "Sophia", "Elijah", "Mia", "James", "Ava", "Lucas",
+         "Charlotte", "Henry", "Isabella", "Theodore", "Evelyn", "Jack", "Harper", "Leo", "Zoë", "Åsa", "José"]
+SURNAMES = ["Smith", "Johnson", "Brown", "Taylor", "Anderson", "Walker", "Harris", "Young", "Clark", "Lewis",
+            "Robinson", "Wright", "Hall", "Allen", "King", "Scott", "Green", "Baker", "Adams", "Nelson", "Müller",
+            "García", "O Brien"]
+DOMAINS = ["example.com", "mail.org", "post.net", "inbox.io"]
+# (field, error code) each invalid row is made to fail with
+INVALID_KINDS = [
+    ('name', Validation.EMPTY),
+    ('name', Validation.INVALID_CHARACTERS),
+    ('name', Validation.TOO_LONG),
+    ('surname', Validation.EMPTY),
+    ('surname', Validation.INVALID_CHARACTERS),
+    ('number', Validation.EMPTY),
+    ('number', Validation.INVALID_CHARACTERS),
+    ('number', Validation.TOO_LONG),
+    ('email', Validation.INVALID_FORMAT),
+    ('email', Validation.TOO_LONG),
+]
+# numbers of valid rows count up from FIRST_NUMBER, invalid rows are based on numbers from INVALID_NUMBER
+FIRST_NUMBER = 300000000
+INVALID_NUMBER = 700000000
+
+
+class ContactGenerator:
+    """
+        Generates (name, surname, number, email) rows from a seed. Every method draws from a random stream
+        of its own, so the rows one method yields do not depend on which others were called before.
+        """
+
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def _random(self, stream):
+        # one independent stream per kind of data, so adding a kind does not shift the others
+        return random.Random(f"{self.seed}:{stream}")
+
+    def valid(self, count):
+        """
+            Yields count valid rows with unique numbers and emails.
+            """
+        return self._rows(self._random("valid"), count, FIRST_NUMBER)
+
+    @staticmethod
+    def _rows(rng, count, first_number):
+        for i in range(count):
+            name = rng.choice(NAMES)
+            surname = rng.choice(SURNAMES)
+            local = f"{name}.{surname}".replace(" ", "").encode("ascii", "ignore").decode().lower()
+            yield name, surname, str(first_number + i), f"{local}{i}@{rng.choice(DOMAINS)}"
+
+    def invalid(self, count):
+        """
+            Yields count (row, (field, error code)) pairs, each row failing validation for that one reason.
+            """
+        rng = self._random("invalid")
+        rows = self._rows(self._random("invalid rows"), count, INVALID_NUMBER)
+        for i in range(count):
+            field, code = INVALID_KINDS[i % len(INVALID_KINDS)]
+            name, surname, number, email = next(rows)
+            if field == 'name' or field == 'surname':
+                value = {Validation.EMPTY: "",
+                         Validation.INVALID_CHARACTERS: f"{name}{rng.randint(0, 9)}",
+                         Validation.TOO_LONG: name * (Validation.MAX_NAME_LENGTH // len(name) + 1)}[code]
+                if field == 'name':
+                    name = value
+                else:
+                    surname = value
+            elif field == 'number':
+                number = {Validation.EMPTY: "",
+                          Validation.INVALID_CHARACTERS: number[:4] + rng.choice(string.ascii_letters) + number[5:],
+                          Validation.TOO_LONG: number * (Validation.MAX_NUMBER_LENGTH // len(number) + 1)}[code]
+            else:
+                email = {Validation.INVALID_FORMAT: email.replace("@", rng.choice(["", "@@", " at "])),
+                         Validation.TOO_LONG: "x" * Validation.MAX_EMAIL_LENGTH + email}[code]
+            yield (name, surname, number, email), (field, code)
+
+    def mixed(self, count, invalid_ratio=0.05):
+        """
+            Yields count rows, about invalid_ratio of them invalid, at positions fixed by the seed.
+            """
+        rng = self._random("mixed")
+        valid = self.valid(count)
+        invalid = self.invalid(count)
+        for _ in range(count):
+            if rng.random() < invalid_ratio:
+                yield next(invalid)[0]
+            else:
+                yield next(valid)
+
+    def keywords(self, count):
+        """
+            Returns count search keywords: whole names and surnames, prefixes, inner substrings and misses.
+            """
+        rng = self._random("keywords")
+        keywords = []
+        for i in range(count):
+            word = rng.choice(NAMES + SURNAMES).split()[0]
+            kind = i % 4
+            if kind == 0:
+                keywords.append(word)
+            elif kind == 1:
+                keywords.append(word[:rng.randint(1, len(word))])
+            elif kind == 2:
+                begin = rng.randint(0, len(word) - 1)
+                keywords.append(word[begin:rng.randint(begin + 1, len(word))])
+            else:
+                keywords.append("".join(rng.choice(string.ascii_lowercase) for _ in range(5)))
+        return keywords
+
+    def write_csv(self, filename, count, invalid_ratio=0.05, duplicate_ratio=0.0):
+        """
+            Writes count mixed rows to a contacts CSV file with the header import_contacts_from_csv expects.
+            About duplicate_ratio of the rows repeat the number of an earlier row, at positions fixed by the seed.
+            """
+        rng = self._random("duplicates")
+        with open(filename, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['Name', 'Surname', 'Number', 'Email'])
+            numbers = []
+            for name, surname, number, email in self.mixed(count, invalid_ratio):
+                if numbers and rng.random() < duplicate_ratio:
+                    number = rng.choice(numbers)
+                else:
+                    numbers.append(number)
+                writer.writerow((name, surname, number, email))
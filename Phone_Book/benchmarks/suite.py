@@ -0,0 +1,363 @@
+"""
+    Benchmark suite for the Contact.py and DatabaseManager.py paths the app depends on, run on synthetic
+    contacts from the seeded ContactGenerator, so every run measures the same work.
+
+    For every case and size it records the operations timed, the items (contacts or rows) they processed,
+    ops/sec as items per second, p50 and p99 latency of the timed operations and the peak memory they
+    allocated on top of their setup. Bulk cases, e.g. backup, time one operation over all items.
+    Peak memory is measured with tracemalloc in a second run of each case, which --no-memory skips.
+
+    Usage: python benchmarks/suite.py [--sizes 1000,10000] [--seed 0] [--cases create_contact,backup,...]
+                                      [--max-ops 2000] [--searches 50] [--no-memory]
+                                      [--output results.json] [--compare baseline.json] [--threshold 0.15]
+
+    --output writes the results as JSON, a file written this way is the baseline for --compare, which
+    prints how every result changed and exits with status 1 if any regressed by more than --threshold.
+    """
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact, create_contact, export_contacts_to_csv, import_contacts_from_csv, \
+    search_contacts_by_keyword
+from DatabaseManager import DatabaseManager
+from generator import ContactGenerator
+
+# latency and memory changes below these are noise, whatever the ratio
+MIN_LATENCY_CHANGE_MS = 0.05
+MIN_MEMORY_CHANGE_MIB = 1.0
+
+
+class Samples:
+    """
+        Latencies of the timed operations of one case run and the number of items they processed.
+        A case calls begin() when its setup is done, so only what follows counts towards peak memory.
+        """
+
+    def __init__(self, trace_memory=False):
+        self.latencies = array('d')
+        self.items = 0
+        self.trace_memory = trace_memory
+        self.baseline_memory = 0
+
+    def begin(self):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self.baseline_memory = tracemalloc.get_traced_memory()[0]
+
+    def run(self, function, *args, items=1, expected=()):
+        """
+            Times one call of function, counting it as items items. Exceptions of the expected types,
+            e.g. the ValueError of an invalid contact, are part of the operation and are swallowed.
+            """
+        start = time.perf_counter()
+        try:
+            function(*args)
+        except expected:
+            pass
+        self.latencies.append(time.perf_counter() - start)
+        self.items += items
+
+    def peak_memory(self):
+        return tracemalloc.get_traced_memory()[1] - self.baseline_memory
+
+
+class Context:
+    """
+        What a case gets to set itself up: the size, the generator, a scratch directory and the limits.
+        database() returns a DatabaseManager over a copy of a database holding the size valid contacts,
+        built once per size.
+        """
+
+    def __init__(self, size, generator, directory, max_ops, searches):
+        self.size = size
+        self.generator = generator
+        self.directory = directory
+        self.max_ops = max_ops
+        self.searches = searches
+        self._database_file = None
+        self._copies = []
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def contacts(self, count=None):
+        return [Contact.from_validated(*row) for row in self.generator.valid(self.size if count is None else count)]
+
+    def fill_store(self):
+        Contact.static_contacts.clear()
+        Contact.static_contacts.update(self.contacts())
+
+    def empty_database(self):
+        filename = self.path(f"database{len(self._copies)}.db")
+        self._copies.append(filename)
+        return DatabaseManager(filename)
+
+    def database(self):
+        if self._database_file is None:
+            self._database_file = self.path("contacts.db")
+            db_manager = DatabaseManager(self._database_file)
+            db_manager.backup(self.contacts(), batch_size=900)
+            db_manager.close_connection()
+        filename = self.path(f"database{len(self._copies)}.db")
+        self._copies.append(filename)
+        shutil.copyfile(self._database_file, filename)
+        return DatabaseManager(filename)
+
+    def remove_databases(self):
+        """
+            Removes the databases handed out so far, they can be large.
+            """
+        for filename in self._copies:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(filename + suffix):
+                    os.remove(filename + suffix)
+        self._copies = []
+
+
+def case_create_contact(context, samples):
+    Contact.static_contacts.clear()
+    rows = list(context.generator.mixed(context.size))
+    samples.begin()
+    for row in rows:
+        samples.run(create_contact, *row, expected=ValueError)
+
+
+def case_import_contacts_from_csv(context, samples):
+    filename = context.path("import.csv")
+    context.generator.write_csv(filename, context.size)
+    Contact.static_contacts.clear()
+    samples.begin()
+    samples.run(import_contacts_from_csv, filename, items=context.size)
+
+
+def case_export_contacts_to_csv(context, samples):
+    contacts = context.contacts()
+    samples.begin()
+    samples.run(export_contacts_to_csv, context.path("export.csv"), contacts, items=len(contacts))
+
+
+def case_search_contacts_by_keyword(context, samples):
+    context.fill_store()
+    # the name index is built on the first search, that is setup rather than a search
+    Contact.static_contacts.name_index()
+    keywords = context.generator.keywords(context.searches)
+    samples.begin()
+    for keyword in keywords:
+        samples.run(search_contacts_by_keyword, keyword)
+
+
+def case_insert_contact(context, samples):
+    db_manager = context.database()
+    rows = [(name, surname, "9" + number, "new." + email)
+            for name, surname, number, email in context.generator.valid(min(context.size, context.max_ops))]
+    samples.begin()
+    for row in rows:
+        samples.run(db_manager.insert_contact, *row)
+    db_manager.close_connection()
+
+
+def case_backup(context, samples):
+    db_manager = context.empty_database()
+    contacts = context.contacts()
+    samples.begin()
+    samples.run(db_manager.backup, contacts, items=len(contacts))
+    db_manager.close_connection()
+
+
+def case_search_contacts(context, samples):
+    db_manager = context.database()
+    keywords = context.generator.keywords(context.searches)
+    samples.begin()
+    for keyword in keywords:
+        samples.run(db_manager.search_contacts, keyword)
+    db_manager.close_connection()
+
+
+def case_download_contacts(context, samples):
+    db_manager = context.database()
+    samples.begin()
+    samples.run(db_manager.download_contacts, items=context.size)
+    db_manager.close_connection()
+
+
+def case_update_contact(context, samples):
+    db_manager = context.database()
+    rows = list(context.generator.valid(min(context.size, context.max_ops)))
+    samples.begin()
+    for name, surname, number, email in rows:
+        samples.run(db_manager.update_contact, email, number, surname, name, number, email)
+    db_manager.close_connection()
+
+
+CASES = {
+    'create_contact': case_create_contact,
+    'import_contacts_from_csv': case_import_contacts_from_csv,
+    'export_contacts_to_csv': case_export_contacts_to_csv,
+    'search_contacts_by_keyword': case_search_contacts_by_keyword,
+    'insert_contact': case_insert_contact,
+    'backup': case_backup,
+    'search_contacts': case_search_contacts,
+    'download_contacts': case_download_contacts,
+    'update_contact': case_update_contact,
+}
+
+
+def percentile(sorted_values, percent):
+    """
+        Returns the nearest-rank percentile of an ascending sequence.
+        """
+    return sorted_values[max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)]
+
+
+def run_case(name, context, trace_memory):
+    samples = Samples()
+    CASES[name](context, samples)
+    latencies = sorted(samples.latencies)
+    seconds = sum(latencies)
+    result = {
+        'case': name,
+        'size': context.size,
+        'ops': len(latencies),
+        'items': samples.items,
+        'seconds': round(seconds, 6),
+        'ops_per_sec': round(samples.items / seconds, 1) if seconds else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 4),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 4),
+        'peak_mib': None,
+    }
+    Contact.static_contacts.clear()
+    context.remove_databases()
+    if trace_memory:
+        samples = Samples(trace_memory=True)
+        tracemalloc.start()
+        try:
+            CASES[name](context, samples)
+            result['peak_mib'] = round(samples.peak_memory() / 2 ** 20, 2)
+        finally:
+            tracemalloc.stop()
+            Contact.static_contacts.clear()
+            context.remove_databases()
+    return result
+
+
+def run_suite(sizes, cases, seed, max_ops, searches, trace_memory):
+    generator = ContactGenerator(seed)
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            context = Context(size, generator, directory, max_ops, searches)
+            for name in cases:
+                result = run_case(name, context, trace_memory)
+                print(format_result(result), flush=True)
+                results.append(result)
+    return {
+        'meta': {
+            'seed': seed,
+            'sizes': sizes,
+            'max_ops': max_ops,
+            'searches': searches,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        'results': results,
+    }
+
+
+def format_result(result):
+    peak = "" if result['peak_mib'] is None else f"  peak {result['peak_mib']:8.2f} MiB"
+    return (f"{result['case']:28}{result['size']:>9}  {result['ops_per_sec'] or 0:>12.1f} ops/s  "
+            f"p50 {result['p50_ms']:10.3f} ms  p99 {result['p99_ms']:10.3f} ms{peak}")
+
+
+def compare(results, baseline, threshold):
+    """
+        Prints how every result changed from the baseline with the same case and size.
+        A result regressed if its ops/sec dropped, or its p99 latency or peak memory grew,
+        by more than threshold (a fraction). Returns the list of regression descriptions.
+        """
+    previous = {(result['case'], result['size']): result for result in baseline['results']}
+    regressions = []
+    print(f"\n{'case':28}{'size':>9}  {'ops/s':>9}  {'p99':>9}  {'peak':>9}")
+    for result in results['results']:
+        old = previous.get((result['case'], result['size']))
+        if old is None:
+            continue
+        changes = []
+        flags = []
+        for key, worse_if_higher, floor in (('ops_per_sec', False, 0.0), ('p99_ms', True, MIN_LATENCY_CHANGE_MS),
+                                            ('peak_mib', True, MIN_MEMORY_CHANGE_MIB)):
+            if not old[key] or result[key] is None:
+                changes.append(f"{'':>9}")
+                continue
+            change = result[key] / old[key] - 1
+            changes.append(f"{change:>+9.1%}")
+            worse = change > threshold if worse_if_higher else change < -threshold
+            if worse and abs(result[key] - old[key]) > floor:
+                flags.append(key)
+        line = f"{result['case']:28}{result['size']:>9}  " + "  ".join(changes)
+        if flags:
+            line += "  REGRESSION: " + ", ".join(flags)
+            regressions.append(f"{result['case']}@{result['size']}: {', '.join(flags)}")
+        print(line)
+    return regressions
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Benchmarks the contact and database paths on synthetic data.")
+    parser.add_argument('--sizes', default="1000,10000",
+                        help="comma separated contact counts, from 1000 to 1000000 (default 1000,10000)")
+    parser.add_argument('--seed', type=int, default=0, help="generator seed (default 0)")
+    parser.add_argument('--cases', default=",".join(CASES),
+                        help=f"comma separated cases to run (default all: {', '.join(CASES)})")
+    parser.add_argument('--max-ops', type=int, default=2000,
+                        help="most single row database writes timed per case (default 2000)")
+    parser.add_argument('--searches', type=int, default=50, help="keywords searched per search case (default 50)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory runs")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="compare the results with this baseline JSON file")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="fraction a result may get worse before it counts as a regression (default 0.15)")
+    arguments = parser.parse_args()
+    arguments.sizes = [int(size) for size in arguments.sizes.split(",")]
+    arguments.cases = arguments.cases.split(",")
+    unknown = [name for name in arguments.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    return arguments
+
+
+def main():
+    arguments = parse_arguments()
+    results = run_suite(arguments.sizes, arguments.cases, arguments.seed, arguments.max_ops, arguments.searches,
+                        not arguments.no_memory)
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, arguments.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regressions against {arguments.compare}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {arguments.compare}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+    Command-line batch tool over the contacts data, for jobs on machines without a display, e.g. nightly
+    backups and bulk loads from cron. Unlike main.py it never imports customtkinter.
+
+    Every run prints one JSON summary to stdout: the command, whether it succeeded, how long it took in
+    total and per phase, and what it did. Nothing else is written to stdout, diagnostics such as rows that
+    fail validation go to stderr, so stdout parses as one JSON object. --summary-file also appends the
+    summary as one line to a file, so job durations can be tracked over time. --verbose reports progress
+    on stderr.
+
+    Usage: python cli.py [--db FILE] [--snapshot FILE] [--metrics] [--summary-file FILE] [--verbose] COMMAND
+        import CSV [--local] [--workers N] [--chunk-size N]   imports a contacts CSV file
+        export FILE [--local] [--compression auto|gzip|lzma|none]
+        backup FILE                                        writes a consistent copy of the database to FILE
+        restore FILE                                       replaces the database with a copy made by backup
+        search KEYWORD [--local] [--limit N]
+        stats [--local]
+    --local works on the contacts on PC, kept in the snapshot file, instead of the database.
+    Exits with 1 if the command failed.
+    """
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import redirect_stdout
+
+from Bootstrap import SNAPSHOT_FILE, AppData, StartupTimer
+from Contact import export_contacts_to_csv, import_contacts_from_csv
+from ParallelImport import import_contacts_from_csv_parallel
+from QueryMetrics import QueryMetrics
+
+# CSV files from this size up are imported by a pool of worker processes unless --workers says otherwise,
+# below it starting the pool costs more than it saves
+PARALLEL_IMPORT_BYTES = 8 * 1024 * 1024
+# rejected rows listed in an import summary
+SUMMARY_ERRORS = 10
+# seconds between two progress lines
+PROGRESS_INTERVAL = 1.0
+
+
+def progress_printer(verbose):
+    """
+        Returns a progress callback printing at most one line per PROGRESS_INTERVAL to stderr, or None
+        if not verbose. It takes an import or export report, or the (status, remaining, total) pages
+        of a database backup or restore.
+        """
+    if not verbose:
+        return None
+    last = [0.0]
+
+    def progress(*report):
+        now = time.perf_counter()
+        if now - last[0] >= PROGRESS_INTERVAL:
+            last[0] = now
+            text = str(report[0]) if len(report) == 1 else f"{report[2] - report[1]}/{report[2]} pages"
+            print(text, file=sys.stderr, flush=True)
+
+    return progress
+
+
+def contact_dict(contact):
+    return {'name': contact.name, 'surname': contact.surname, 'number': contact.number, 'email': contact.email}
+
+
+def import_command(arguments, app_data, progress):
+    """
+        Imports a CSV file into the database, or into the snapshot with --local. Large files are validated
+        in parallel, see PARALLEL_IMPORT_BYTES.
+        """
+    workers = arguments.workers
+    if workers is None:
+        workers = os.cpu_count() if os.path.getsize(arguments.file) >= PARALLEL_IMPORT_BYTES else 1
+    if arguments.local:
+        app_data.load_local()
+        db_manager = None
+    else:
+        db_manager = app_data.db_manager
+    with app_data.timer.phase("import"):
+        if workers > 1:
+            report = import_contacts_from_csv_parallel(arguments.file, workers, db_manager, progress=progress,
+                                                       max_errors=SUMMARY_ERRORS)
+        else:
+            report = import_contacts_from_csv(arguments.file, db_manager, arguments.chunk_size, progress,
+                                              max_errors=SUMMARY_ERRORS)
+    if arguments.local:
+        with app_data.timer.phase("snapshot save"):
+            app_data.save_snapshot()
+    return {
+        'file': arguments.file,
+        'workers': workers,
+        'imported': report.imported,
+        'rejected': report.rejected,
+        'rows_per_second': round(report.rows_per_second),
+        'errors': [{'line': line_number, 'row': list(row), 'reason': reason}
+                   for line_number, row, reason in report.errors],
+    }
+
+
+def export_command(arguments, app_data, progress):
+    """
+        Exports the database, or the contacts on PC with --local, to a CSV file, streamed and compressed
+        on the fly for a .gz or .xz file.
+        """
+    compression = None if arguments.compression == 'none' else arguments.compression
+    if arguments.local:
+        app_data.load_local()
+        with app_data.timer.phase("export"):
+            report = export_contacts_to_csv(arguments.file, app_data.store.snapshot(), compression, progress)
+    else:
+        db_manager = app_data.db_manager
+        with app_data.timer.phase("export"):
+            report = db_manager.export_to_csv(arguments.file, compression, progress=progress)
+    return {
+        'file': arguments.file,
+        'exported': report.rows,
+        'rows_per_second': round(report.rows_per_second),
+        'bytes': os.path.getsize(arguments.file),
+    }
+
+
+def backup_command(arguments, app_data, progress):
+    """
+        Writes a consistent copy of the database, safe to run while the application is using it.
+        """
+    db_manager = app_data.db_manager
+    with app_data.timer.phase("backup"):
+        pages = db_manager.copy_to(arguments.file, progress=progress)
+    return {'file': arguments.file, 'pages': pages, 'bytes': os.path.getsize(arguments.file),
+            'contacts': db_manager.count_contacts()}
+
+
+def restore_command(arguments, app_data, progress):
+    """
+        Replaces the contents of the database with a copy made by backup.
+        """
+    db_manager = app_data.db_manager
+    with app_data.timer.phase("restore"):
+        pages = db_manager.restore_from(arguments.file, progress=progress)
+    return {'file': arguments.file, 'pages': pages, 'contacts': db_manager.count_contacts(),
+            'migration_conflicts': len(db_manager.migration_conflicts)}
+
+
+def search_command(arguments, app_data, progress):
+    """
+        Searches the database like the Cloud search of the application, or with --local the names and
+        surnames of the contacts on PC. Lists up to --limit matches.
+        """
+    if arguments.local:
+        app_data.load_local()
+        with app_data.timer.phase("search"):
+            contacts = app_data.store.search_names(arguments.keyword)
+        matches = len(contacts)
+        contacts = contacts[:arguments.limit]
+    else:
+        db_manager = app_data.db_manager
+        with app_data.timer.phase("search"):
+            contacts = db_manager.search_contacts(arguments.keyword, limit=arguments.limit)
+        matches = len(contacts)
+    return {'keyword': arguments.keyword, 'matches': matches,
+            'contacts': [contact_dict(contact) for contact in contacts]}
+
+
+def stats_command(arguments, app_data, progress):
+    """
+        Describes the database, or the contacts on PC with --local.
+        """
+    if arguments.local:
+        app_data.load_local()
+        store = app_data.store
+        return {
+            'snapshot': app_data.snapshot_file,
+            'bytes': os.path.getsize(app_data.snapshot_file) if os.path.exists(app_data.snapshot_file) else 0,
+            'contacts': len(store),
+            'unsynced': len(store.dirty_contacts()),
+            'tombstones': len(store.tombstones()),
+            'sync_revision': app_data.sync_revision,
+        }
+    db_manager = app_data.db_manager
+    with app_data.timer.phase("stats"):
+        contacts = db_manager.count_contacts()
+        revision = db_manager.sync_revision()
+        cursor = db_manager.cursor
+        pragmas = {}
+        for pragma in ('page_size', 'page_count', 'freelist_count', 'journal_mode', 'user_version'):
+            cursor.execute(f"PRAGMA {pragma}")
+            pragmas[pragma] = cursor.fetchone()[0]
+    files = [db_manager.db_name, db_manager.db_name + "-wal"]
+    return {
+        'db': db_manager.db_name,
+        'bytes': sum(os.path.getsize(file) for file in files if os.path.exists(file)),
+        'contacts': contacts,
+        'sync_revision': revision,
+        'full_text_tables': sorted(db_manager.full_text_tables),
+        **pragmas,
+    }
+
+
+COMMANDS = {
+    'import': import_command,
+    'export': export_command,
+    'backup': backup_command,
+    'restore': restore_command,
+    'search': search_command,
+    'stats': stats_command,
+}
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Imports, exports, backs up and searches the phone book "
+                                                 "without opening its window. Prints a JSON summary.")
+    parser.add_argument('--db', default="contacts_database.db", help="database file (default contacts_database.db)")
+    parser.add_argument('--snapshot', default=SNAPSHOT_FILE,
+                        help=f"snapshot file of the contacts on PC, used with --local (default {SNAPSHOT_FILE})")
+    parser.add_argument('--metrics', action='store_true', help="add per query timings to the summary")
+    parser.add_argument('--summary-file', help="also append the summary as one JSON line to this file")
+    parser.add_argument('--verbose', action='store_true', help="report progress on stderr")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('import', help="import a contacts CSV file")
+    command.add_argument('file', help="CSV file with a Name, Surname, Number, Email header")
+    command.add_argument('--local', action='store_true', help="import into the contacts on PC")
+    command.add_argument('--workers', type=int, help="validating processes (default: one per CPU for files "
+                                                     f"of {PARALLEL_IMPORT_BYTES >> 20} MiB or more, else 1)")
+    command.add_argument('--chunk-size', type=int, default=1000, help="rows per batch (default 1000)")
+
+    command = commands.add_parser('export', help="export the contacts to a CSV file")
+    command.add_argument('file', help="CSV file to write, compressed if it ends in .gz, .xz or .lzma")
+    command.add_argument('--local', action='store_true', help="export the contacts on PC")
+    command.add_argument('--compression', choices=['auto', 'gzip', 'lzma', 'none'], default='auto',
+                         help="compression (default: by file extension)")
+
+    command = commands.add_parser('backup', help="write a consistent copy of the database")
+    command.add_argument('file', help="file to write the copy to")
+
+    command = commands.add_parser('restore', help="replace the database with a copy made by backup")
+    command.add_argument('file', help="copy to restore")
+
+    command = commands.add_parser('search', help="search the contacts")
+    command.add_argument('keyword')
+    command.add_argument('--local', action='store_true', help="search the names of the contacts on PC")
+    command.add_argument('--limit', type=int, default=100, help="matches listed (default 100)")
+
+    command = commands.add_parser('stats', help="describe the contacts")
+    command.add_argument('--local', action='store_true', help="describe the contacts on PC")
+    return parser.parse_args(argv)
+
+
+def run(arguments):
+    """
+        Runs the command of the parsed arguments. Returns the summary of the run.
+        """
+    timer = StartupTimer()
+    metrics = QueryMetrics() if arguments.metrics else None
+    app_data = AppData(arguments.db, arguments.snapshot, seed_file=None, timer=timer, metrics=metrics)
+    summary = {'command': arguments.command, 'started': time.strftime("%Y-%m-%dT%H:%M:%S%z")}
+    try:
+        # anything a command prints would break the JSON summary on stdout
+        with redirect_stdout(sys.stderr):
+            result = COMMANDS[arguments.command](arguments, app_data, progress_printer(arguments.verbose))
+    except (ValueError, OSError, sqlite3.Error) as e:
+        summary.update(ok=False, error=f"{type(e).__name__}: {e}")
+    else:
+        summary.update(ok=True, result=result)
+    finally:
+        app_data.close()
+    summary['seconds'] = round(timer.elapsed(), 4)
+    summary['phases'] = [{'phase': phase, 'started': round(started, 4), 'seconds': round(duration, 4)}
+                         for phase, started, duration in sorted(timer.phases, key=lambda phase: phase[1])]
+    if metrics is not None:
+        summary['queries'] = metrics.snapshot()
+    return summary
+
+
+def main(argv=None):
+    arguments = parse_arguments(argv)
+    summary = run(arguments)
+    line = json.dumps(summary, ensure_ascii=False)
+    print(line)
+    if arguments.summary_file:
+        with open(arguments.summary_file, 'a') as file:
+            file.write(line + "\n")
+    return 0 if summary['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
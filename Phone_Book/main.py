@@ -1,22 +1,96 @@
+import time
+
+# taken before the imports below, so the startup report includes them
+STARTED = time.perf_counter()
+
 import os
-import re
 
 import customtkinter
+import Validation
+from Bootstrap import AppData, StartupTimer
 from Contact import Contact, create_contact, search_contact, export_contacts_to_csv, import_contacts_from_csv, \
-    search_contacts_by_keyword, search_contact_by_object, delete_contact
-from DatabaseManager import DatabaseManager
+    search_contact_by_object, delete_contact
+from DataSource import ListDataSource, StoreDataSource, DatabaseDataSource, PlaceholderRow, contact_key
+from TaskRunner import TaskRunner
+
+startup_timer = StartupTimer(STARTED)
+startup_timer.record("import", STARTED)
+
+# the database is opened on first use and the contacts on PC are loaded after the window is shown,
+# see GUI.first_paint_event
+app_data = AppData(timer=startup_timer)
+
+# milliseconds between checks whether the contacts on PC changed and the snapshot needs saving
+SNAPSHOT_INTERVAL = 5000
+# milliseconds typing has to pause before the live search runs, searching the Cloud costs more
+SEARCH_DELAY = {"pc": 50, "cloud": 250}
+
+# short input error messages shown next to the contact entry fields
+INPUT_ERROR_MESSAGES = {
+    ("name", Validation.EMPTY): "Name cannot be empty",
+    ("name", Validation.TOO_LONG): f"Name cannot exceed {Contact.MAX_NAME_LENGTH} characters",
+    ("name", Validation.INVALID_CHARACTERS): "Can only contain chars",
+    ("surname", Validation.EMPTY): "surname cannot be empty",
+    ("surname", Validation.TOO_LONG): f"surname cannot exceed {Contact.MAX_SURNAME_LENGTH} characters",
+    ("surname", Validation.INVALID_CHARACTERS): "Can only contain chars",
+    ("number", Validation.EMPTY): "Number cannot be empty",
+    ("number", Validation.TOO_LONG): f"Number cannot exceed {Contact.MAX_NUMBER_LENGTH} integers",
+    ("number", Validation.INVALID_CHARACTERS): "Only digits",
+    ("email", Validation.TOO_LONG): f"Cannot exceed {Contact.MAX_EMAIL_LENGTH} chars",
+    ("email", Validation.INVALID_FORMAT): "Invalid email format",
+}
+
+
+
+# work run off the Tk thread by GUI.task_runner, the first argument is the running Task
+def load_local_task(task):
+    return app_data.load_local(progress=task.progress)
+
+
+def open_database_task(task, task_db_manager):
+    # reading the first page leaves the database open and its first pages cached for "All on Cloud"
+    task_db_manager.fetch_page(with_total=False)
+
+
+def push_task(task, task_db_manager):
+    return app_data.sync_engine.push(progress=lambda report: task.progress("Backing-Up..."))
+
+
+def pull_task(task, task_db_manager):
+    return app_data.sync_engine.pull(progress=lambda report: task.progress(f"Loading...\n{report}"))
+
+
+def save_snapshot_task(task):
+    return app_data.save_snapshot()
 
 
+def cloud_search_task(task, task_db_manager, keyword):
+    return app_data.cloud_search.search(keyword)
 
-# Create an instance of the DatabaseManager
-db_manager = DatabaseManager()
-# Create the contacts table
-db_manager.create_table()
 
-import_contacts_from_csv("file")
+def first_page_task(task, task_db_manager):
+    return task_db_manager.fetch_page()
+
+
+def import_task(task, filename):
+    return import_contacts_from_csv(filename, progress=task.progress)
+
+
+def export_task(task, filename, contacts):
+    return export_contacts_to_csv(filename, contacts, progress=task.progress)
+
+
+def export_cloud_task(task, task_db_manager, filename):
+    return task_db_manager.export_to_csv(filename, progress=task.progress)
+
+
+def insert_cloud_contact_task(task, task_db_manager, name, surname, number, email):
+    return task_db_manager.insert_contact(name, surname, number, email)
+
+
+def update_cloud_contact_task(task, task_db_manager, email, number, new_name, new_surname, new_number, new_email):
+    return task_db_manager.update_contact(email, number, new_name, new_surname, new_number, new_email)
 
-customtkinter.set_appearance_mode("System")  # Modes: "System" (standard), "Dark", "Light"
-customtkinter.set_default_color_theme("blue")  # Themes: "blue" (standard), "green", "dark-blue"
 
 
 class EditContactWindow(customtkinter.CTkToplevel):
@@ -91,20 +165,31 @@ class EditContactWindow(customtkinter.CTkToplevel):
         elif AddNewContactWindow.check_contact_input(self):
             found_contact = search_contact_by_object(self.contact)
             if found_contact is not None:
-                found_contact.name = name
-                found_contact.surname = surname
-                found_contact.number = number
-                found_contact.email = email
-                self.error_label.configure(text="contact edited\non your PC", text_color="green")
+                old_key = contact_key(found_contact)
+                try:
+                    found_contact.name = name
+                    found_contact.surname = surname
+                    found_contact.number = number
+                    found_contact.email = email
+                    self.error_label.configure(text="contact edited\non your PC", text_color="green")
+                    self.master.scrollable_frame.update_item(found_contact, old_key)
+                except ValueError as e:
+                    self.error_label.configure(text=f"{str(e)}", text_color="red")
             else:
                 print("Contact not found in my pc.")
 
-        try:
-            db_manager.update_contact(self.contact.email, self.contact.number, name, surname, number, email)
-            self.error_label2.configure(text="contact edited\non your Cloud", text_color="green")
-        except Exception as e:
-            exception_text = str(e)
-            self.error_label.configure(text=f"{exception_text}", text_color="red")
+        self.master.task_runner.submit_db(
+            update_cloud_contact_task, self.contact.email, self.contact.number, name, surname, number, email,
+            on_done=lambda result: self.show_result(self.error_label2, "contact edited\non your Cloud", "green"),
+            on_error=lambda error: self.show_result(self.error_label, str(error), "red"),
+            cancellable=False)
+
+    def show_result(self, label, text, color):
+        """
+               Shows the outcome of a background Cloud change, unless the window was closed meanwhile.
+               """
+        if self.winfo_exists():
+            label.configure(text=text, text_color=color)
 
 
 class AddNewContactWindow(customtkinter.CTkToplevel):
@@ -129,57 +214,18 @@ class AddNewContactWindow(customtkinter.CTkToplevel):
         surname = self.surname_entry.get()
         number = self.number_entry.get()
         email = self.email_entry.get()
-        validName = False
-        validSurname = False
-        validNum = False
-        validEmail = True
-        # handle possible name input errors and display them to the user
-        if not name:
-            self.name_label.configure(text="Name cannot be empty", text_color="red")
-        elif len(name) > Contact.MAX_NAME_LENGTH:
-            self.name_label.configure(text=f"Name cannot exceed {Contact.MAX_NAME_LENGTH} characters", text_color="red")
-        elif not all(char.isalpha() or char.isspace() for char in name):
-            self.name_label.configure(text="Can only contain chars", text_color="red")
-        elif name != "":
-            self.name_label.configure(text="Valid name", text_color="green")
-            validName = True
-
-        # handle possible surname input errors and display them to the user
-        if not surname:
-            self.surname_label.configure(text="surname cannot be empty", text_color="red")
-        elif len(surname) > Contact.MAX_SURNAME_LENGTH:
-            self.surname_label.configure(text=f"surname cannot exceed {Contact.MAX_SURNAME_LENGTH} characters",
-                                         text_color="red")
-        elif not all(char.isalpha() or char.isspace() for char in surname):
-            self.surname_label.configure(text="Can only contain chars", text_color="red")
-        elif surname != "":
-            self.surname_label.configure(text="Valid surname", text_color="green")
-            validSurname = True
-
-        # handle possible number input errors and display them to the user
-        if not number:
-            self.number_label.configure(text="Number cannot be empty", text_color="red")
-        elif len(number) > Contact.MAX_NAME_LENGTH:
-            self.number_label.configure(text=f"Number cannot exceed {Contact.MAX_NUMBER_LENGTH} integers",
-                                        text_color="red")
-        elif not number.isdigit():
-            self.number_label.configure(text="Only digits", text_color="red")
-        elif number != "":
-            self.number_label.configure(text="Valid number", text_color="green")
-            validNum = True
-        # handle possible email input errors and display them to the user
-        if len(email) > Contact.MAX_EMAIL_LENGTH:
-            self.email_label.configure(text=f"Cannot exceed {Contact.MAX_EMAIL_LENGTH} chars", text_color="red")
-            validEmail = False
-        elif email and not re.match(r'^[\w.-]+@[a-zA-Z]+\.[a-zA-Z]{2,}$', email):
-            self.email_label.configure(text="Invalid email format", text_color="red")
-            validEmail = False
-        elif email != "":
-            self.email_label.configure(text="Valid email", text_color="green")
-            validEmail = True
+        codes = Validation.validate_contact(name, surname, number, email)
+        # handle possible input errors and display them to the user, field by field
+        fields = (("name", name, self.name_label), ("surname", surname, self.surname_label),
+                  ("number", number, self.number_label), ("email", email, self.email_label))
+        for (field, value, label), code in zip(fields, codes):
+            if code is not None:
+                label.configure(text=INPUT_ERROR_MESSAGES[(field, code)], text_color="red")
+            elif value != "":
+                label.configure(text=f"Valid {field}", text_color="green")
 
         print(f"name: {name} {surname}\nphone: {number}\nemail: {email}")
-        return validName and validSurname and validNum and validEmail
+        return not any(codes)
 
     def __init__(self, *args, **kwargs):
         """
@@ -255,12 +301,18 @@ class AddNewContactWindow(customtkinter.CTkToplevel):
         if not self.check_contact_input():
             self.error_label.configure(text="Wrong input", text_color="red")
         elif self.check_contact_input():
-            try:
-                db_manager.insert_contact(name, surname, number, email)
-                self.error_label.configure(text="new contact added", text_color="green")
-            except Exception as e:
-                exception_text = str(e)
-                self.error_label.configure(text=f"{exception_text}", text_color="red")
+            self.master.task_runner.submit_db(
+                insert_cloud_contact_task, name, surname, number, email,
+                on_done=lambda result: self.show_result("new contact added", "green"),
+                on_error=lambda error: self.show_result(str(error), "red"),
+                cancellable=False)
+
+    def show_result(self, text, color):
+        """
+                Shows the outcome of adding to the cloud in the background, unless the window was closed meanwhile.
+                """
+        if self.winfo_exists():
+            self.error_label.configure(text=text, text_color=color)
 
 
 class ContactTextBox(customtkinter.CTk):
@@ -278,83 +330,227 @@ class ContactTextBox(customtkinter.CTk):
         self.textbox.insert("0.0", "Some example text!\n" * 50)
 
 
-class ScrollableLabelButtonFrame(customtkinter.CTkScrollableFrame):
+class ScrollableLabelButtonFrame(customtkinter.CTkFrame):
     """
-        Custom tkinter frame for scrollable labels and buttons.
+        Custom tkinter frame for a scrollable list of labels and buttons.
+
+        The list is virtualized: it only creates enough label and button rows to fill its height and
+        rebinds them to contacts read from a data source (see DataSource.py) as the user scrolls,
+        so showing a list costs the same for ten contacts as for a million.
         """
+    # a row is a 28 pixel label plus 10 pixels of padding
+    ROW_HEIGHT = 38
+    WHEEL_ROWS = 3
 
-    def __init__(self, master, command=None, **kwargs):
+    def __init__(self, master, command=None, label_text="", **kwargs):
         """
                 Initializes the ScrollableLabelButtonFrame class.
 
                 Args:
                     master: The parent widget.
                     command: Optional command to be associated with the buttons.
+                    label_text: Optional text displayed above the list.
                     kwargs: Additional keyword arguments for customization.
                 Returns:
                     None
                 """
         super().__init__(master, **kwargs)
         self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
 
         self.command = command
-        self.radiobutton_variable = customtkinter.StringVar()
+        self.header_label = customtkinter.CTkLabel(self, text=label_text)
+        self.header_label.grid(row=0, column=0, columnspan=2, padx=5, pady=(5, 0), sticky="ew")
+        self.rows_frame = customtkinter.CTkFrame(self, fg_color="transparent")
+        self.rows_frame.grid(row=1, column=0, padx=(5, 0), pady=5, sticky="nsew")
+        self.rows_frame.grid_columnconfigure(0, weight=1)
+        self.scrollbar = customtkinter.CTkScrollbar(self, command=self.scrollbar_event)
+        self.scrollbar.grid(row=1, column=1, pady=5, sticky="ns")
         self.label_list = []
         self.button_list = []
+        # (contact key, label text) each row widget currently shows, (None, None) for hidden rows
+        self.bound_rows = []
+        self.source = ListDataSource()
+        self.first_row = 0
+        self.rows_frame.bind("<Configure>", self.resize_event)
+        self.bind_mouse_wheel(self.rows_frame)
+
+    def bind_mouse_wheel(self, widget):
+        """
+                Scrolls the list when the mouse wheel is used over the provided widget.
+                """
+        widget.bind("<MouseWheel>", self.mouse_wheel_event)
+        widget.bind("<Button-4>", lambda event: self.scroll_to(self.first_row - self.WHEEL_ROWS))
+        widget.bind("<Button-5>", lambda event: self.scroll_to(self.first_row + self.WHEEL_ROWS))
+
+    def visible_rows(self):
+        return len(self.label_list)
+
+    def resize_event(self, event):
+        """
+                Creates row widgets until they fill the visible height of the list, then redraws it.
+                """
+        needed = max(1, event.height // self.ROW_HEIGHT)
+        while len(self.label_list) < needed:
+            row = len(self.label_list)
+            label = customtkinter.CTkLabel(self.rows_frame, text="", compound="left", padx=5, anchor="w")
+            button = customtkinter.CTkButton(self.rows_frame, text="Details", width=100, height=24)
+            label.grid(row=row, column=0, pady=(0, 10), sticky="w")
+            button.grid(row=row, column=1, pady=(0, 10), padx=5)
+            self.bind_mouse_wheel(label)
+            self.bind_mouse_wheel(button)
+            label.grid_remove()
+            button.grid_remove()
+            self.label_list.append(label)
+            self.button_list.append(button)
+            self.bound_rows.append((None, None))
+        while len(self.label_list) > needed:
+            self.label_list.pop().destroy()
+            self.button_list.pop().destroy()
+            self.bound_rows.pop()
+        self.render()
+
+    def render(self):
+        """
+                Binds the row widgets to the contacts from first_row on and updates the scrollbar.
+                Rows still showing a contact with the same key and text are left untouched.
+                A PlaceholderRow, e.g. a row still loading, is shown with its Details button disabled.
+                """
+        contacts = self.source.fetch(self.first_row, self.visible_rows())
+        for position, (label, button) in enumerate(zip(self.label_list, self.button_list)):
+            if position < len(contacts):
+                contact = contacts[position]
+                binding = (contact_key(contact), str(contact))
+                if self.bound_rows[position] == binding:
+                    continue
+                label.configure(text=binding[1])
+                if isinstance(contact, PlaceholderRow):
+                    button.configure(state="disabled")
+                else:
+                    button.configure(state="normal")
+                    if self.command is not None:
+                        button.configure(command=lambda contact=contact: self.command(contact))
+                if self.bound_rows[position][0] is None:
+                    label.grid()
+                    button.grid()
+                self.bound_rows[position] = binding
+            elif self.bound_rows[position][0] is not None:
+                label.grid_remove()
+                button.grid_remove()
+                self.bound_rows[position] = (None, None)
+        total = self.source.count()
+        if total:
+            self.scrollbar.set(self.first_row / total, min(1.0, (self.first_row + self.visible_rows()) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, first_row):
+        """
+                Scrolls the list so first_row is the topmost visible row.
+                """
+        last_first_row = max(0, self.source.count() - self.visible_rows())
+        first_row = min(max(0, int(first_row)), last_first_row)
+        if first_row != self.first_row:
+            self.first_row = first_row
+            self.render()
+
+    def scrollbar_event(self, action, value, unit=None):
+        """
+                Handles the 'moveto' and 'scroll' commands sent by the scrollbar.
+                """
+        if action == "moveto":
+            self.scroll_to(float(value) * self.source.count())
+        elif unit == "pages":
+            self.scroll_to(self.first_row + int(value) * self.visible_rows())
+        else:
+            self.scroll_to(self.first_row + int(value))
+
+    def mouse_wheel_event(self, event):
+        self.scroll_to(self.first_row + (-self.WHEEL_ROWS if event.delta > 0 else self.WHEEL_ROWS))
+
+    def set_source(self, source):
+        """
+                Shows the contacts of the provided data source, from the top.
+
+                Args:
+                    source: A ContactDataSource.
+                Returns:
+                    None
+                """
+        self.source = source
+        self.first_row = 0
+        self.render()
+
+    def set_items(self, contacts):
+        """
+                Shows the provided contacts, e.g. new search results, from the top.
+                Only the row widgets whose contact changed from the previous results are redrawn.
 
-    def add_item(self, item, image=None):
+                Args:
+                    contacts: A list of contacts.
+                Returns:
+                    None
+                """
+        self.set_source(ListDataSource(contacts))
+
+    def list_source(self):
         """
-                Add an item with a label and button to the frame.
+                Returns the ListDataSource shown by the frame, switching to an empty one if it shows another source.
+                """
+        if not isinstance(self.source, ListDataSource):
+            self.set_source(ListDataSource())
+        return self.source
+
+    def add_item(self, item):
+        """
+                Add an item with a label and button to the end of the list.
 
                 Args:
                     item: The item to be displayed.
-                    image: Optional image to be displayed alongside the label.
                 Returns:
                     None
                 """
-        contact = item
-        label = customtkinter.CTkLabel(self, text=item, image=image, compound="left", padx=5, anchor="w")
-        button = customtkinter.CTkButton(self, text="Details", width=100, height=24)
-        if self.command is not None:
-            button.configure(command=lambda: self.command(contact))
-        label.grid(row=len(self.label_list), column=0, pady=(0, 10), sticky="w")
-        button.grid(row=len(self.button_list), column=1, pady=(0, 10), padx=5)
-        self.label_list.append(label)
-        self.button_list.append(button)
+        self.list_source().add(item)
+        self.render()
+
+    def update_item(self, item, old_key=None):
+        """
+                Redraw an item whose fields changed, in place.
+
+                Args:
+                    item: The changed item.
+                    old_key: The item's (number, email) before the change, if either of them changed.
+                Returns:
+                    None
+                """
+        if isinstance(self.source, ListDataSource):
+            self.source.update(item, old_key)
+        self.render()
 
     def remove_item(self, item):
         """
-               Remove an item from the frame.
+               Remove an item from the list.
 
                Args:
                    item: The item to be removed.
                Returns:
                    None
                """
-        for label, button in zip(self.label_list, self.button_list):
-            if item == label.cget("text"):
-                label.destroy()
-                button.destroy()
-                self.label_list.remove(label)
-                self.button_list.remove(button)
-
-                return
+        if isinstance(self.source, ListDataSource):
+            self.source.remove(item)
+        self.first_row = min(self.first_row, max(0, self.source.count() - self.visible_rows()))
+        self.render()
 
     def clear_all(self):
         """
-                Remove all items from the frame.
+                Remove all items from the list.
 
                 Args:
                     None
                 Returns:
                     None
                 """
-        while self.label_list and self.button_list != 0:
-            for label, button in zip(self.label_list, self.button_list):
-                label.destroy()
-                button.destroy()
-                self.label_list.remove(label)
-                self.button_list.remove(button)
+        self.set_source(ListDataSource())
 
 
 class GUI(customtkinter.CTk):
@@ -418,9 +614,9 @@ class GUI(customtkinter.CTk):
                                                   command=self.import_button_event)
         self.csv_button.grid(row=7, column=0, padx=20, pady=5)
 
-        self.csv_button = customtkinter.CTkButton(self.left_frame, text="Export",
-                                                  command=self.export_button_event)
-        self.csv_button.grid(row=8, column=0, padx=20, pady=5)
+        self.csv_export_button = customtkinter.CTkButton(self.left_frame, text="Export",
+                                                         command=self.export_button_event)
+        self.csv_export_button.grid(row=8, column=0, padx=20, pady=5)
 
         self.appearance_mode = customtkinter.CTkLabel(self.left_frame, text="Appearance Mode:", anchor="w")
         self.appearance_mode.grid(row=9, column=0, padx=20, pady=(20, 0))
@@ -443,6 +639,10 @@ class GUI(customtkinter.CTk):
                                                      border_width=2, text_color=("gray10", "#DCE4EE"),
                                                      command=self.search_button_event)
         self.search_button.grid(row=2, column=1, padx=(20, 20), pady=(5, 5), sticky="nsew")
+        # live search, runs once typing pauses for SEARCH_DELAY milliseconds
+        self.search_after = None
+        self.searched_keyword = None
+        self.entry.bind("<KeyRelease>", self.entry_key_event)
         self.scrollable_frame = ScrollableLabelButtonFrame(self.middle_frame, width=300, label_text="Names",
                                                            command=self.label_button_frame_event)
         self.scrollable_frame.grid(row=5, column=1, padx=(20, 20), pady=(5, 10), sticky="nsew")
@@ -471,9 +671,33 @@ class GUI(customtkinter.CTk):
                                                             command=self.label_button_edit_event)
         self.right_frame_add_edit.grid(row=5, column=0, padx=(0, 0), pady=(5, 5))
 
-        self.right_frame_add_new_contact_button = customtkinter.CTkButton(self.right_frame, text="Delete contact",
-                                                                          command=self.delete_contact)
-        self.right_frame_add_new_contact_button.grid(row=6, column=0, padx=(0, 0), pady=(5, 15))
+        self.right_frame_delete_button = customtkinter.CTkButton(self.right_frame, text="Delete contact",
+                                                                 command=self.delete_contact)
+        self.right_frame_delete_button.grid(row=6, column=0, padx=(0, 0), pady=(5, 15))
+
+        # Button: cancels running back-ups, downloads, imports and exports
+        self.right_frame_cancel_button = customtkinter.CTkButton(self.right_frame, text="Cancel",
+                                                                 command=self.cancel_button_event)
+        self.right_frame_cancel_button.grid(row=7, column=0, padx=(0, 0), pady=(5, 15))
+
+        # buttons that read or change the contacts on PC, disabled until they are loaded
+        self.local_data_buttons = [self.left_frame_button_all_on_pc, self.left_frame_button_back_up,
+                                   self.left_frame_button_load_from_cloud, self.csv_button, self.csv_export_button,
+                                   self.search_button, self.right_frame_add_new_contact_button,
+                                   self.right_frame_add_edit, self.right_frame_delete_button]
+        for button in self.local_data_buttons:
+            button.configure(state="disabled")
+
+        # file and database work runs here so the window stays responsive,
+        # the database is opened on the database thread the first time a task needs it
+        self.task_runner = TaskRunner(db_factory=lambda: app_data.db_manager)
+        self.task_runner.start_polling(self)
+        self.protocol("WM_DELETE_WINDOW", self.close_event)
+        self.snapshot_task = None
+        # the contacts are loaded once the window is painted, see first_paint_event
+        self.startup_pending = {"local", "cloud"}
+        self.painted = False
+        self.bind("<Map>", self.map_event, add="+")
 
         self.allSelected = "none"
 
@@ -482,6 +706,108 @@ class GUI(customtkinter.CTk):
         self.add_new_contact_window = None
         self.edit_contact_window = None
 
+    def map_event(self, event):
+        """
+               Waits for the window to be drawn after it is first mapped, then starts loading the data.
+
+               Args:
+                   event: The Map event, also sent for every child widget.
+               Returns:
+                   None
+               """
+        if event.widget is self and not self.painted:
+            self.painted = True
+            self.after_idle(self.first_paint_event)
+
+    def first_paint_event(self):
+        """
+               Loads the contacts on PC and opens the database in the background once the window is shown.
+
+               Args:
+                   None
+               Returns:
+                   None
+               """
+        startup_timer.mark("first paint")
+        self.status_label.configure(text="Loading contacts...", text_color="gray")
+        self.load_local_event()
+        # startup work is not cancellable, the Cancel button only stops what the user started
+        self.task_runner.submit_db(open_database_task, on_done=lambda result: self.startup_done_event("cloud"),
+                                   on_error=self.open_database_failed_event, cancellable=False)
+
+    def load_local_event(self):
+        """
+               Loads the contacts on PC in the background.
+
+               Args:
+                   None
+               Returns:
+                   None
+               """
+        self.task_runner.submit(load_local_task, on_done=self.local_data_loaded_event,
+                                on_error=self.local_data_failed_event, on_progress=self.load_local_progress_event,
+                                cancellable=False)
+
+    def load_local_progress_event(self, report):
+        """
+               Shows how far the first import of the seed CSV file got.
+
+               Args:
+                   report: The ImportReport of the running import.
+               Returns:
+                   None
+               """
+        self.status_label.configure(text=f"Loading contacts...\n{report.rows} rows", text_color="gray")
+
+    def local_data_loaded_event(self, count):
+        """
+               Enables the buttons working on the contacts on PC once they are loaded
+               and starts saving them to the snapshot file when they change.
+
+               Args:
+                   count: The number of contacts loaded.
+               Returns:
+                   None
+               """
+        self.status_label.configure(text=f"{count} contacts\ron your PC", text_color="green")
+        for button in self.local_data_buttons:
+            button.configure(state="normal")
+        self.after(SNAPSHOT_INTERVAL, self.save_snapshot_event)
+        self.startup_done_event("local")
+
+    def local_data_failed_event(self, error):
+        """
+               Shows that the contacts on PC failed to load. The buttons are enabled anyway so the contacts
+               on the Cloud can still be used, but the snapshot file is not overwritten.
+
+               Args:
+                   error: The exception raised while loading.
+               Returns:
+                   None
+               """
+        self.status_failed_event(error)
+        for button in self.local_data_buttons:
+            button.configure(state="normal")
+        self.startup_done_event("local")
+
+    def open_database_failed_event(self, error):
+        print(f"Failed to open {app_data.db_name}: {error}")
+        self.startup_done_event("cloud")
+
+    def startup_done_event(self, part):
+        """
+               Prints the startup report once the contacts on PC are loaded and the database is open.
+
+               Args:
+                   part: "local" or "cloud", the part of the data that finished loading.
+               Returns:
+                   None
+               """
+        self.startup_pending.discard(part)
+        if not self.startup_pending:
+            startup_timer.mark("ready")
+            print(startup_timer.report())
+
     def change_appearance_mode_event(self, new_appearance_mode: str):
         """
                 Handles the event of changing the appearance mode.
@@ -502,10 +828,8 @@ class GUI(customtkinter.CTk):
                 Returns:
                     None
                 """
-        self.scrollable_frame.clear_all()
         self.allSelected = "pc"
-        for contact in Contact.static_contacts:
-            self.scrollable_frame.add_item(contact)
+        self.scrollable_frame.set_source(StoreDataSource(Contact.static_contacts))
 
     def all_on_cloud_button_event(self):
         """
@@ -516,11 +840,28 @@ class GUI(customtkinter.CTk):
                Returns:
                    None
                """
-        self.scrollable_frame.clear_all()
         self.allSelected = "cloud"
-        cloud_contacts = db_manager.download_contacts()
-        for contact in cloud_contacts:
-            self.scrollable_frame.add_item(contact)
+        self.status_label.configure(text="Loading...", text_color="gray")
+        self.task_runner.submit_db(first_page_task, on_done=self.all_on_cloud_done_event,
+                                   on_error=self.status_failed_event)
+
+    def all_on_cloud_done_event(self, first_page):
+        """
+               Shows the contacts on the Cloud once their first page was fetched,
+               the list fetches further pages on the database thread as it is scrolled and redraws
+               once they arrive.
+
+               Args:
+                   first_page: The first ContactPage of the contacts on the Cloud.
+               Returns:
+                   None
+               """
+        self.status_label.configure(text="")
+        if self.allSelected == "cloud":
+            self.scrollable_frame.set_source(DatabaseDataSource(app_data.db_manager, first_page,
+                                                                task_runner=self.task_runner,
+                                                                on_loaded=self.scrollable_frame.render,
+                                                                on_error=self.status_failed_event))
 
     def back_up_button_event(self):
         """
@@ -531,12 +872,23 @@ class GUI(customtkinter.CTk):
                Returns:
                    None
                """
+        self.status_label.configure(text="Backing-Up...", text_color="gray")
+        self.task_runner.submit_db(push_task,
+                                   on_done=self.back_up_done_event,
+                                   on_error=self.status_failed_event,
+                                   on_progress=self.status_progress_event,
+                                   on_cancel=self.status_cancelled_event)
+
+    def back_up_done_event(self, report):
+        """
+               Shows the outcome of a finished back-up.
 
-        try:
-            db_manager.backup(Contact.static_contacts)
-            self.status_label.configure(text="Backed-Up", text_color="green")
-        except Exception as e:
-            self.status_label.configure(text="Failed", text_color="red")
+               Args:
+                   report: The SyncReport of the back-up.
+               Returns:
+                   None
+               """
+        self.show_sync_report("Backed-Up", report)
 
     def download_from_cloud_button_event(self):
         """
@@ -547,12 +899,121 @@ class GUI(customtkinter.CTk):
                Returns:
                    None
                """
+        self.status_label.configure(text="Loading...", text_color="gray")
+        self.task_runner.submit_db(pull_task,
+                                   on_done=self.download_from_cloud_done_event,
+                                   on_error=self.status_failed_event,
+                                   on_progress=self.status_progress_event,
+                                   on_cancel=self.status_cancelled_event)
+
+    def download_from_cloud_done_event(self, report):
+        """
+               Shows the outcome of a finished download from the Cloud.
+
+               Args:
+                   report: The SyncReport of the download.
+               Returns:
+                   None
+               """
+        self.show_sync_report("Loaded", report)
+
+    def show_sync_report(self, title, report):
+        """
+               Shows how many contacts a sync transferred in the status label and prints its conflicts.
+
+               Args:
+                   title: The first line of the status.
+                   report: The SyncReport of the sync.
+               Returns:
+                   None
+               """
+        for conflict in report.conflicts:
+            print(f"Sync conflict: {conflict}")
+        text = f"{title}\n{report.transferred} changes"
+        if report.conflicts:
+            self.status_label.configure(text=f"{text}\n{len(report.conflicts)} conflicts", text_color="orange")
+        else:
+            self.status_label.configure(text=text, text_color="green")
+
+    def status_progress_event(self, text):
+        """
+               Shows the progress of a running back-up or download in the status label.
+
+               Args:
+                   text: The progress text.
+               Returns:
+                   None
+               """
+        self.status_label.configure(text=text, text_color="gray")
+
+    def status_failed_event(self, error):
+        """
+               Shows in the status label that a background task failed.
+
+               Args:
+                   error: The exception the task raised.
+               Returns:
+                   None
+               """
+        print(f"task failed: {error}")
+        self.status_label.configure(text="Failed", text_color="red")
+
+    def status_cancelled_event(self):
+        """
+               Shows in the status label that a background task was cancelled.
+
+               Args:
+                   None
+               Returns:
+                   None
+               """
+        self.status_label.configure(text="Cancelled", text_color="red")
+
+    def cancel_button_event(self):
+        """
+               Handles the event when the "Cancel" button is clicked.
+
+               Args:
+                   None
+               Returns:
+                   None
+               """
+        self.task_runner.cancel_all(cancellable_only=True)
+
+    def close_event(self):
+        """
+               Stops the background tasks and saves the contacts on PC before the window is closed,
+               and prints the query metrics if they are collected.
+
+               Args:
+                   None
+               Returns:
+                   None
+               """
+        self.task_runner.shutdown()
         try:
-            loaded_contacts = DatabaseManager.download_contacts(db_manager)
-            Contact.static_contacts.update(loaded_contacts)
-            self.status_label.configure(text="Loaded", text_color="green")
-        except Exception as e:
-            self.status_label.configure(text="Failed", text_color="red")
+            app_data.save_snapshot()
+        except OSError as e:
+            print(f"Failed to save {app_data.snapshot_file}: {e}")
+        if app_data.metrics is not None:
+            print(app_data.metrics.report())
+        self.destroy()
+
+    def save_snapshot_event(self):
+        """
+               Saves the contacts on PC to the snapshot file in the background if they changed,
+               then checks again after SNAPSHOT_INTERVAL milliseconds.
+
+               Args:
+                   None
+               Returns:
+                   None
+               """
+        if app_data.snapshot_saver.changed() and (self.snapshot_task is None or self.snapshot_task.finished):
+            self.snapshot_task = self.task_runner.submit(
+                save_snapshot_task, on_error=lambda error: print(f"Failed to save {app_data.snapshot_file}: {error}"),
+                cancellable=False)
+        self.after(SNAPSHOT_INTERVAL, self.save_snapshot_event)
 
     def label_button_frame_event(self, item):
         """
@@ -612,28 +1073,64 @@ class GUI(customtkinter.CTk):
             self.add_new_contact_window.focus()  # if window exists focus it
         print(f"label_button_add_new_contact_event")
 
+    def entry_key_event(self, event):
+        """
+                Restarts the live search delay when the text of the entry changed.
+
+                Args:
+                    event: The KeyRelease event.
+                Returns:
+                    None
+                """
+        if self.allSelected == "none" or self.entry.get() == self.searched_keyword:
+            return
+        if self.search_after is not None:
+            self.after_cancel(self.search_after)
+        self.search_after = self.after(SEARCH_DELAY[self.allSelected], self.search_button_event)
+
     def search_button_event(self):
         """
-                Handles the event when the "Search" button is clicked.
+                Handles the event when the "Search" button is clicked, or typing paused in the entry.
+                An empty search shows all contacts again.
 
                 Args:
                     None
                 Returns:
                     None
                 """
+        if self.search_after is not None:
+            self.after_cancel(self.search_after)
+            self.search_after = None
         search_keyword = self.entry.get()
+        self.searched_keyword = search_keyword
         if self.allSelected == "none":
             return
         if self.allSelected == "pc":
-            contacts = search_contacts_by_keyword(search_keyword)
-            self.scrollable_frame.clear_all()
-            for contact in contacts:
-                self.scrollable_frame.add_item(contact)
+            if not search_keyword:
+                self.scrollable_frame.set_source(StoreDataSource(Contact.static_contacts))
+                return
+            contacts = app_data.local_search.search(search_keyword)
+            self.scrollable_frame.set_items(contacts)
         if self.allSelected == "cloud":
-            contacts = db_manager.search_contacts(search_keyword)
-            self.scrollable_frame.clear_all()
-            for contact in contacts:
-                self.scrollable_frame.add_item(contact)
+            if not search_keyword.strip():
+                self.all_on_cloud_button_event()
+                return
+            self.task_runner.submit_db(cloud_search_task, search_keyword,
+                                       on_done=lambda contacts: self.cloud_search_done_event(search_keyword, contacts),
+                                       on_error=self.status_failed_event)
+
+    def cloud_search_done_event(self, search_keyword, contacts):
+        """
+                Shows the results of a search on the Cloud, unless the search changed while it ran.
+
+                Args:
+                    search_keyword: The keyword that was searched for.
+                    contacts: A list of the matching contacts.
+                Returns:
+                    None
+                """
+        if self.allSelected == "cloud" and self.searched_keyword == search_keyword:
+            self.scrollable_frame.set_items(contacts)
 
     def export_button_event(self):
         """
@@ -644,12 +1141,46 @@ class GUI(customtkinter.CTk):
                 Returns:
                     None
                 """
-        contacts_for_export = Contact.static_contacts
-        try:
-            export_contacts_to_csv("my_export", contacts_for_export)
-            self.csv_label.configure(text="CVS: Exported", text_color="green")
-        except Exception as e:
-            self.csv_label.configure(text="Export failed", text_color="red")
+        dialog = customtkinter.CTkInputDialog(text="Type in export file\n(.csv, .csv.gz or .csv.xz):",
+                                              title="Export CSV")
+        filename = dialog.get_input()  # waits for input
+        if not filename:
+            return
+
+        # the contacts on the Cloud are exported while "All on Cloud" is shown, the contacts on PC otherwise
+        callbacks = dict(on_done=self.export_done_event,
+                         on_error=lambda error: self.csv_label.configure(text="Export failed", text_color="red"),
+                         on_progress=self.export_progress_event,
+                         on_cancel=lambda: self.csv_label.configure(text="CVS: Export cancelled", text_color="red"))
+        self.csv_label.configure(text="CVS: Exporting...", text_color="gray")
+        if self.allSelected == "cloud":
+            self.task_runner.submit_db(export_cloud_task, filename, **callbacks)
+        else:
+            self.task_runner.submit(export_task, filename, Contact.static_contacts.snapshot(), **callbacks)
+
+    def export_progress_event(self, report):
+        """
+                Shows the progress of a running CSV export.
+
+                Args:
+                    report: The ExportReport of the running export.
+                Returns:
+                    None
+                """
+        self.csv_label.configure(text=f"CVS: {report.rows} rows\n{report.rows_per_second:.0f} rows/s",
+                                 text_color="gray")
+
+    def export_done_event(self, report):
+        """
+                Shows the outcome of a finished CSV export.
+
+                Args:
+                    report: The ExportReport of the export.
+                Returns:
+                    None
+                """
+        self.csv_label.configure(text=f"CVS: Exported\n{report}", text_color="green")
+        print(f"export file: {report.filename}")
 
     def import_button_event(self):
         """
@@ -667,14 +1198,39 @@ class GUI(customtkinter.CTk):
         if not self.check_file_format(self.source_csv):
             self.csv_label.configure(text="wrong CVS src", text_color="red")
         if self.check_file_format(self.source_csv):
-            try:
-                import_contacts_from_csv(self.source_csv)
-                self.csv_label.configure(text="CVS: Imported", text_color="green")
-            except Exception as e:
-                self.csv_label.configure(text="Import failed", text_color="red")
+            self.task_runner.submit(import_task, self.source_csv,
+                                    on_done=self.import_done_event,
+                                    on_error=lambda error: self.csv_label.configure(text="Import failed",
+                                                                                    text_color="red"),
+                                    on_progress=self.import_progress_event,
+                                    on_cancel=lambda: self.csv_label.configure(text="CVS: Import cancelled",
+                                                                               text_color="red"))
 
         print(f"import file: {self.source_csv}")
 
+    def import_progress_event(self, report):
+        """
+                Shows the progress of a running CSV import.
+
+                Args:
+                    report: The ImportReport of the running import.
+                Returns:
+                    None
+                """
+        self.csv_label.configure(text=f"CVS: {report.rows} rows\n{report.rows_per_second:.0f} rows/s",
+                                 text_color="gray")
+
+    def import_done_event(self, report):
+        """
+                Shows the outcome of a finished CSV import.
+
+                Args:
+                    report: The ImportReport of the import.
+                Returns:
+                    None
+                """
+        self.csv_label.configure(text=f"CVS: Imported\n{report}", text_color="green")
+
     def check_file_format(self, filename):
         """
         Checks if the file with the provided filename exists and determines its format (CSV or TXT). Returns a tuple
@@ -700,10 +1256,23 @@ class GUI(customtkinter.CTk):
         if confirm_input == "CONFIRM DELETE":
             try:
                 delete_contact(EditContactWindow.contact)
+                self.scrollable_frame.remove_item(EditContactWindow.contact)
                 self.status_label.configure(text="Contact was deleted\rfrom your PC", text_color="green")
             except Exception as e:
                 self.status_label.configure(text="Failed to delete", text_color="red")
 
 
-app = GUI()
-app.mainloop()
+def main():
+    """
+        Starts the PhoneBook application. The window is shown before any data is loaded,
+        the startup report is printed once the data is ready.
+        """
+    customtkinter.set_appearance_mode("System")  # Modes: "System" (standard), "Dark", "Light"
+    customtkinter.set_default_color_theme("blue")  # Themes: "blue" (standard), "green", "dark-blue"
+    with startup_timer.phase("window"):
+        app = GUI()
+    app.mainloop()
+
+
+if __name__ == '__main__':
+    main()
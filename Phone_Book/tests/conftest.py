@@ -0,0 +1,39 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Contact import Contact
+from ContactStore import ContactStore
+from DatabaseManager import DatabaseManager
+
+
+@pytest.fixture(autouse=True)
+def static_contacts(monkeypatch):
+    """
+        Gives every test an empty Contact.static_contacts, the store create_contact and the imports fill.
+        """
+    store = ContactStore()
+    monkeypatch.setattr(Contact, 'static_contacts', store)
+    return store
+
+
+@pytest.fixture
+def db_manager(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "contacts.db"))
+    yield db_manager
+    db_manager.close_connection()
+
+
+def insert_unchecked(db_name, rows):
+    """
+        Writes (name, surname, number, email) rows past validation, the way rows from an older version
+        or another tool end up in the table.
+        """
+    connection = sqlite3.connect(db_name)
+    with connection:
+        connection.executemany("INSERT INTO contacts (name, surname, number, email) VALUES (?, ?, ?, ?)", rows)
+    connection.close()
@@ -0,0 +1,106 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from DatabaseManager import DatabaseManager
+from conftest import insert_unchecked
+
+CLI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cli.py")
+
+VALID_ROWS = [(name, "Lee", str(100 + i), f"{name.lower()}@example.com")
+              for i, name in enumerate(["Ann", "Bob", "Cid", "Dan", "Eve"])]
+# rows that fail validation, among them NULL columns, which used to crash the batch checks
+INVALID_ROWS = [("B0b", "Lee", "900", "b0b@example.com"), (None, "Lee", "901", "nobody@example.com"),
+                ("Ann", "Lee", "902", None), ("Ann", None, "903", "nosurname@example.com")]
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    """
+        A directory holding a database with rows that fail validation, a snapshot file that cannot be
+        loaded and a CSV file to import.
+        """
+    db_manager = DatabaseManager(str(tmp_path / "contacts.db"))
+    db_manager.insert_contacts(VALID_ROWS)
+    db_manager.close_connection()
+    insert_unchecked(str(tmp_path / "contacts.db"), INVALID_ROWS)
+    (tmp_path / "contacts.snapshot").write_bytes(b"not a snapshot")
+    (tmp_path / "import.csv").write_text("Name,Surname,Number,Email\n"
+                                         "Fay,Lee,600,fay@example.com\n"
+                                         "G4l,Lee,700,gal@example.com\n"
+                                         "Ann,Lee,100,ann@example.com\n")
+    return tmp_path
+
+
+def run_cli(directory, *arguments):
+    """
+        Runs cli.py in a fresh process, the way a cron job does. Returns the exit code, the summary
+        parsed from stdout and stderr.
+        """
+    command = [sys.executable, CLI, "--db", str(directory / "contacts.db"),
+               "--snapshot", str(directory / "contacts.snapshot"), *arguments]
+    process = subprocess.run(command, capture_output=True, text=True, cwd=directory)
+    lines = process.stdout.splitlines()
+    assert len(lines) == 1, f"expected one line on stdout, got {process.stdout!r}"
+    summary = json.loads(lines[0])
+    assert isinstance(summary, dict)
+    return process.returncode, summary, process.stderr
+
+
+@pytest.mark.parametrize("arguments", [
+    ("search", "Lee"),
+    ("search", "Lee", "--local"),
+    ("stats",),
+    ("stats", "--local"),
+    ("export", "export.csv.gz"),
+    ("backup", "backup.db"),
+    ("import", "import.csv"),
+    ("import", "import.csv", "--local"),
+])
+def test_stdout_is_one_json_summary(workspace, arguments):
+    returncode, summary, stderr = run_cli(workspace, *arguments)
+
+    assert returncode == 0, summary
+    assert summary['command'] == arguments[0]
+    assert summary['ok'] is True
+    assert isinstance(summary['seconds'], float)
+
+
+def test_invalid_rows_and_snapshot_are_reported_on_stderr(workspace):
+    _, summary, stderr = run_cli(workspace, "search", "Lee")
+    assert summary['result']['matches'] == len(VALID_ROWS)
+    # every invalid row the search matches, the one without a surname is not found by it
+    assert stderr.count("Failed to load contact") == sum(1 for row in INVALID_ROWS if row[1] == "Lee")
+
+    _, summary, stderr = run_cli(workspace, "stats", "--local")
+    assert summary['result']['contacts'] == 0
+    assert f"Failed to load {workspace / 'contacts.snapshot'}" in stderr
+
+
+def test_import_summary_lists_rejected_rows(workspace):
+    _, summary, _ = run_cli(workspace, "import", "import.csv")
+
+    assert summary['result']['imported'] == 1
+    assert summary['result']['rejected'] == 2
+    assert [error['line'] for error in summary['result']['errors']] == [3, 4]
+
+
+def test_backup_and_restore_round_trip(workspace):
+    run_cli(workspace, "backup", "backup.db")
+    run_cli(workspace, "import", "import.csv")
+
+    _, summary, _ = run_cli(workspace, "restore", "backup.db")
+    assert summary['ok'] is True
+    assert summary['result']['contacts'] == len(VALID_ROWS) + len(INVALID_ROWS)
+
+
+def test_failed_command_still_prints_a_summary(workspace):
+    returncode, summary, _ = run_cli(workspace, "--summary-file", "runs.jsonl", "import", "missing.csv")
+
+    assert returncode == 1
+    assert summary['ok'] is False
+    assert summary['error'].startswith("FileNotFoundError")
+    assert json.loads((workspace / "runs.jsonl").read_text()) == summary
@@ -0,0 +1,105 @@
+import pytest
+
+from Contact import Contact
+from ContactStore import ContactStore
+
+NAMES = ["Anna", "Bartek", "Celina", "Dominik", "Ewa", "Filip", "Grzegorz", "Halina", "Igor", "Joanna"]
+SURNAMES = ["Nowak", "Kowalski", "Wisniewski", "Wojcik", "Kaminska", "Lewandowski", "Zielinski", "Szymanska"]
+
+
+def make_contacts(count):
+    return [Contact(NAMES[i % len(NAMES)], SURNAMES[i * 7 % len(SURNAMES)], str(1000 + i), f"c{i}@example.com")
+            for i in range(count)]
+
+
+def scan(store, keyword, prefix=False):
+    keyword = keyword.casefold()
+    if prefix:
+        matches = [contact for contact in store
+                   if contact.name.casefold().startswith(keyword) or contact.surname.casefold().startswith(keyword)]
+    else:
+        matches = [contact for contact in store
+                   if keyword in contact.name.casefold() or keyword in contact.surname.casefold()]
+    return sorted(contact.number for contact in matches)
+
+
+def numbers(contacts):
+    return sorted(contact.number for contact in contacts)
+
+
+@pytest.fixture
+def store():
+    return ContactStore(make_contacts(200))
+
+
+# short keywords match most contacts and are scanned, longer ones go through the n-gram postings
+@pytest.mark.parametrize("keyword", ["a", "N", "an", "ow", "ski", "Kowal", "ANNA", "inska", "x", "qq", "Joanna Nowak"])
+def test_search_names_matches_a_scan(store, keyword):
+    assert numbers(store.search_names(keyword)) == scan(store, keyword)
+    assert numbers(store.search_names(keyword, prefix=True)) == scan(store, keyword, prefix=True)
+
+
+def test_edits_move_contacts_between_indexes(store):
+    store.search_names("Anna")
+    contact = store.get_by_number("1000")
+    version = store.version
+
+    contact.name = "Zofia"
+    contact.surname = "Mazur"
+    contact.number = "9999"
+    contact.email = "zofia@example.com"
+
+    assert store.version > version
+    assert contact not in store.search_names("Anna")
+    assert contact in store.search_names("zof")
+    assert contact in store.search_names("Mazur", prefix=True)
+    assert store.search_full_name("Zof", "Maz") == [contact]
+    assert store.get_by_full_name("Zofia", "Mazur") == [contact]
+    assert store.get_by_number("9999") is contact and store.get_by_number("1000") is None
+    assert store.get_by_email("zofia@example.com") is contact and store.get_by_email("c0@example.com") is None
+    assert numbers(store.search_names("a")) == scan(store, "a")
+
+
+def test_rejected_edit_leaves_the_store_as_it_was(store):
+    contact = store.get_by_number("1000")
+    version = store.version
+
+    with pytest.raises(ValueError):
+        contact.number = "1001"
+    with pytest.raises(ValueError):
+        contact.email = "c1@example.com"
+
+    assert contact.number == "1000" and contact.email == "c0@example.com"
+    assert store.get_by_number("1000") is contact
+    assert store.get_by_number("1001") is not contact
+    assert store.version == version
+
+
+def test_add_rejects_duplicates_and_remove_unlinks(store):
+    with pytest.raises(ValueError):
+        store.add(Contact("Anna", "Nowak", "1000", "other@example.com"))
+    with pytest.raises(ValueError):
+        store.add(Contact("Anna", "Nowak", "5555", "c0@example.com"))
+
+    contact = store.get_by_number("1000")
+    store.search_names("Anna")
+    store.remove(contact)
+    assert contact not in store
+    assert contact not in store.search_names("Anna")
+    assert contact not in store.get_by_full_name(contact.name, contact.surname)
+    assert len(store) == 199
+    with pytest.raises(KeyError):
+        store.remove(contact)
+
+
+def test_restore_builds_the_same_indexes_as_adding():
+    contacts = make_contacts(50)
+    restored = ContactStore()
+    restored.restore(contacts, [False] * len(contacts), [(7, 3)])
+
+    assert len(restored) == 50
+    assert restored.tombstones() == [(7, 3)]
+    assert restored.dirty_contacts() == []
+    assert numbers(restored.search_names("ow")) == scan(restored, "ow")
+    with pytest.raises(ValueError):
+        restored.restore(contacts, [False] * len(contacts), [])
@@ -0,0 +1,153 @@
+import sqlite3
+
+import pytest
+
+from Contact import Contact
+from DatabaseManager import MIGRATIONS, DatabaseManager
+from conftest import insert_unchecked
+
+# one row with a NULL in each column, and one with NULL sort keys that is otherwise valid apart from them
+NULL_ROWS = [
+    (None, "Doe", "100", "null.name@example.com"),
+    ("Jane", None, "101", "null.surname@example.com"),
+    ("Jane", "Doe", None, "null.number@example.com"),
+    ("Jane", "Doe", "103", None),
+]
+
+
+def sort_key(contact):
+    return contact.surname or '', contact.name or ''
+
+
+def walk_pages(db_manager, page_size):
+    pages = []
+    page = db_manager.fetch_page(page_size)
+    pages.append(page)
+    while page.next_token is not None:
+        page = db_manager.fetch_page(page_size, page.next_token)
+        pages.append(page)
+    return pages
+
+
+def test_null_columns_are_rejected_not_crashing(db_manager, capsys):
+    db_manager.insert_contact("John", "Smith", "200", "john@example.com")
+    insert_unchecked(db_manager.db_name, NULL_ROWS)
+
+    assert [contact.number for contact in db_manager.download_contacts()] == ["200"]
+    assert [contact.number for contact in db_manager.iter_contacts(batch_size=2)] == ["200"]
+    assert [contact.number for contact in db_manager.fetch_contacts(10)] == ["200"]
+    page = db_manager.fetch_page(10)
+    assert [contact.number for contact in page] == ["200"]
+    assert sorted(row[2] or '' for _, row in page.rejected) == ['', '100', '101', '103']
+    assert "Failed to load contact" in capsys.readouterr().err
+
+
+def test_paging_visits_every_row_once_with_null_sort_keys(db_manager):
+    rows = [(f"Name{chr(97 + i % 5)}", f"Surname{chr(97 + i % 3)}", str(1000 + i), f"c{i}@example.com")
+            for i in range(30)]
+    db_manager.insert_contacts(rows)
+    # written past validation: NULL surnames and names sort as '', before every other row
+    insert_unchecked(db_manager.db_name, [(None, None, "900", "a@example.com"), ("Ann", None, "901", "b@example.com"),
+                                          (None, "Zed", "902", "c@example.com")])
+
+    pages = walk_pages(db_manager, 4)
+    seen = [row[2] for page in pages for _, row in page.rejected] + [contact.number for page in pages for contact in page]
+
+    assert sorted(seen) == sorted(["900", "901", "902"] + [row[2] for row in rows])
+    assert pages[0].total == 33
+    valid = [contact for page in pages for contact in page]
+    assert [sort_key(contact) for contact in valid] == sorted(sort_key(contact) for contact in valid)
+
+
+def test_page_token_at_matches_walking_the_pages(db_manager):
+    db_manager.insert_contacts([(f"Name{chr(97 + i % 7)}", f"Surname{chr(97 + i % 4)}", str(1000 + i),
+                                 f"c{i}@example.com") for i in range(25)])
+    insert_unchecked(db_manager.db_name, [("Ann", None, "900", "a@example.com")])
+    pages = walk_pages(db_manager, 5)
+
+    assert db_manager.page_token_at(0) is None
+    for index in range(1, len(pages)):
+        token = db_manager.page_token_at(index * 5)
+        assert token == pages[index - 1].next_token
+        assert [contact.number for contact in db_manager.fetch_page(5, token)] == \
+               [contact.number for contact in pages[index]]
+    # counted from a known token, a jump gives the same token as from the start
+    assert db_manager.page_token_at(20, pages[1].next_token, 10) == pages[3].next_token
+    assert db_manager.page_token_at(10, pages[1].next_token, 10) == pages[1].next_token
+    assert db_manager.page_token_at(100) is None
+
+
+@pytest.mark.parametrize("token", ["not a token", "WzEsMiwzXQ==", ""])
+def test_invalid_page_token_raises_value_error(db_manager, token):
+    with pytest.raises(ValueError):
+        db_manager.fetch_page(10, token)
+
+
+def test_page_token_before_its_position_raises_value_error(db_manager):
+    db_manager.insert_contacts([("Ann", "Lee", str(1000 + i), f"c{i}@example.com") for i in range(10)])
+    token = db_manager.fetch_page(5).next_token
+    with pytest.raises(ValueError):
+        db_manager.page_token_at(3, token, 5)
+
+
+def test_migrate_moves_duplicates_aside(tmp_path):
+    db_name = str(tmp_path / "old.db")
+    connection = sqlite3.connect(db_name)
+    connection.execute("CREATE TABLE contacts (id INTEGER PRIMARY KEY, name TEXT, surname TEXT, number TEXT, "
+                       "email TEXT)")
+    connection.executemany("INSERT INTO contacts (name, surname, number, email) VALUES (?, ?, ?, ?)", [
+        ("Ann", "Lee", "100", "ann@example.com"),
+        ("Bob", "Lee", "100", "bob@example.com"),
+        ("Cid", "Lee", "300", "ann@example.com"),
+        ("Dan", "Lee", "400", "dan@example.com"),
+    ])
+    connection.commit()
+    connection.close()
+
+    db_manager = DatabaseManager(db_name)
+    try:
+        assert sorted((row[1], row[5]) for row in db_manager.migration_conflicts) == \
+               [("Bob", "duplicate number"), ("Cid", "duplicate email")]
+        assert [contact.name for contact in db_manager.download_contacts()] == ["Ann", "Dan"]
+        db_manager.cursor.execute("SELECT name FROM contact_conflicts ORDER BY id")
+        assert [row[0] for row in db_manager.cursor.fetchall()] == ["Bob", "Cid"]
+        db_manager.cursor.execute("PRAGMA user_version")
+        assert db_manager.cursor.fetchone()[0] == len(MIGRATIONS)
+        with pytest.raises(ValueError):
+            db_manager.insert_contact("Eve", "Lee", "100", "eve@example.com")
+        assert db_manager.migrate() == []
+    finally:
+        db_manager.close_connection()
+
+    reopened = DatabaseManager(db_name)
+    assert reopened.migration_conflicts == []
+    reopened.close_connection()
+
+
+def test_backup_reports_accepted_and_rejected_contacts(db_manager):
+    db_manager.insert_contact("Ann", "Lee", "100", "ann@example.com")
+    contacts = [Contact("Bob", "Lee", "200", "bob@example.com"),
+                Contact("Cid", "Lee", "100", "cid@example.com"),
+                Contact("Dan", "Lee", "400", "ann@example.com"),
+                Contact("Eve", "Lee", "500", "eve@example.com"),
+                Contact("Fay", "Lee", "500", "fay@example.com")]
+
+    report = db_manager.backup(contacts, batch_size=2)
+
+    assert [contact.name for contact in report.accepted] == ["Bob", "Eve"]
+    assert [(contact.name, reason) for contact, reason in report.rejected] == [
+        ("Cid", "Contact with the same \nnumber already exists"),
+        ("Dan", "Contact with the same \nemail already exists"),
+        ("Fay", "Contact with the same \nnumber already exists"),
+    ]
+    assert str(report) == "2 backed up, 3 rejected"
+    assert db_manager.count_contacts() == 3
+
+
+def test_backup_rolls_back_when_progress_raises(db_manager):
+    def progress(report):
+        raise ValueError("cancelled")
+
+    with pytest.raises(ValueError):
+        db_manager.backup([Contact("Bob", "Lee", "200", "bob@example.com")], progress=progress)
+    assert db_manager.count_contacts() == 0
@@ -0,0 +1,105 @@
+import pytest
+
+from Contact import Contact
+from ContactStore import ContactStore
+from SyncEngine import SyncEngine
+
+
+@pytest.fixture
+def engine(db_manager):
+    return SyncEngine(ContactStore(), db_manager)
+
+
+def synced_pair(db_manager):
+    """
+        Returns two engines over separate stores kept in sync through db_manager, holding one contact.
+        """
+    first = SyncEngine(ContactStore([Contact("Ann", "Lee", "100", "ann@example.com")]), db_manager)
+    first.push()
+    first.pull()
+    second = SyncEngine(ContactStore(), db_manager)
+    second.pull()
+    return first, second
+
+
+def test_push_and_pull_only_send_changes(engine, db_manager):
+    engine.store.add(Contact("Ann", "Lee", "100", "ann@example.com"))
+    engine.store.add(Contact("Bob", "Lee", "200", "bob@example.com"))
+
+    report = engine.push()
+    assert (report.inserted, report.conflicts) == (2, [])
+    assert engine.store.dirty_contacts() == []
+    assert engine.push().transferred == 0
+
+    other = SyncEngine(ContactStore(), db_manager)
+    assert other.pull().inserted == 2
+    assert other.pull().transferred == 0
+    assert sorted(contact.name for contact in other.store) == ["Ann", "Bob"]
+
+
+def test_edits_and_deletes_reach_the_other_side(db_manager):
+    first, second = synced_pair(db_manager)
+
+    first.store.get_by_number("100").name = "Anna"
+    assert first.push().updated == 1
+    assert second.pull().updated == 1
+    assert second.store.get_by_number("100").name == "Anna"
+
+    second.store.remove(second.store.get_by_number("100"))
+    assert second.push().deleted == 1
+    assert first.pull().deleted == 1
+    assert len(first.store) == 0 and db_manager.count_contacts() == 0
+
+
+def test_edits_on_both_sides_conflict(db_manager):
+    first, second = synced_pair(db_manager)
+    first.store.get_by_number("100").name = "Anna"
+    first.push()
+    local = second.store.get_by_number("100")
+    local.surname = "Leeds"
+
+    pushed = second.push()
+    assert [(conflict.contact, conflict.reason) for conflict in pushed.conflicts] == \
+           [(local, "edited on the Cloud and on PC")]
+    pulled = second.pull()
+    assert [conflict.reason for conflict in pulled.conflicts] == ["edited on the Cloud and on PC"]
+    # neither side is overwritten and the local edit stays unsynced
+    assert (local.name, local.surname) == ("Ann", "Leeds")
+    assert second.store.is_dirty(local)
+    assert db_manager.search_contact("Anna Lee") is not None
+
+
+def test_delete_against_edit_conflicts(db_manager):
+    first, second = synced_pair(db_manager)
+    first.store.get_by_number("100").name = "Anna"
+    first.push()
+    second.store.remove(second.store.get_by_number("100"))
+
+    report = second.push()
+    assert [conflict.reason for conflict in report.conflicts] == ["edited on the Cloud, deleted on PC"]
+    assert db_manager.count_contacts() == 1
+
+
+def test_clashing_new_contacts_conflict_and_identical_ones_link(engine, db_manager):
+    db_manager.insert_contact("Ann", "Lee", "100", "ann@example.com")
+    db_manager.insert_contact("Bob", "Lee", "200", "bob@example.com")
+    identical = Contact("Ann", "Lee", "100", "ann@example.com")
+    clashing = Contact("Cid", "Lee", "200", "cid@example.com")
+    engine.store.add(identical)
+    engine.store.add(clashing)
+
+    report = engine.push()
+    assert report.linked == 1
+    assert [(conflict.contact, conflict.reason) for conflict in report.conflicts] == \
+           [(clashing, "number or email already used on the Cloud")]
+    assert not engine.store.is_dirty(identical) and engine.store.is_dirty(clashing)
+
+
+def test_pull_reports_rows_that_fail_validation(engine, db_manager):
+    db_manager.insert_contact("Ann", "Lee", "100", "ann@example.com")
+    db_manager.insert_contact("B0b", "Lee", "200", "bob@example.com")
+
+    report = engine.pull()
+    assert report.inserted == 1
+    assert [conflict.row[1] for conflict in report.conflicts] == ["B0b"]
+    assert [contact.name for contact in engine.store] == ["Ann"]